@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context, session
 from flask_cors import CORS
 # from flask_mail import Mail, Message
 import json
@@ -9,7 +9,20 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
-import joblib
+import atexit
+import threading
+from contextlib import contextmanager
+from persistence import get_persistence_manager, atomic_write_json, file_lock, STORAGE_MULTIPROCESS
+from ticket_repository import get_ticket_repository, encode_cursor, decode_cursor, FILTER_FIELDS
+from ticket_ids import TicketIdAllocator, parse_ticket_id
+from chat_store import ChatSessionStore, PendingComplaintStore
+from events import get_event_broadcaster
+from ml_inference import PredictionCache, map_category, map_priority, ML_CACHE_SIZE
+from model_registry import ML_MODEL_STATE_FILE, ModelRegistry, ModelValidationError
+from enrichment import EnrichmentPipeline, ENRICHMENT_MODE
+from http_cache import conditional_response
+from export import (export_tickets, export_chat_sessions, ndjson_response, parse_since,
+                    ticket_export_position, chat_export_position)
 
 # Import dashboard routes
 try:
@@ -65,71 +78,123 @@ SUPPORT_EMAIL = 'navadeepmarella@gmail.com'
 # Persistent storage using JSON files
 import json
 import os
-import pickle
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 
-TICKETS_FILE = 'tickets.json'
-SESSIONS_FILE = 'chat_sessions.json'
+SESSIONS_FILE = 'chat_sessions.json'  # Legacy single-file store, migrated on first start
+SESSIONS_DIR = 'chat_sessions'
 
-def load_tickets():
-    """Load tickets from JSON file"""
-    if os.path.exists(TICKETS_FILE):
-        try:
-            with open(TICKETS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            logger.error("Failed to load tickets file")
-    return {}
+# Chat sessions idle for CHAT_SESSION_IDLE_TTL seconds (or beyond the resident bound)
+# are evicted from memory and read back from disk when the session returns
+CHAT_SESSION_IDLE_TTL = int(os.getenv('CHAT_SESSION_IDLE_TTL', '1800'))
+CHAT_MAX_RESIDENT_SESSIONS = int(os.getenv('CHAT_MAX_RESIDENT_SESSIONS', '1000'))
 
-def save_tickets():
-    """Save tickets to JSON file"""
-    try:
-        with open(TICKETS_FILE, 'w') as f:
-            json.dump(tickets, f, indent=2)
-        logger.info(f"Saved {len(tickets)} tickets to {TICKETS_FILE}")
-    except Exception as e:
-        logger.error(f"Failed to save tickets: {e}")
+# Ticket IDs are reserved from the counter file in blocks, so each worker only
+# takes the file lock once per TICKET_ID_BLOCK_SIZE tickets
+TICKET_COUNTER_FILE = os.getenv('TICKET_COUNTER_FILE', 'ticket_counter.json')
+TICKET_ID_BLOCK_SIZE = int(os.getenv('TICKET_ID_BLOCK_SIZE', '20' if STORAGE_MULTIPROCESS else '1'))
 
-def load_chat_sessions():
-    """Load chat sessions from JSON file"""
-    if os.path.exists(SESSIONS_FILE):
-        try:
-            with open(SESSIONS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            logger.error("Failed to load chat sessions file")
-    return {}
+# /api/tickets page size when no limit is given, and the most a client may ask for
+TICKETS_PAGE_SIZE = 50
+TICKETS_MAX_PAGE_SIZE = 200
+
+# Most descriptions one /api/classify/batch request may carry
+CLASSIFY_BATCH_MAX = int(os.getenv('CLASSIFY_BATCH_MAX', '10000'))
+
+# /api/tickets/changes tells the client to reload instead when more tickets than this changed
+TICKET_CHANGES_LIMIT = 500
+
+def highest_ticket_sequence(year):
+    """Highest ZER0-<year>-<sequence> number among existing tickets (seeds a new year's counter)"""
+    highest = 0
+    for ticket_key, ticket in ticket_repo.list_tickets():
+        for ticket_id in (ticket_key, ticket.get('id'), ticket.get('ticket_number')):
+            parsed = parse_ticket_id(ticket_id)
+            if parsed and parsed[0] == year:
+                highest = max(highest, parsed[1])
+    return highest
 
-def save_chat_sessions():
-    """Save chat sessions to JSON file"""
+def next_ticket_id():
+    """Allocate a new ZER0-<year>-<sequence> ticket ID"""
+    ticket_id = ticket_ids.allocate()
+    while ticket_repo.get(ticket_id) is not None:
+        # Counter file was lost or edited - never overwrite an existing ticket
+        ticket_id = ticket_ids.allocate()
+    return ticket_id
+
+def save_ticket(ticket_id, ticket):
+    """Save one ticket through the configured storage engine (TICKET_STORAGE=json|sqlite)"""
     try:
-        with open(SESSIONS_FILE, 'w') as f:
-            json.dump(chat_sessions, f, indent=2)
-        logger.info(f"Saved {len(chat_sessions)} chat sessions to {SESSIONS_FILE}")
+        ticket_repo.save(ticket_id, ticket)
+        logger.info(f"Saved ticket {ticket_id} ({ticket_repo.engine} storage)")
     except Exception as e:
-        logger.error(f"Failed to save chat sessions: {e}")
+        logger.error(f"Failed to save ticket {ticket_id}: {e}")
+
+# Load existing data on startup (chat sessions are loaded lazily, one file per session)
+ticket_repo = get_ticket_repository()
+ticket_ids = TicketIdAllocator(TICKET_COUNTER_FILE, TICKET_ID_BLOCK_SIZE, seed=highest_ticket_sequence)
+chat_sessions = ChatSessionStore(SESSIONS_DIR, SESSIONS_FILE,
+                                 max_resident=CHAT_MAX_RESIDENT_SESSIONS,
+                                 idle_ttl=CHAT_SESSION_IDLE_TTL,
+                                 multiprocess=STORAGE_MULTIPROCESS)
+pending_complaints = PendingComplaintStore(SESSIONS_DIR,
+                                           max_resident=CHAT_MAX_RESIDENT_SESSIONS,
+                                           idle_ttl=CHAT_SESSION_IDLE_TTL,
+                                           multiprocess=STORAGE_MULTIPROCESS)
+
+# Group commit: stores mark themselves dirty and a background thread flushes them
+persistence = get_persistence_manager()
+persistence.register('chat_sessions', chat_sessions.flush)
+chat_sessions.on_dirty = lambda: persistence.mark_dirty('chat_sessions')
+persistence.register_periodic('evict_chat_sessions', chat_sessions.evict_idle)
+persistence.register_periodic('evict_pending_complaints', pending_complaints.evict_idle)
 
-# Load existing data on startup
-tickets = load_tickets()
-chat_sessions = load_chat_sessions()
+# Ticket and agent events pushed to the dashboards over /api/events
+events = get_event_broadcaster()
 
-logger.info(f"Loaded {len(tickets)} existing tickets and {len(chat_sessions)} chat sessions")
+logger.info(f"Loaded {ticket_repo.count()} existing tickets, chat sessions in {SESSIONS_DIR}/")
 
 # Load ML models for intelligent ticket processing
-def load_ml_models():
-    """Load the ML models for categorization and priority classification"""
+CATEGORY_MODEL_FILE = 'models/customer_service_model.pkl'
+PRIORITY_MODEL_FILE = 'models/support_severity_classifier.pkl'
+
+# 'sklearn' loads the pickled pipelines; 'compact' loads the pruned numpy-only exports
+# written next to them by export_compact_models.py (no sklearn import, faster startup)
+ML_MODEL_FORMAT = os.getenv('ML_MODEL_FORMAT', 'sklearn')
+if ML_MODEL_FORMAT == 'compact':
+    from compact_model import compact_model_file
+    CATEGORY_MODEL_FILE = compact_model_file(CATEGORY_MODEL_FILE)
+    PRIORITY_MODEL_FILE = compact_model_file(PRIORITY_MODEL_FILE)
+ML_MODEL_FILES = [CATEGORY_MODEL_FILE, PRIORITY_MODEL_FILE]
+
+# 'background' loads the models on a thread so the server answers straight away
+# (with the fallback category/priority until they are ready); 'eager' loads them
+# before the app finishes importing
+ML_WARMUP = os.getenv('ML_WARMUP', 'background')
+
+# Memory-map the models' numpy arrays read-only instead of copying them into each
+# process, so pre-forked workers share one page-cache copy (needs uncompressed joblib files)
+ML_MODEL_MMAP = os.getenv('ML_MODEL_MMAP', 'true').lower() in ('1', 'true', 'yes')
+
+def load_ml_models(paths=ML_MODEL_FILES):
+    """Load the ML models for categorization and priority classification from (category, priority) files"""
+    category_model_file, priority_model_file = paths
     models = {}
     try:
+        if ML_MODEL_FORMAT == 'compact':
+            from compact_model import CompactTextClassifier
+            load_model = CompactTextClassifier.load
+        else:
+            # Imported here so numpy/scipy/sklearn load with the models, not with the app
+            import joblib
+            mmap_mode = 'r' if ML_MODEL_MMAP else None
+            load_model = lambda path: joblib.load(path, mmap_mode=mmap_mode)
+        
         # Load customer service categorization model
-        with open('models/customer_service_model.pkl', 'rb') as f:
-            models['categorization'] = joblib.load(f)
-        logger.info("✅ Customer service categorization model loaded")
+        models['categorization'] = load_model(category_model_file)
+        logger.info(f"✅ Customer service categorization model loaded ({ML_MODEL_FORMAT})")
         
         # Load support severity classifier model
-        with open('models/support_severity_classifier.pkl', 'rb') as f:
-            models['priority'] = joblib.load(f)
-        logger.info("✅ Support severity classifier model loaded")
+        models['priority'] = load_model(priority_model_file)
+        logger.info(f"✅ Support severity classifier model loaded ({ML_MODEL_FORMAT})")
         
     except Exception as e:
         logger.error(f"❌ Failed to load ML models: {e}")
@@ -137,66 +202,31 @@ def load_ml_models():
     
     return models
 
-def predict_ticket_category(description, models):
-    """Predict ticket category using ML model"""
-    if not models or 'categorization' not in models:
-        return "General Assistance"  # Fallback
+def classify_ticket(description, engine):
+    """Predict (category, priority) for a ticket, micro-batched with concurrent requests"""
+    if not engine:
+        return "General Assistance", "medium"  # Fallback
     
     try:
-        # Use the categorization model to predict category
-        model = models['categorization']
-        
-        # Assuming the model expects text input
-        if hasattr(model, 'predict'):
-            prediction = model.predict([description])
-            category = prediction[0] if len(prediction) > 0 else "General Assistance"
-            
-            # Map model output to our categories
-            category_mapping = {
-                'technical': 'Technical Help & Troubleshooting',
-                'billing': 'Billing & Account Questions',
-                'warranty': 'Warranty & Repairs',
-                'setup': 'Product Setup & Software',
-                'returns': 'Returns, Cancellations & Swaps',
-                'shipping': 'Shipping & Delivery',
-                'general': 'General Assistance'
-            }
-            
-            return category_mapping.get(category.lower(), category)
-        
+        prediction = engine.predict_one(description)
+        return map_category(prediction['categorization']), map_priority(prediction['priority'])
     except Exception as e:
-        logger.error(f"Category prediction failed: {e}")
+        logger.error(f"Ticket classification failed: {e}")
     
-    return "General Assistance"  # Fallback
+    return "General Assistance", "medium"  # Fallback
 
-def predict_ticket_priority(description, models):
-    """Predict ticket priority using ML model"""
-    if not models or 'priority' not in models:
-        return "medium"  # Fallback
+def classify_tickets(descriptions, engine):
+    """Predict (category, priority) for many tickets with one vectorized predict per model"""
+    if not engine:
+        return [("General Assistance", "medium")] * len(descriptions)  # Fallback
     
     try:
-        # Use the priority model to predict severity
-        model = models['priority']
-        
-        if hasattr(model, 'predict'):
-            prediction = model.predict([description])
-            priority = prediction[0] if len(prediction) > 0 else "medium"
-            
-            # Map model output to our priority levels
-            priority_mapping = {
-                'low': 'low',
-                'medium': 'medium', 
-                'high': 'high',
-                'urgent': 'urgent',
-                'critical': 'urgent'  # Map critical to urgent
-            }
-            
-            return priority_mapping.get(priority.lower(), priority.lower())
-        
+        return [(map_category(prediction['categorization']), map_priority(prediction['priority']))
+                for prediction in engine.predict_items(descriptions)]
     except Exception as e:
-        logger.error(f"Priority prediction failed: {e}")
+        logger.error(f"Ticket classification failed: {e}")
     
-    return "medium"  # Fallback
+    return [("General Assistance", "medium")] * len(descriptions)  # Fallback
 
 def get_eta_by_priority(priority):
     """Get estimated response time based on priority"""
@@ -220,8 +250,28 @@ def assign_agent_by_category(category, priority="medium"):
         # Fallback to general support
         return 'Anaya (General Support)', 'anaya_general', 45
 
-# Load ML models on startup
-ml_models = load_ml_models()
+def start_ml_warmup():
+    """Load the ML models per ML_WARMUP - on a background thread by default - then watch for new versions
+    
+    model_registry.engine() stays None until the first version is loaded and
+    validated, so requests arriving during warm-up take the fallback paths
+    instead of waiting.
+    """
+    if ML_WARMUP == 'eager':
+        model_registry.load_initial()
+    else:
+        threading.Thread(target=model_registry.load_initial, name='ml-warmup', daemon=True).start()
+        logger.info("⏳ Loading ML models in the background - using fallback classification until ready")
+    model_registry.watch()
+
+# Load ML models on startup, without holding up the server. Replacing the files in
+# models/ (or POST /api/admin/models/reload) loads, validates and swaps in a new
+# version; cached predictions are keyed by version, so old ones are never served.
+# The active version is recorded in ML_MODEL_STATE_FILE for every worker and restart
+model_registry = ModelRegistry(ML_MODEL_FILES, load_ml_models,
+                               cache=PredictionCache(ML_CACHE_SIZE) if ML_CACHE_SIZE > 0 else None,
+                               state_file=ML_MODEL_STATE_FILE)
+start_ml_warmup()
 
 # Real-time Agent Management System
 AGENTS_FILE = 'agents.json'
@@ -330,14 +380,90 @@ def load_agents():
         }
     }
 
-def save_agents():
-    """Save agent data to JSON file"""
+def agents_file_signature():
+    """(mtime, size) of the agents file, or None if it does not exist"""
+    try:
+        stat = os.stat(AGENTS_FILE)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def flush_agents(fsync=False):
+    """Write agent data to JSON file"""
+    global agents_signature
     try:
-        with open(AGENTS_FILE, 'w') as f:
-            json.dump(agents, f, indent=2)
+        with agents_lock:
+            atomic_write_json(AGENTS_FILE, agents, fsync=fsync)
+            agents_signature = agents_file_signature()
         logger.info(f"Saved agent data to {AGENTS_FILE}")
     except Exception as e:
         logger.error(f"Failed to save agents: {e}")
+        raise
+
+def save_agents():
+    """Queue agent data for the next flush (PERSISTENCE_MODE=sync writes immediately)"""
+    if STORAGE_MULTIPROCESS:
+        # Written before agents_transaction() releases the file lock
+        flush_agents()
+    else:
+        persistence.mark_dirty('agents')
+
+def refresh_agents():
+    """Reload the agents if another worker has rewritten the file (STORAGE_MULTIPROCESS only)"""
+    global agents_signature
+    if not STORAGE_MULTIPROCESS:
+        return
+    with agents_lock:
+        signature = agents_file_signature()
+        if signature is not None and signature != agents_signature:
+            loaded = load_agents()
+            agents.clear()
+            agents.update(loaded)
+            count_agents()
+            agents_signature = signature
+
+def count_agents():
+    """Recount agent statuses and assigned tickets after the agents were (re)loaded"""
+    counts = {"available": 0, "busy": 0, "offline": 0, "total_tickets": 0}
+    for agent in agents.values():
+        counts[agent['status']] += 1
+        counts['total_tickets'] += len(agent['current_tickets'])
+    agent_counts.clear()
+    agent_counts.update(counts)
+
+def adjust_agent_counts(agent, sign):
+    """Add (sign=1) or remove (sign=-1) one agent's share of agent_counts"""
+    agent_counts[agent['status']] += sign
+    agent_counts['total_tickets'] += sign * len(agent['current_tickets'])
+
+def agent_status_counts():
+    """Agents per status and total assigned tickets, kept up to date by agents_transaction()"""
+    refresh_agents()
+    with agents_lock:
+        return dict(agent_counts)
+
+def agents_revision():
+    """Current agent revision - the highest revision of any agent change"""
+    refresh_agents()
+    return max((agent.get('revision', 0) for agent in agents.values()), default=0)
+
+@contextmanager
+def agents_transaction(agent_id):
+    """Read-modify-write of one agent: other workers' changes are loaded first, ours saved at the end
+    
+    The agent is stamped with the next agent revision so /api/agents/changes picks it up,
+    and its share of agent_counts is moved from its old status to its new one.
+    """
+    with agents_lock, file_lock(AGENTS_FILE, STORAGE_MULTIPROCESS):
+        revision = agents_revision() + 1
+        agent = agents[agent_id]
+        adjust_agent_counts(agent, -1)
+        try:
+            yield agent
+        finally:
+            adjust_agent_counts(agent, 1)
+        agent['revision'] = revision
+        save_agents()
 
 def find_best_available_agent(category, priority="medium"):
     """Find the best available agent for a ticket based on category and current availability"""
@@ -346,6 +472,7 @@ def find_best_available_agent(category, priority="medium"):
     specialist_agents = []
     general_agents = []
     
+    refresh_agents()
     for agent_id, agent in agents.items():
         if category in agent['specialties']:
             specialist_agents.append((agent_id, agent))
@@ -436,71 +563,70 @@ def assign_ticket_to_agent(ticket_id, agent_id):
     if agent_id not in agents:
         return False
     
-    agent = agents[agent_id]
-    
-    # Add ticket to agent's current tickets
-    if ticket_id not in agent['current_tickets']:
-        agent['current_tickets'].append(ticket_id)
-    
-    # Update agent status
-    if len(agent['current_tickets']) >= agent['max_concurrent_tickets']:
-        agent['status'] = 'busy'
-    
-    # Set current ticket if it's their first
-    if not agent['current_ticket']:
-        agent['current_ticket'] = ticket_id
-    
-    # Estimate when they'll be free (based on avg resolution time)
-    estimated_completion = datetime.now() + timedelta(minutes=agent['avg_resolution_time'])
-    agent['estimated_free_time'] = estimated_completion.isoformat()
-    
-    # Update last activity
-    agent['last_activity'] = datetime.now().isoformat()
-    
-    # Save changes
-    save_agents()
-    
+    with agents_transaction(agent_id) as agent:
+        
+        # Add ticket to agent's current tickets
+        if ticket_id not in agent['current_tickets']:
+            agent['current_tickets'].append(ticket_id)
+        
+        # Update agent status
+        if len(agent['current_tickets']) >= agent['max_concurrent_tickets']:
+            agent['status'] = 'busy'
+        
+        # Set current ticket if it's their first
+        if not agent['current_ticket']:
+            agent['current_ticket'] = ticket_id
+        
+        # Estimate when they'll be free (based on avg resolution time)
+        estimated_completion = datetime.now() + timedelta(minutes=agent['avg_resolution_time'])
+        agent['estimated_free_time'] = estimated_completion.isoformat()
+        
+        # Update last activity
+        agent['last_activity'] = datetime.now().isoformat()
+        
+    events.publish('agent-status-changed', agent_summary(agent_id, agent))
     logger.info(f"🎯 Assigned ticket {ticket_id} to {agent['name']} ({agent['title']})")
     
     return True
 
 def get_agent_status_summary():
     """Get a summary of all agent statuses"""
-    summary = {
-        "available": 0,
-        "busy": 0,
-        "offline": 0,
-        "total_tickets": 0,
-        "agents": []
-    }
-    
-    for agent_id, agent in agents.items():
-        summary[agent['status']] += 1
-        summary['total_tickets'] += len(agent['current_tickets'])
-        
-        summary['agents'].append({
-            "id": agent_id,
-            "name": agent['name'],
-            "title": agent['title'],
-            "status": agent['status'],
-            "current_tickets": len(agent['current_tickets']),
-            "estimated_free_time": agent['estimated_free_time'],
-            "specialties": agent['specialties']
-        })
-    
+    summary = agent_status_counts()
+    summary['agents'] = [agent_summary(agent_id, agent) for agent_id, agent in list(agents.items())]
     return summary
 
+def agent_summary(agent_id, agent):
+    """Public view of one agent for the dashboards"""
+    return {
+        "id": agent_id,
+        "name": agent['name'],
+        "title": agent['title'],
+        "status": agent['status'],
+        "current_tickets": len(agent['current_tickets']),
+        "estimated_free_time": agent['estimated_free_time'],
+        "specialties": agent['specialties'],
+        "revision": agent.get('revision', 0)
+    }
+
 # Load agents on startup
 agents = load_agents()
+agents_lock = threading.RLock()
+agent_counts = {}  # Agents per status plus total_tickets, moved on every agent change
+count_agents()
+agents_signature = agents_file_signature()  # Agents file version the in-memory agents reflect
+persistence.register('agents', flush_agents)
+persistence.start()
+atexit.register(persistence.stop)
 logger.info(f"Loaded {len(agents)} agents")
 
 class PrashnaBot:
     """Prashna AI Assistant for Zer0 Customer Support"""
     
-    def __init__(self):
+    def __init__(self, temp_complaints=None):
         self.name = "Prashna"
         self.company = "Zer0"
-        self.temp_complaints = {}  # Store temporary complaint data during multi-step flows
+        # Store temporary complaint data during multi-step flows
+        self.temp_complaints = temp_complaints if temp_complaints is not None else {}
         
         # Comprehensive knowledge base
         self.knowledge_base = {
@@ -562,12 +688,11 @@ class PrashnaBot:
         message_lower = message.lower().strip()
         
         # Check if we're in a multi-step flow
-        if session_id in chat_sessions:
-            session_data = chat_sessions[session_id]
-            if len(session_data) > 0:
-                last_response = session_data[-1].get('bot_response', {})
-                if last_response.get('next_step'):
-                    return self.handle_multi_step_flow(message, session_id, last_response['next_step'])
+        session_data = chat_sessions.get(session_id)
+        if session_data:
+            last_response = session_data[-1].get('bot_response', {})
+            if last_response.get('next_step'):
+                return self.handle_multi_step_flow(message, session_id, last_response['next_step'])
         
         # Check for FAQ actions
         if message.startswith('faq_'):
@@ -581,8 +706,8 @@ class PrashnaBot:
         if any(word in message_lower for word in ['hello', 'hi', 'hey', 'start', 'greetings']):
             # Check if this is a JotForm referral (stored in session)
             referral_source = None
-            if session_id in chat_sessions and len(chat_sessions[session_id]) > 0:
-                referral_source = chat_sessions[session_id][0].get('referral_source')
+            if session_data:
+                referral_source = session_data[0].get('referral_source')
             return self.handle_greeting(referral_source)
         elif any(word in message_lower for word in ['complaint', 'issue', 'problem', 'help', 'support', 'technical', 'warranty', 'billing', 'setup']):
             return self.handle_new_complaint()
@@ -727,7 +852,7 @@ class PrashnaBot:
         elif step == "collect_name":
             # Store name and ask for email
             if session_id not in chat_sessions:
-                chat_sessions[session_id] = []
+                chat_sessions.create(session_id)
             
             # Store the name
             for session in chat_sessions[session_id]:
@@ -740,7 +865,9 @@ class PrashnaBot:
             if session_id not in self.temp_complaints:
                 self.temp_complaints[session_id] = {}
                 
-            self.temp_complaints[session_id]['name'] = message.strip()
+            complaint = self.temp_complaints[session_id]
+            complaint['name'] = message.strip()
+            self.temp_complaints[session_id] = complaint  # Write back - another worker may take the next step
             
             return {
                 "message": f"Thank you, {message.strip()}! It's wonderful to meet you. 😊 Now, what's your email address? I'll use this to send you updates and confirmations about your support request.",
@@ -755,7 +882,9 @@ class PrashnaBot:
             if session_id not in self.temp_complaints:
                 self.temp_complaints[session_id] = {}
                 
-            self.temp_complaints[session_id]['email'] = message.strip()
+            complaint = self.temp_complaints[session_id]
+            complaint['email'] = message.strip()
+            self.temp_complaints[session_id] = complaint
             
             kb = self.knowledge_base
             return {
@@ -789,7 +918,9 @@ class PrashnaBot:
                 "category_general": "General Assistance"
             }
             
-            self.temp_complaints[session_id]['category'] = category_map.get(message, message)
+            complaint = self.temp_complaints[session_id]
+            complaint['category'] = category_map.get(message, message)
+            self.temp_complaints[session_id] = complaint
             
             return {
                 "message": "Excellent choice! Now, please describe your issue in detail. The more information you provide, the better I can help you and ensure our specialist has everything they need to resolve your concern quickly. 😊\n\nFeel free to include any error messages, steps you've tried, or when the issue started!",
@@ -804,19 +935,21 @@ class PrashnaBot:
             if session_id not in self.temp_complaints:
                 self.temp_complaints[session_id] = {}
                 
-            self.temp_complaints[session_id]['description'] = message.strip()
+            complaint = self.temp_complaints[session_id]
+            complaint['description'] = message.strip()
+            self.temp_complaints[session_id] = complaint
             
             # Create the ticket with AI-powered categorization and priority
             complaint_data = self.temp_complaints[session_id]
-            ticket_id = f"ZER0-2025-{len(tickets) + 1:03d}"
+            ticket_id = next_ticket_id()
             description = complaint_data.get('description', '')
             
-            # Use ML models for intelligent processing
-            if ml_models:
+            # Use ML models for intelligent processing (once warm-up has loaded them)
+            engine = model_registry.engine()
+            if engine:
                 # AI-powered category prediction (overrides user selection if needed)
-                ai_category = predict_ticket_category(description, ml_models)
-                # AI-powered priority classification
-                ai_priority = predict_ticket_priority(description, ml_models)
+                # and priority classification from a single featurization pass
+                ai_category, ai_priority = classify_ticket(description, engine)
                 # Smart agent assignment based on category and real-time availability
                 ai_agent, agent_id, ai_eta = assign_agent_by_category(ai_category, ai_priority)
                 
@@ -840,11 +973,12 @@ class PrashnaBot:
                 "assigned_agent": ai_agent,  # AI-assigned agent
                 "assigned_agent_id": agent_id,  # Agent ID for tracking
                 "eta_minutes": ai_eta,  # Real-time ETA
-                "ai_processed": True if ml_models else False
+                "ai_processed": True if engine else False,
+                "model_version": engine.version if engine else None
             }
             
-            tickets[ticket_id] = ticket
-            save_tickets()  # Save to persistent storage
+            save_ticket(ticket_id, ticket)  # Save to persistent storage
+            events.publish('ticket-created', ticket)
             
             # Assign ticket to the selected agent
             if agent_id:
@@ -899,8 +1033,8 @@ class PrashnaBot:
         # Check if it looks like a ticket ID (starts with ZER0-)
         if query.upper().startswith('ZER0-'):
             ticket_id = query.upper()
-            if ticket_id in tickets:
-                ticket = tickets[ticket_id]
+            ticket = ticket_repo.get(ticket_id)
+            if ticket:
                 return {
                     "message": f"✅ **Ticket Status Found!**\n\n**Ticket ID:** {ticket['id']}\n**Status:** {ticket['status'].title()}\n**Customer:** {ticket['customer_name']}\n**Category:** {ticket['category']}\n**Priority:** {ticket['priority'].title()}\n**Assigned Agent:** {ticket['assigned_agent']}\n**Created:** {ticket['created_at']}\n\n**Description:**\n{ticket['description']}\n\n**Next Steps:**\n• Our agent will contact you within 1 hour\n• Check your email for updates\n• I'm here if you need anything else! 😊",
                     "type": "status_result",
@@ -924,10 +1058,7 @@ class PrashnaBot:
         # Check if it looks like an email
         elif '@' in query:
             # Find tickets by email
-            matching_tickets = []
-            for ticket_id, ticket in tickets.items():
-                if ticket['customer_email'].lower() == query.lower():
-                    matching_tickets.append(ticket)
+            matching_tickets = [ticket for ticket_id, ticket in ticket_repo.find_by_customer_email(query)]
             
             if matching_tickets:
                 if len(matching_tickets) == 1:
@@ -976,7 +1107,7 @@ class PrashnaBot:
             }
 
 # Initialize Prashna bot
-prashna = PrashnaBot()
+prashna = PrashnaBot(pending_complaints)
 
 @app.route('/')
 def index():
@@ -1038,10 +1169,10 @@ def chat():
         
         # Store chat history
         if session_id not in chat_sessions:
-            chat_sessions[session_id] = []
+            chat_sessions.create(session_id)
             # Store referral source in first session entry
             if referral_source:
-                chat_sessions[session_id].append({
+                chat_sessions.append(session_id, {
                     "referral_source": referral_source,
                     "timestamp": datetime.now().isoformat()
                 })
@@ -1049,12 +1180,11 @@ def chat():
         # Process message with Prashna
         response = prashna.process_message(message, session_id)
         
-        chat_sessions[session_id].append({
+        chat_sessions.append(session_id, {
             "timestamp": datetime.now().isoformat(),
             "user_message": message,
             "bot_response": response
-        })
-        save_chat_sessions()  # Save to persistent storage
+        })  # Appended to the session's own file
         
         return jsonify({
             "success": True,
@@ -1121,9 +1251,11 @@ def send_admin_notification(ticket):
         # Send email using simple SMTP (more reliable than Flask-Mail)
         send_email(SUPPORT_EMAIL, subject, html_body)
         logger.info(f"Admin notification sent for ticket {ticket['id']}")
+        return True
         
     except Exception as e:
         logger.error(f"Failed to send admin notification: {str(e)}")
+        return False
 
 def send_customer_confirmation(ticket):
     """Send confirmation email to customer"""
@@ -1179,9 +1311,11 @@ def send_customer_confirmation(ticket):
         
         send_email(ticket['customer_email'], subject, html_body)
         logger.info(f"Customer confirmation sent for ticket {ticket['id']}")
+        return True
         
     except Exception as e:
         logger.error(f"Failed to send customer confirmation: {str(e)}")
+        return False
 
 def send_ticket_closure_notification(ticket):
     """Send closure notification email to customer"""
@@ -1315,78 +1449,116 @@ def send_email(to_email, subject, html_body):
         logger.error(f"Failed to send email to {to_email}: {str(e)}")
         raise
 
+def classify_stage(ticket):
+    """Enrichment stage: AI category and priority (the ticket keeps the user's choice without models)"""
+    engine = model_registry.engine()
+    if not engine:
+        return None
+    ai_category, ai_priority = classify_ticket(ticket.get('description', ''), engine)
+    logger.info(f"🤖 AI Predictions for {ticket['id']}: Category={ai_category}, Priority={ai_priority}")
+    return {
+        "category": ai_category,  # AI-predicted category
+        "priority": ai_priority,  # AI-predicted priority
+        "ai_processed": True,
+        "model_version": engine.version
+    }
+
+def route_stage(ticket):
+    """Enrichment stage: smart agent assignment based on category and real-time availability"""
+    ai_agent, agent_id, ai_eta = assign_agent_by_category(ticket['category'], ticket['priority'])
+    if agent_id:
+        assign_ticket_to_agent(ticket['id'], agent_id)
+    logger.info(f"🎯 Routed {ticket['id']} to {ai_agent}, ETA={ai_eta}min")
+    return {
+        "assigned_agent": ai_agent,  # AI-assigned agent
+        "assigned_agent_id": agent_id,  # Agent ID for tracking
+        "eta_minutes": ai_eta  # Real-time ETA
+    }
+
+def notify_stage(ticket):
+    """Enrichment stage: admin notification and customer confirmation emails"""
+    failed = []
+    if not send_admin_notification(ticket):
+        failed.append("admin notification")
+    if not send_customer_confirmation(ticket):
+        failed.append("customer confirmation")
+    if failed:
+        raise RuntimeError(f"Failed to send {' and '.join(failed)}")
+    return None
+
+# New complaints are saved straight away and classified, routed and notified here,
+# on a thread pool (ENRICHMENT_MODE=sync runs the stages inside the request)
+enrichment = EnrichmentPipeline(
+    [('classify', classify_stage), ('route', route_stage), ('notify', notify_stage)],
+    load_ticket=ticket_repo.get,
+    update_ticket=ticket_repo.update,
+    on_update=lambda ticket: events.publish('ticket-updated', ticket)
+)
+
+def resume_enrichment():
+    """Queue the stages left pending when the server last stopped - call from one serving process only
+    
+    python app.py calls it below; under gunicorn the first worker does (gunicorn.conf.py).
+    """
+    return enrichment.resume(ticket_repo.list_tickets())
+
 @app.route('/api/complaint', methods=['POST'])
 def create_complaint():
-    """Create a new complaint ticket with email notifications"""
+    """Create a new complaint ticket, then classify, route and notify it in the background"""
     try:
         data = request.get_json()
         
         # Generate ticket ID
-        ticket_id = f"ZER0-2025-{len(tickets) + 1:03d}"
+        ticket_id = next_ticket_id()
         
-        # Create ticket with AI-powered processing
         description = data.get('description', '')
         user_category = data.get('category', 'General Assistance')
         
-        # Use ML models for intelligent processing
-        if ml_models:
-            # AI-powered category prediction
-            ai_category = predict_ticket_category(description, ml_models)
-            # AI-powered priority classification
-            ai_priority = predict_ticket_priority(description, ml_models)
-            # Smart agent assignment based on category and real-time availability
-            ai_agent, agent_id, ai_eta = assign_agent_by_category(ai_category, ai_priority)
-            
-            logger.info(f"🤖 AI Predictions for {ticket_id}: Category={ai_category}, Priority={ai_priority}, Agent={ai_agent}, ETA={ai_eta}min")
-        else:
-            # Fallback to manual selections
-            ai_category = user_category
-            ai_priority = "medium"
-            ai_agent, agent_id, ai_eta = assign_agent_by_category(ai_category, ai_priority)
-        
+        # Minimal ticket with the user's choices; the enrichment stages fill in the rest
         ticket = {
             "id": ticket_id,
             "customer_name": data.get('name'),
             "customer_email": data.get('email'),
-            "category": ai_category,  # AI-predicted category
+            "category": user_category,
             "user_selected_category": user_category,  # Keep user's choice for reference
             "description": description,
             "status": "registered",
-            "priority": ai_priority,  # AI-predicted priority
+            "priority": "medium",
             "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "assigned_agent": ai_agent,  # AI-assigned agent
-            "assigned_agent_id": agent_id,  # Agent ID for tracking
-            "eta_minutes": ai_eta,  # Real-time ETA
-            "ai_processed": True if ml_models else False
+            "assigned_agent": None,
+            "assigned_agent_id": None,
+            "eta_minutes": None,
+            "ai_processed": False,
+            "model_version": None,
+            "enrichment": enrichment.initial_status()
         }
         
-        tickets[ticket_id] = ticket
-        save_tickets()  # Save to persistent storage
-        
-        # Assign ticket to the selected agent
-        if agent_id:
-            assign_ticket_to_agent(ticket_id, agent_id)
+        save_ticket(ticket_id, ticket)  # Save to persistent storage
+        events.publish('ticket-created', ticket)
         
-        # Send email notifications
-        try:
-            logger.info(f"Attempting to send emails for ticket {ticket_id}")
-            send_admin_notification(ticket)
-            logger.info(f"Admin notification sent successfully for {ticket_id}")
-            send_customer_confirmation(ticket)
-            logger.info(f"Customer confirmation sent successfully for {ticket_id}")
-            email_status = "✅ Email notifications sent successfully"
-        except Exception as e:
-            logger.error(f"Email notification failed for {ticket_id}: {str(e)}")
-            email_status = f"⚠️ Ticket created but email notifications failed: {str(e)}"
+        if ENRICHMENT_MODE == 'sync':
+            ticket = enrichment.run(ticket_id) or ticket
+            notify = ticket["enrichment"].get("notify", {})
+            if notify.get("status") == "done":
+                email_status = "✅ Email notifications sent successfully"
+            else:
+                email_status = f"⚠️ Ticket created but email notifications failed: {notify.get('error')}"
+            message = f"Your request has been logged with Zer0 Customer Care! ✅\n\n{email_status}"
+        else:
+            enrichment.submit(ticket_id)
+            message = ("Your request has been logged with Zer0 Customer Care! ✅\n\n"
+                       "We're assigning an agent now - you'll get a confirmation email shortly.")
         
         logger.info(f"Created ticket: {ticket_id}")
         
         return jsonify({
             "success": True,
-            "message": f"Your request has been logged with Zer0 Customer Care! ✅\n\n{email_status}",
+            "message": message,
             "ticket_id": ticket_id,
             "assigned_agent": ticket["assigned_agent"],
-            "eta_minutes": ticket["eta_minutes"]
+            "eta_minutes": ticket["eta_minutes"],
+            "enrichment": ticket["enrichment"],
+            "status_url": f"/api/status/{ticket_id}"
         })
         
     except Exception as e:
@@ -1400,11 +1572,12 @@ def create_complaint():
 def get_ticket_status(ticket_id):
     """Get ticket status by ID"""
     try:
-        if ticket_id in tickets:
-            ticket = tickets[ticket_id]
+        ticket = ticket_repo.get(ticket_id)
+        if ticket:
             return jsonify({
                 "success": True,
-                "ticket": ticket
+                "ticket": ticket,
+                "enrichment": ticket.get('enrichment')  # Per-stage progress of new tickets
             })
         else:
             return jsonify({
@@ -1443,54 +1616,57 @@ def update_ticket_status(ticket_id):
             }), 400
         
         # Find ticket by ID or ticket_number
-        ticket_found = False
-        ticket_key = None
-        
-        for key, ticket_data in tickets.items():
-            if key == ticket_id or ticket_data.get('ticket_number') == ticket_id:
-                ticket_found = True
-                ticket_key = key
-                break
+        ticket_key, ticket = ticket_repo.resolve(ticket_id)
         
-        if not ticket_found:
+        if not ticket:
             return jsonify({
                 'success': False,
                 'error': 'Ticket not found'
             }), 404
         
-        # Update ticket status
-        tickets[ticket_key]['status'] = new_status
-        tickets[ticket_key]['updated_at'] = datetime.now().isoformat()
-        tickets[ticket_key]['updated_by'] = updated_by
-        
-        if notes:
-            if 'agent_notes' not in tickets[ticket_key]:
-                tickets[ticket_key]['agent_notes'] = []
-            tickets[ticket_key]['agent_notes'].append({
-                'note': notes,
+        def apply_status(ticket):
+            # Update ticket status
+            ticket['status'] = new_status
+            ticket['updated_at'] = datetime.now().isoformat()
+            ticket['updated_by'] = updated_by
+            
+            if notes:
+                if 'agent_notes' not in ticket:
+                    ticket['agent_notes'] = []
+                ticket['agent_notes'].append({
+                    'note': notes,
+                    'timestamp': datetime.now().isoformat(),
+                    'updated_by': updated_by
+                })
+            
+            # Add status history
+            if 'status_history' not in ticket:
+                ticket['status_history'] = []
+            
+            ticket['status_history'].append({
+                'status': new_status,
                 'timestamp': datetime.now().isoformat(),
-                'updated_by': updated_by
+                'updated_by': updated_by,
+                'notes': notes
             })
+            return ticket
         
-        # Add status history
-        if 'status_history' not in tickets[ticket_key]:
-            tickets[ticket_key]['status_history'] = []
-        
-        tickets[ticket_key]['status_history'].append({
-            'status': new_status,
-            'timestamp': datetime.now().isoformat(),
-            'updated_by': updated_by,
-            'notes': notes
-        })
-        
-        # Save tickets
-        save_tickets()
+        # Applied to the latest copy under the repository lock (and the file lock with
+        # STORAGE_MULTIPROCESS), so a concurrent update from another worker is not lost
+        ticket = ticket_repo.update(ticket_key, apply_status)
+        if ticket is None:
+            return jsonify({
+                'success': False,
+                'error': 'Ticket not found'
+            }), 404
+        logger.info(f"Saved ticket {ticket_key} ({ticket_repo.engine} storage)")
+        events.publish('ticket-status-changed', ticket)
         
         # Send closure notification email if ticket is closed
         if new_status == 'closed':
             try:
                 logger.info(f"📧 Sending closure notification for ticket {ticket_id}")
-                send_ticket_closure_notification(tickets[ticket_key])
+                send_ticket_closure_notification(ticket)
                 logger.info(f"✅ Closure notification sent successfully for ticket {ticket_id}")
             except Exception as e:
                 logger.error(f"❌ Failed to send closure notification for ticket {ticket_id}: {str(e)}")
@@ -1500,7 +1676,7 @@ def update_ticket_status(ticket_id):
         return jsonify({
             'success': True,
             'message': f'Ticket status updated to {new_status}',
-            'ticket': tickets[ticket_key]
+            'ticket': ticket
         }), 200
         
     except Exception as e:
@@ -1532,47 +1708,338 @@ def webhook_complaint():
 
 @app.route('/api/tickets', methods=['GET'])
 def get_all_tickets():
-    """Get all tickets for admin view"""
+    """Get a page of tickets for admin view, newest first
+    
+    Query parameters: status, priority, category, assigned_agent_id,
+    created_from / created_to (date prefixes, inclusive), limit and cursor
+    (the next_cursor of the previous page).
+    
+    Tagged with an ETag from the ticket revision, so an unchanged page is
+    answered with 304 Not Modified.
+    """
+    try:
+        filters = {field: request.args.get(field) for field in FILTER_FIELDS + ['created_from', 'created_to']}
+        
+        try:
+            limit = min(max(int(request.args.get('limit', TICKETS_PAGE_SIZE)), 1), TICKETS_MAX_PAGE_SIZE)
+            cursor = request.args.get('cursor')
+            position = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        def build():
+            revision = ticket_repo.revision()
+            page, next_position = ticket_repo.query_tickets(filters, limit=limit, cursor=position)
+            
+            return jsonify({
+                "success": True,
+                "total_tickets": ticket_repo.count_tickets(filters),
+                "tickets": tickets_for_response(page),
+                "next_cursor": encode_cursor(next_position) if next_position else None,
+                "revision": revision
+            })
+        
+        return conditional_response(build, ticket_repo.version())
+    except Exception as e:
+        logger.error(f"Error retrieving tickets: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": "Failed to retrieve tickets"
+        }), 500
+
+def tickets_for_response(items):
+    """Ticket dicts from (ticket_id, ticket) pairs, making sure each has an ID field"""
+    tickets_array = []
+    for ticket_id, ticket_data in items:
+        if 'ticket_number' not in ticket_data and 'id' not in ticket_data:
+            ticket_data['id'] = ticket_id
+        tickets_array.append(ticket_data)
+    return tickets_array
+
+def since_revision():
+    """The ?since=<revision> query parameter - raises ValueError if malformed"""
+    since = int(request.args.get('since', 0))
+    if since < 0:
+        raise ValueError("since must not be negative")
+    return since
+
+@app.route('/api/tickets/changes', methods=['GET'])
+def get_ticket_changes():
+    """Tickets changed after ?since=<revision>, oldest change first
+    
+    Dashboards keep the revision from their last /api/tickets or changes call
+    and apply the returned tickets as deltas. reset=true means too much
+    changed (or the revision is unknown) and the list should be reloaded.
+    """
     try:
-        # Convert tickets dictionary to array for frontend
-        tickets_array = []
-        for ticket_id, ticket_data in tickets.items():
-            # Ensure ticket has an ID field
-            if 'ticket_number' not in ticket_data and 'id' not in ticket_data:
-                ticket_data['id'] = ticket_id
-            tickets_array.append(ticket_data)
+        try:
+            since = since_revision()
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
         
-        # Sort by creation date (newest first)
-        tickets_array.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        revision = ticket_repo.revision()
+        changes, reset = ticket_repo.changes_since(since, limit=TICKET_CHANGES_LIMIT)
         
         return jsonify({
             "success": True,
-            "total_tickets": len(tickets_array),
-            "tickets": tickets_array
+            "revision": revision,
+            "reset": reset,
+            "tickets": tickets_for_response(changes)
         })
     except Exception as e:
-        logger.error(f"Error retrieving tickets: {str(e)}")
+        logger.error(f"Error retrieving ticket changes: {str(e)}")
         return jsonify({
             "success": False,
-            "error": "Failed to retrieve tickets"
+            "error": "Failed to retrieve ticket changes"
         }), 500
 
+def export_compressed():
+    """Whether ?gzip=1 asked for a gzip-encoded export"""
+    return request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+@app.route('/api/export/tickets', methods=['GET'])
+def export_tickets_ndjson():
+    """Stream every ticket as NDJSON for the analytics warehouse
+    
+    One {"id", "cursor", "ticket"} line per ticket, in revision order and
+    read a page at a time. Query parameters: since (ISO timestamp - tickets
+    updated at or after it), cursor (the cursor of the last line received,
+    to resume an interrupted export) and gzip=1.
+    """
+    try:
+        since = parse_since(request.args.get('since'))
+        cursor = request.args.get('cursor')
+        after = ticket_export_position(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    logger.info(f"📤 Exporting tickets (since={since}, resumed={after is not None})")
+    return ndjson_response(export_tickets(ticket_repo, since=since, after=after), compress=export_compressed())
+
+@app.route('/api/export/chat-sessions', methods=['GET'])
+def export_chat_sessions_ndjson():
+    """Stream every chat transcript entry as NDJSON for the analytics warehouse
+    
+    One {"session_id", "cursor", "entry"} line per entry, reading one
+    transcript file at a time. Takes the same since, cursor and gzip
+    parameters as /api/export/tickets.
+    """
+    try:
+        since = parse_since(request.args.get('since'))
+        cursor = request.args.get('cursor')
+        after = chat_export_position(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    logger.info(f"📤 Exporting chat sessions (since={since}, resumed={after is not None})")
+    return ndjson_response(export_chat_sessions(chat_sessions, since=since, after=after),
+                           compress=export_compressed())
+
 @app.route('/api/agents', methods=['GET'])
 def get_agents():
-    """Get all agent statuses"""
+    """Get all agent statuses (ETag from the agent revision)"""
     try:
+        def build():
+            return jsonify({
+                "success": True,
+                "summary": get_agent_status_summary(),
+                "revision": agents_revision()
+            })
+        
+        return conditional_response(build, agents_revision())
+    except Exception as e:
+        logger.error(f"Error getting agents: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": "Failed to retrieve agent information"
+        }), 500
+
+@app.route('/api/agents/changes', methods=['GET'])
+def get_agent_changes():
+    """Agents changed after ?since=<revision>, with the status counts to refresh the summary"""
+    try:
+        try:
+            since = since_revision()
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        revision = agents_revision()
         summary = get_agent_status_summary()
+        changed = [agent for agent in summary.pop('agents') if agent['revision'] > since]
+        
         return jsonify({
             "success": True,
-            "summary": summary
+            "revision": revision,
+            "reset": since > revision,
+            "agents": changed,
+            "counts": summary
         })
     except Exception as e:
-        logger.error(f"Error getting agents: {str(e)}")
+        logger.error(f"Error retrieving agent changes: {str(e)}")
         return jsonify({
             "success": False,
-            "error": "Failed to retrieve agent information"
+            "error": "Failed to retrieve agent changes"
+        }), 500
+
+@app.route('/api/stats', methods=['GET'])
+def get_ticket_stats():
+    """Ticket counters overall, per category and per assigned agent, plus agent status counts
+    
+    Each group has total, open, resolved, urgent and resolution_time (the sum
+    over resolved tickets). The counters are maintained as tickets change,
+    so this never scans the tickets.
+    """
+    try:
+        def build():
+            return jsonify({
+                "success": True,
+                "tickets": ticket_repo.stats_summary(),
+                "agents": agent_status_counts()
+            })
+        
+        return conditional_response(build, ticket_repo.version(), agents_revision())
+    except Exception as e:
+        logger.error(f"Error retrieving stats: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": "Failed to retrieve stats"
         }), 500
 
+@app.route('/api/classify/batch', methods=['POST'])
+def classify_batch():
+    """Classify many ticket descriptions at once for bulk triage
+    
+    Body: {"descriptions": ["...", ...]}. Each model runs one vectorized
+    predict over the whole batch. Results come back in request order with
+    category, priority and the agent that would be suggested right now;
+    nothing is assigned.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        descriptions = data.get('descriptions')
+        if not isinstance(descriptions, list) or not all(isinstance(d, str) for d in descriptions):
+            return jsonify({
+                "success": False,
+                "error": "descriptions must be a list of strings"
+            }), 400
+        if len(descriptions) > CLASSIFY_BATCH_MAX:
+            return jsonify({
+                "success": False,
+                "error": f"At most {CLASSIFY_BATCH_MAX} descriptions per request"
+            }), 400
+        
+        engine = model_registry.engine()
+        predictions = classify_tickets(descriptions, engine)
+        
+        # Only a handful of (category, priority) pairs occur, so look each suggestion up once
+        suggestions = {}
+        results = []
+        for category, priority in predictions:
+            if (category, priority) not in suggestions:
+                suggestions[(category, priority)] = assign_agent_by_category(category, priority)
+            agent, agent_id, eta = suggestions[(category, priority)]
+            results.append({
+                "category": category,
+                "priority": priority,
+                "suggested_agent": agent,
+                "suggested_agent_id": agent_id,
+                "eta_minutes": eta
+            })
+        
+        logger.info(f"🤖 Classified {len(results)} descriptions in one batch")
+        return jsonify({
+            "success": True,
+            "ai_processed": bool(engine),
+            "model_version": engine.version if engine else None,
+            "count": len(results),
+            "results": results
+        })
+    except Exception as e:
+        logger.error(f"Batch classification error: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": "Failed to classify descriptions"
+        }), 500
+
+@app.route('/api/ml/stats', methods=['GET'])
+def get_ml_stats():
+    """Which models share featurization, and call counts and timings per inference stage"""
+    engine = model_registry.engine()
+    if not engine:
+        return jsonify({
+            "success": False,
+            "error": "ML models are still loading" if not model_registry.ready.is_set() else "ML models are not loaded",
+            "registry": model_registry.status()
+        }), 503
+    return jsonify({
+        "success": True,
+        "inference": engine.stats(),
+        "registry": model_registry.status()
+    })
+
+@app.route('/api/admin/models', methods=['GET'])
+def get_model_versions():
+    """Active and previous model versions with their holdout scores (admin only)"""
+    if session.get('user_role') != 'admin':
+        return jsonify({"success": False, "error": "Admin access required"}), 403
+    return jsonify({"success": True, **model_registry.status()})
+
+@app.route('/api/admin/models/reload', methods=['POST'])
+def reload_models():
+    """Load the model files now, validate them and make them the active version in every worker (admin only)"""
+    if session.get('user_role') != 'admin':
+        return jsonify({"success": False, "error": "Admin access required"}), 403
+    try:
+        version = model_registry.reload(force=True)
+        return jsonify({"success": True, "active": version.to_dict()})
+    except ModelValidationError as e:
+        return jsonify({"success": False, "error": str(e)}), 422
+    except Exception as e:
+        logger.error(f"Model reload error: {str(e)}")
+        return jsonify({"success": False, "error": "Failed to reload models"}), 500
+
+@app.route('/api/admin/models/rollback', methods=['POST'])
+def rollback_models():
+    """Make the previous model version active again in every worker, and keep it until the next reload (admin only)"""
+    if session.get('user_role') != 'admin':
+        return jsonify({"success": False, "error": "Admin access required"}), 403
+    try:
+        version = model_registry.rollback()
+        return jsonify({"success": True, "active": version.to_dict()})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 409
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events stream of ticket-created, ticket-status-changed and agent-status-changed
+    
+    With STORAGE_MULTIPROCESS the stream carries every worker's events. Each
+    stream holds a server thread, so past EVENTS_MAX_SUBSCRIBERS the request
+    is refused and the dashboard relies on its slow /changes poll instead.
+    """
+    subscription = events.subscribe()
+    if subscription is None:
+        return jsonify({'success': False, 'error': 'Too many live event streams, try again later'}), 503, \
+            {'Retry-After': '60'}
+    return Response(stream_with_context(events.stream(subscription)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/agents/<agent_id>/status', methods=['PUT'])
 def update_agent_status(agent_id):
     """Update agent status (for simulation/testing)"""
@@ -1592,18 +2059,19 @@ def update_agent_status(agent_id):
                 "error": "Invalid status"
             }), 400
         
-        agents[agent_id]['status'] = new_status
-        agents[agent_id]['last_activity'] = datetime.now().isoformat()
-        
-        # Update estimated free time based on status
-        if new_status == 'available':
-            agents[agent_id]['estimated_free_time'] = None
-            agents[agent_id]['current_ticket'] = None
-        elif new_status == 'offline':
-            # Set to come back in 2 hours
-            agents[agent_id]['estimated_free_time'] = (datetime.now() + timedelta(hours=2)).isoformat()
+        with agents_transaction(agent_id):
+            agents[agent_id]['status'] = new_status
+            agents[agent_id]['last_activity'] = datetime.now().isoformat()
+            
+            # Update estimated free time based on status
+            if new_status == 'available':
+                agents[agent_id]['estimated_free_time'] = None
+                agents[agent_id]['current_ticket'] = None
+            elif new_status == 'offline':
+                # Set to come back in 2 hours
+                agents[agent_id]['estimated_free_time'] = (datetime.now() + timedelta(hours=2)).isoformat()
         
-        save_agents()
+        events.publish('agent-status-changed', agent_summary(agent_id, agents[agent_id]))
         
         return jsonify({
             "success": True,
@@ -1619,17 +2087,30 @@ def update_agent_status(agent_id):
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    agent_summary = get_agent_status_summary()
-    return jsonify({
-        "status": "healthy",
-        "service": "Prashna Zer0 Customer Support",
-        "total_tickets": len(tickets),
-        "agents_available": agent_summary['available'],
-        "agents_busy": agent_summary['busy'],
-        "agents_offline": agent_summary['offline'],
-        "timestamp": datetime.now().isoformat()
-    })
+    """Health check endpoint
+    
+    The ETag covers the ticket and agent revisions, so a revalidated 304
+    keeps the timestamp of the last change rather than the current time.
+    """
+    engine = model_registry.engine()
+    
+    def build():
+        agent_counts = agent_status_counts()
+        return jsonify({
+            "status": "healthy",
+            "service": "Prashna Zer0 Customer Support",
+            "total_tickets": ticket_repo.count(),
+            "agents_available": agent_counts['available'],
+            "agents_busy": agent_counts['busy'],
+            "agents_offline": agent_counts['offline'],
+            "ml_models_ready": engine is not None,
+            "ml_warmup_done": model_registry.ready.is_set(),
+            "ml_model_version": engine.version if engine else None,
+            "timestamp": datetime.now().isoformat()
+        })
+    
+    return conditional_response(build, ticket_repo.version(), agents_revision(),
+                                engine.version if engine else None, model_registry.ready.is_set())
 @app.route('/escalate')
 def escalate_from_jotform():
     """Handle escalation from JotForm chatbot"""
@@ -1765,8 +2246,7 @@ def create_priority_ticket():
         }
         
         # Save to existing tickets system
-        tickets[ticket_id] = ticket_data
-        save_tickets()
+        save_ticket(ticket_id, ticket_data)
         
         # Try to assign to agent using existing logic
         try:
@@ -1775,6 +2255,7 @@ def create_priority_ticket():
                 assign_ticket_to_agent(ticket_id, agent_id)
                 ticket_data['assigned_agent'] = agent['name']
                 ticket_data['eta_minutes'] = eta
+                save_ticket(ticket_id, ticket_data)  # Save the assignment too
         except:
             pass  # Continue even if agent assignment fails
         
@@ -1800,4 +2281,6 @@ def create_priority_ticket():
 
 
 if __name__ == '__main__':
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':  # The debug reloader's serving child, not its watcher
+        resume_enrichment()
     app.run(debug=True, host='172.28.0.217', port=5000)
\ No newline at end of file
@@ -0,0 +1,414 @@
+"""
+Chat Session Store
+Per-session append-only transcript files in a hashed directory layout
+"""
+
+import json
+import os
+import hashlib
+import threading
+import time
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+from persistence import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+def session_path(directory, session_id, extension):
+    """File for a session in the hashed layout: <directory>/<sha1 prefix>/<session_id><extension>"""
+    digest = hashlib.sha1(session_id.encode('utf-8')).hexdigest()
+    filename = quote(session_id, safe='')
+    if len(filename) > 200:
+        filename = digest  # Keep within filesystem name limits
+    return os.path.join(directory, digest[:2], f"{filename}{extension}")
+
+class SessionCache:
+    """Per-session values kept in LRU order, evicted when idle or over the resident bound"""
+
+    def __init__(self, max_resident=1000, idle_ttl=1800, on_evict=None):
+        self.max_resident = max_resident
+        self.idle_ttl = idle_ttl  # Seconds without access before a session is evicted
+        self.on_evict = on_evict  # Called as on_evict(session_id, value)
+        self.entries = OrderedDict()  # session_id -> (value, last access), least recent first
+
+    def __contains__(self, session_id):
+        return session_id in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, session_id):
+        """Get a resident value and mark the session as recently used"""
+        if session_id not in self.entries:
+            return None
+        value, _ = self.entries[session_id]
+        self.put(session_id, value)
+        return value
+
+    def put(self, session_id, value):
+        """Store a value as most recently used, then evict what no longer fits"""
+        self.entries[session_id] = (value, time.monotonic())
+        self.entries.move_to_end(session_id)
+        self.evict()
+
+    def pop(self, session_id):
+        """Remove a session without calling on_evict"""
+        value, _ = self.entries.pop(session_id, (None, None))
+        return value
+
+    def evict(self):
+        """Evict idle sessions and the least recently used beyond max_resident"""
+        now = time.monotonic()
+        while self.entries:
+            session_id, (value, last_access) = next(iter(self.entries.items()))
+            if len(self.entries) <= self.max_resident and now - last_access < self.idle_ttl:
+                break
+            del self.entries[session_id]
+            if self.on_evict:
+                self.on_evict(session_id, value)
+
+class ChatSessionStore:
+    """Chat transcripts stored as one JSONL file per session, loaded lazily
+
+    chat_sessions/<2 hex chars of sha1(session_id)>/<quoted session_id>.jsonl
+    A chat turn costs one small append and loading a session reads only its own file.
+    Evicting an idle session just drops it from memory; it is read back when the
+    session returns. With on_dirty set, appends are buffered until flush().
+
+    With multiprocess set, appends are written straight away (each is a single
+    O_APPEND write) and a resident session is re-read when its file has grown
+    from another worker's appends.
+    """
+
+    def __init__(self, directory='chat_sessions', legacy_file='chat_sessions.json',
+                 max_resident=1000, idle_ttl=1800, multiprocess=False):
+        self.directory = directory
+        self.legacy_file = legacy_file  # Old single-file store, migrated on first start
+        self.multiprocess = multiprocess
+        # session_id -> list of entries
+        self.sessions = SessionCache(max_resident, idle_ttl, on_evict=self._forget)
+        self.sizes = {}  # session_id -> transcript file size the resident entries reflect
+        self.pending = {}  # session_id -> entries not yet written
+        self.on_dirty = None  # Group commit hook - when set, flush() is left to the caller
+        self.lock = threading.RLock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._migrate_legacy_file()
+
+    def _path(self, session_id):
+        """Transcript file for a session"""
+        return session_path(self.directory, session_id, '.jsonl')
+
+    def _migrate_legacy_file(self):
+        """Split the old chat_sessions.json into per-session files"""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+
+        try:
+            with open(self.legacy_file, 'r') as f:
+                legacy_sessions = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to read legacy chat sessions file: {e}")
+            return
+
+        for session_id, entries in legacy_sessions.items():
+            if not os.path.exists(self._path(session_id)):
+                self._write_lines(session_id, entries)
+
+        os.replace(self.legacy_file, f"{self.legacy_file}.migrated")
+        logger.info(f"Migrated {len(legacy_sessions)} chat sessions from {self.legacy_file} to {self.directory}/")
+
+    def _write_lines(self, session_id, entries, fsync=False):
+        """Append entries to a session's transcript file"""
+        path = self._path(session_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
+            start = f.tell()
+            f.write(''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8'))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+            end = f.tell()
+
+        # Nobody else appended since we read the file, so memory still matches it
+        if self.sizes.get(session_id) == start:
+            self.sizes[session_id] = end
+
+    def _read(self, session_id):
+        """Read a session's transcript from disk, or None if it has none"""
+        self._flush_session(session_id)
+        path = self._path(session_id)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        # A trailing line without a newline is still being written by another worker
+        complete = data[:data.rfind(b'\n') + 1]
+        entries = []
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping unreadable chat entry for session {session_id}")
+        self.sizes[session_id] = len(complete)
+        return entries
+
+    def _is_stale(self, session_id):
+        """Whether another worker has appended to a resident session's file"""
+        try:
+            size = os.path.getsize(self._path(session_id))
+        except OSError:
+            size = 0  # Created here but nothing written yet
+        return size != self.sizes.get(session_id)
+
+    def _forget(self, session_id, entries):
+        self.sizes.pop(session_id, None)
+
+    def __contains__(self, session_id):
+        with self.lock:
+            return (session_id in self.sessions or session_id in self.pending or
+                    os.path.exists(self._path(session_id)))
+
+    def __getitem__(self, session_id):
+        entries = self.get(session_id)
+        if entries is None:
+            raise KeyError(session_id)
+        return entries
+
+    def get(self, session_id):
+        """Get a session's entries, loading them from disk if not resident"""
+        with self.lock:
+            entries = self.sessions.get(session_id)
+            if entries is not None and self.multiprocess and self._is_stale(session_id):
+                entries = None
+            if entries is None:
+                entries = self._read(session_id)
+                if entries is None:
+                    return None
+                self.sessions.put(session_id, entries)
+            return entries
+
+    def create(self, session_id):
+        """Start a new, empty session"""
+        with self.lock:
+            entries = self.sessions.get(session_id)
+            if entries is None:
+                entries = []
+                self.sessions.put(session_id, entries)
+                self.sizes.setdefault(session_id, 0)
+            return entries
+
+    def append(self, session_id, entry):
+        """Add one entry to a session and append it to the session's file"""
+        with self.lock:
+            entries = self.get(session_id)
+            if entries is None:
+                entries = self.create(session_id)
+            entries.append(entry)
+            self.pending.setdefault(session_id, []).append(entry)
+
+        if self.on_dirty and not self.multiprocess:
+            self.on_dirty()
+        else:
+            self.flush()
+
+    def _flush_session(self, session_id):
+        """Write one session's buffered entries"""
+        entries = self.pending.pop(session_id, None)
+        if entries:
+            self._write_lines(session_id, entries)
+
+    def flush(self, fsync=False):
+        """Write every session's buffered entries, one append per session"""
+        with self.lock:
+            # Entries leave the buffer only once written, so a failure keeps the rest for the next flush
+            for session_id, entries in list(self.pending.items()):
+                self._write_lines(session_id, entries, fsync)
+                del self.pending[session_id]
+
+    def resident_count(self):
+        """Number of sessions currently held in memory"""
+        return len(self.sessions)
+
+    def evict_idle(self):
+        """Drop sessions idle past the TTL - run periodically, as eviction otherwise needs an access"""
+        with self.lock:
+            self.sessions.evict()
+
+    def list_sessions(self, start=None, modified_since=None):
+        """Yield (relative path, session_id) for every transcript, in path order
+
+        Only <session_id>.jsonl files are listed - spilled pending complaints
+        share the directories. One shard directory is listed at a time, so
+        memory stays flat however many sessions there are. start skips paths
+        sorted before it; modified_since (an ISO timestamp) skips files
+        last written before it. Sessions whose ID was too long for a file name
+        are reported under its sha1 digest.
+        """
+        start_shard = start.split('/')[0] if start else ''
+        for shard in sorted(os.listdir(self.directory)):
+            shard_dir = os.path.join(self.directory, shard)
+            if shard < start_shard or not os.path.isdir(shard_dir):
+                continue
+            for name in sorted(os.listdir(shard_dir)):
+                relative_path = f"{shard}/{name}"
+                if not name.endswith('.jsonl') or (start and relative_path < start):
+                    continue
+                if modified_since:
+                    try:
+                        modified = datetime.fromtimestamp(os.path.getmtime(os.path.join(shard_dir, name)))
+                    except OSError:
+                        continue  # Removed since the listing
+                    if modified.isoformat() < modified_since:
+                        continue
+                yield relative_path, unquote(name[:-len('.jsonl')])
+
+    def iter_transcript(self, relative_path, start=0):
+        """Yield (index, entry) from a transcript file without loading the session into memory
+
+        Entries are numbered from 0 and those before `start` are skipped, so
+        an interrupted export can continue from the next index.
+        """
+        with open(os.path.join(self.directory, relative_path), 'rb') as f:
+            index = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Still being written by another worker
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping unreadable chat entry in {relative_path}")
+                    continue
+                if index >= start:
+                    yield index, entry
+                index += 1
+
+class PendingComplaintStore:
+    """Partially collected complaints (PrashnaBot.temp_complaints) with idle eviction
+
+    Behaves like a dict keyed by session_id. Evicted entries are spilled to
+    <directory>/<sha1 prefix>/<session_id>.pending.json and read back (then
+    removed from disk) when the session continues its complaint flow.
+
+    With multiprocess set, the file is the only copy: every assignment writes it
+    and every read loads it, so any worker can continue a session's complaint.
+    Callers must assign a modified complaint back for the change to be kept.
+    A file neither read nor written for idle_ttl seconds has expired: it reads
+    as missing, and evict_idle() deletes it.
+    """
+
+    def __init__(self, directory='chat_sessions', max_resident=1000, idle_ttl=1800, multiprocess=False):
+        self.directory = directory
+        self.multiprocess = multiprocess
+        self.complaints = SessionCache(max_resident, idle_ttl, on_evict=self._spill)
+        self.lock = threading.RLock()
+
+    def _path(self, session_id):
+        return session_path(self.directory, session_id, '.pending.json')
+
+    def _spill(self, session_id, complaint):
+        """Write an evicted complaint to disk"""
+        path = self._path(session_id)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write_json(path, complaint, indent=None)
+        except Exception as e:
+            logger.error(f"Failed to spill pending complaint for session {session_id}: {e}")
+
+    def _expired(self, path):
+        """Whether a multiprocess-mode complaint file has sat untouched past the TTL"""
+        return self.multiprocess and time.time() - os.path.getmtime(path) >= self.complaints.idle_ttl
+
+    def _read(self, session_id):
+        """Read a complaint from disk, or None if there is none (or it expired)"""
+        path = self._path(session_id)
+        try:
+            if self._expired(path):
+                os.remove(path)
+                return None
+            with open(path, 'r') as f:
+                complaint = json.load(f)
+            if self.multiprocess:
+                os.utime(path)  # A read counts as activity, as it does for a resident complaint
+            return complaint
+        except FileNotFoundError:
+            return None  # Never spilled, or removed by another worker
+
+    def _files(self):
+        """Paths of every complaint file on disk"""
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and len(entry.name) == 2:
+                for file in os.scandir(entry.path):
+                    if file.name.endswith('.pending.json'):
+                        yield file.path
+
+    def _rehydrate(self, session_id):
+        """Load a spilled complaint back into memory"""
+        complaint = self._read(session_id)
+        if complaint is None:
+            return None
+        os.remove(self._path(session_id))
+        self.complaints.put(session_id, complaint)
+        return complaint
+
+    def __contains__(self, session_id):
+        with self.lock:
+            if self.multiprocess:
+                return self._read(session_id) is not None
+            return session_id in self.complaints or os.path.exists(self._path(session_id))
+
+    def __getitem__(self, session_id):
+        with self.lock:
+            if self.multiprocess:
+                complaint = self._read(session_id)
+            else:
+                complaint = self.complaints.get(session_id)
+                if complaint is None:
+                    complaint = self._rehydrate(session_id)
+            if complaint is None:
+                raise KeyError(session_id)
+            return complaint
+
+    def __setitem__(self, session_id, complaint):
+        with self.lock:
+            if self.multiprocess:
+                self._spill(session_id, complaint)
+            else:
+                self.complaints.put(session_id, complaint)
+
+    def __delitem__(self, session_id):
+        with self.lock:
+            self.complaints.pop(session_id)
+            if os.path.exists(self._path(session_id)):
+                os.remove(self._path(session_id))
+
+    def __len__(self):
+        """Complaints held in memory, or (multiprocess) unexpired on disk"""
+        with self.lock:
+            if self.multiprocess:
+                return sum(1 for path in self._files() if not self._expired(path))
+            return len(self.complaints)
+
+    def evict_idle(self):
+        """Spill complaints idle past the TTL, or (multiprocess) delete the expired files - run
+        periodically, as eviction otherwise needs an access"""
+        with self.lock:
+            self.complaints.evict()
+            if self.multiprocess:
+                for path in self._files():
+                    try:
+                        if self._expired(path):
+                            os.remove(path)
+                    except FileNotFoundError:
+                        pass  # Removed by another worker meanwhile
@@ -0,0 +1,133 @@
+"""
+Compact Text Classifier
+TF-IDF + linear model predictor exported from the sklearn pipelines, evaluated with numpy alone
+"""
+
+import json
+import os
+import re
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COMPACT_FORMAT_VERSION = 1
+
+def pack_strings(strings):
+    """Newline-joined UTF-8 bytes of a list of strings - far smaller than a fixed-width string array"""
+    return np.frombuffer('\n'.join(strings).encode('utf-8'), dtype=np.uint8)
+
+def unpack_strings(packed):
+    text = packed.tobytes().decode('utf-8')
+    return text.split('\n') if text else []
+
+def compact_model_file(model_file):
+    """Compact export path for a pickled model: models/x.pkl -> models/x.compact.npz"""
+    return os.path.splitext(model_file)[0] + '.compact.npz'
+
+class CompactTextClassifier:
+    """A TfidfVectorizer + linear classifier pipeline reduced to float32 arrays
+
+    The vocabulary is a sorted term list, looked up through a dict built
+    at load time, with idf per term; the class weights are a (term x class)
+    float32 CSR matrix from which pruned weights are simply absent. Terms
+    left with no weights are not in the vocabulary at all, so the norm only
+    covers the terms that still score. predict() matches the sklearn pipeline's predict up to
+    float32 rounding and the pruned weights - export_compact_models.py
+    measures how far.
+    """
+
+    def __init__(self, terms, idf, indptr, indices, data, intercept, classes, stop_words, config):
+        self.terms = terms
+        self.vocabulary = {term: index for index, term in enumerate(terms)}
+        self.idf = idf
+        self.indptr = indptr  # Row t's weights are data[indptr[t]:indptr[t + 1]]
+        self.indices = indices  # ...for the classes indices[indptr[t]:indptr[t + 1]]
+        self.data = data
+        self.intercept = intercept
+        self.classes_ = classes
+        self.stop_words = frozenset(stop_words)
+        self.config = config
+        self.token_pattern = re.compile(config['token_pattern'])
+        self.min_n, self.max_n = config['ngram_range']
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            config = json.loads(str(arrays['config']))
+            if config.get('format_version') != COMPACT_FORMAT_VERSION:
+                raise ValueError(f"Unsupported compact model format in {path}: {config.get('format_version')}")
+            return cls(unpack_strings(arrays['terms']), arrays['idf'], arrays['indptr'], arrays['indices'],
+                       arrays['data'], arrays['intercept'], np.array(unpack_strings(arrays['classes'])),
+                       unpack_strings(arrays['stop_words']), config)
+
+    def save(self, path):
+        """Write the model as an uncompressed .npz (np.savez adds the suffix if missing)"""
+        np.savez(path, terms=pack_strings(self.terms), idf=self.idf, indptr=self.indptr, indices=self.indices,
+                 data=self.data, intercept=self.intercept, classes=pack_strings(self.classes_.tolist()),
+                 stop_words=pack_strings(sorted(self.stop_words)), config=np.array(json.dumps(self.config)))
+
+    def _analyze(self, text):
+        """Terms of one document, as TfidfVectorizer's word analyzer produces them"""
+        if self.config['lowercase']:
+            text = text.lower()
+        tokens = [token for token in self.token_pattern.findall(text) if token not in self.stop_words]
+        if self.max_n == 1:
+            return tokens
+
+        terms = list(tokens) if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), min(self.max_n, len(tokens)) + 1):
+            terms.extend(' '.join(tokens[start:start + n]) for start in range(len(tokens) - n + 1))
+        return terms
+
+    def transform(self, texts):
+        """(document ids, term ids, tf-idf values) of the vocabulary terms in each text, normalized"""
+        doc_ids, term_ids, counts = [], [], []
+        for doc_id, text in enumerate(texts):
+            found = {}
+            for term in self._analyze(text):
+                index = self.vocabulary.get(term)
+                if index is not None:
+                    found[index] = found.get(index, 0) + 1
+            doc_ids.extend([doc_id] * len(found))
+            term_ids.extend(found)
+            counts.extend(found.values())
+
+        doc_ids = np.array(doc_ids, dtype=np.intp)
+        term_ids = np.array(term_ids, dtype=np.intp)
+        values = np.array(counts, dtype=np.float32)
+        if self.config['binary']:
+            values[:] = 1
+        elif self.config['sublinear_tf']:
+            values = np.log(values) + 1
+        values *= self.idf[term_ids]
+
+        norm = self.config['norm']
+        if norm and len(values):
+            sums = np.bincount(doc_ids, weights=values * values if norm == 'l2' else np.abs(values),
+                               minlength=len(texts))
+            lengths = np.sqrt(sums) if norm == 'l2' else sums
+            values /= lengths[doc_ids].astype(np.float32)
+        return doc_ids, term_ids, values
+
+    def decision_function(self, texts):
+        """Class scores per text - (n_texts, n_classes), or (n_texts,) for a binary model"""
+        doc_ids, term_ids, values = self.transform(texts)
+        scores = np.zeros((len(texts), len(self.intercept)), dtype=np.float32)
+
+        # Expand each (document, term) entry to that term's stored class weights
+        starts = self.indptr[term_ids]
+        lengths = self.indptr[term_ids + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        np.add.at(scores, (np.repeat(doc_ids, lengths), self.indices[offsets]),
+                  self.data[offsets] * np.repeat(values, lengths))
+
+        scores += self.intercept
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict(self, texts):
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(np.intp)]
+        return self.classes_[scores.argmax(axis=1)]
@@ -9,6 +9,8 @@ import json
 import os
 from datetime import datetime
 from auth_routes import is_authenticated, get_current_user
+from ticket_repository import get_ticket_repository
+from http_cache import conditional_response
 
 logger = logging.getLogger(__name__)
 
@@ -31,45 +33,38 @@ def get_user_tickets():
         if not current_user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Load tickets from JSON file
-        tickets_file = 'tickets.json'
-        user_tickets = []
+        # Load tickets for current user (matched by user UID or email)
+        user_uid = current_user.get('firebase_uid')
+        user_email = current_user.get('email')
         
-        if os.path.exists(tickets_file):
-            with open(tickets_file, 'r') as f:
-                all_tickets = json.load(f)
-            
-            # Filter tickets for current user
-            user_uid = current_user.get('firebase_uid')
-            user_email = current_user.get('email')
-            
-            for ticket_id, ticket_data in all_tickets.items():
-                # Match by user UID or email
-                if (ticket_data.get('user_uid') == user_uid or 
-                    ticket_data.get('user_email') == user_email or
-                    ticket_data.get('email') == user_email):
-                    
-                    user_tickets.append({
-                        'id': ticket_data.get('ticket_number', ticket_id),
-                        'title': ticket_data.get('title', 'Support Request'),
-                        'status': ticket_data.get('status', 'registered'),
-                        'priority': ticket_data.get('priority', 'medium'),
-                        'category': ticket_data.get('category', 'general'),
-                        'created': ticket_data.get('created_at', ''),
-                        'updated': ticket_data.get('updated_at', ''),
-                        'agent': ticket_data.get('assigned_agent', ''),
-                        'eta': ticket_data.get('eta_minutes', ''),
-                        'description': ticket_data.get('description', '')
-                    })
-        
-        # Sort by creation date (newest first)
-        user_tickets.sort(key=lambda x: x.get('created', ''), reverse=True)
+        def build():
+            user_tickets = []
         
-        return jsonify({
-            'success': True,
-            'tickets': user_tickets,
-            'total': len(user_tickets)
-        }), 200
+            for ticket_id, ticket_data in get_ticket_repository().find_for_user(user_uid, user_email):
+                user_tickets.append({
+                    'id': ticket_data.get('ticket_number', ticket_id),
+                    'title': ticket_data.get('title', 'Support Request'),
+                    'status': ticket_data.get('status', 'registered'),
+                    'priority': ticket_data.get('priority', 'medium'),
+                    'category': ticket_data.get('category', 'general'),
+                    'created': ticket_data.get('created_at', ''),
+                    'updated': ticket_data.get('updated_at', ''),
+                    'agent': ticket_data.get('assigned_agent', ''),
+                    'eta': ticket_data.get('eta_minutes', ''),
+                    'description': ticket_data.get('description', '')
+                })
+        
+            # Sort by creation date (newest first)
+            user_tickets.sort(key=lambda x: x.get('created', ''), reverse=True)
+        
+            return jsonify({
+                'success': True,
+                'tickets': user_tickets,
+                'total': len(user_tickets)
+            }), 200
+        
+        # Per-user response, revalidated against the ticket revision
+        return conditional_response(build, get_ticket_repository().version(), user_uid, user_email, private=True)
         
     except Exception as e:
         logger.error(f"❌ Failed to get user tickets: {e}")
@@ -79,23 +74,8 @@ def get_user_tickets():
 def get_ticket_status(ticket_id):
     """Get status of a specific ticket"""
     try:
-        # Load tickets from JSON file
-        tickets_file = 'tickets.json'
-        
-        if not os.path.exists(tickets_file):
-            return jsonify({'error': 'Ticket not found'}), 404
-        
-        with open(tickets_file, 'r') as f:
-            all_tickets = json.load(f)
-        
         # Find ticket by ID or ticket number
-        ticket_data = None
-        for tid, data in all_tickets.items():
-            if (tid == ticket_id or 
-                data.get('ticket_number') == ticket_id or
-                data.get('id') == ticket_id):
-                ticket_data = data
-                break
+        _, ticket_data = get_ticket_repository().resolve(ticket_id)
         
         if not ticket_data:
             return jsonify({'error': 'Ticket not found'}), 404
@@ -132,46 +112,19 @@ def get_dashboard_stats():
         if not current_user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Load tickets and calculate stats
-        tickets_file = 'tickets.json'
-        stats = {
-            'total_tickets': 0,
-            'open_tickets': 0,
-            'resolved_tickets': 0,
-            'urgent_tickets': 0,
-            'avg_resolution_time': 0
-        }
+        user_uid = current_user.get('firebase_uid')
+        user_email = current_user.get('email')
         
-        if os.path.exists(tickets_file):
-            with open(tickets_file, 'r') as f:
-                all_tickets = json.load(f)
+        def build():
+            # Counters are maintained on every ticket change, so this is a lookup rather than a scan
+            stats = get_ticket_repository().user_stats(user_uid, user_email)
             
-            user_uid = current_user.get('firebase_uid')
-            user_email = current_user.get('email')
-            user_tickets = []
-            
-            for ticket_id, ticket_data in all_tickets.items():
-                if (ticket_data.get('user_uid') == user_uid or 
-                    ticket_data.get('user_email') == user_email or
-                    ticket_data.get('email') == user_email):
-                    user_tickets.append(ticket_data)
-            
-            # Calculate statistics
-            stats['total_tickets'] = len(user_tickets)
-            stats['open_tickets'] = len([t for t in user_tickets if t.get('status') not in ['resolved', 'closed']])
-            stats['resolved_tickets'] = len([t for t in user_tickets if t.get('status') in ['resolved', 'closed']])
-            stats['urgent_tickets'] = len([t for t in user_tickets if t.get('priority') == 'urgent'])
-            
-            # Calculate average resolution time for resolved tickets
-            resolved_tickets = [t for t in user_tickets if t.get('status') in ['resolved', 'closed']]
-            if resolved_tickets:
-                total_time = sum([t.get('resolution_time', 0) for t in resolved_tickets])
-                stats['avg_resolution_time'] = total_time / len(resolved_tickets)
+            return jsonify({
+                'success': True,
+                'stats': stats
+            }), 200
         
-        return jsonify({
-            'success': True,
-            'stats': stats
-        }), 200
+        return conditional_response(build, get_ticket_repository().version(), user_uid, user_email, private=True)
         
     except Exception as e:
         logger.error(f"❌ Failed to get dashboard stats: {e}")
@@ -215,20 +168,8 @@ def create_ticket_from_dashboard():
             'updated_at': datetime.now().isoformat()
         }
         
-        # Load existing tickets
-        tickets_file = 'tickets.json'
-        all_tickets = {}
-        
-        if os.path.exists(tickets_file):
-            with open(tickets_file, 'r') as f:
-                all_tickets = json.load(f)
-        
-        # Add new ticket
-        all_tickets[ticket_id] = ticket_data
-        
-        # Save tickets
-        with open(tickets_file, 'w') as f:
-            json.dump(all_tickets, f, indent=2)
+        # Save through the shared ticket store
+        get_ticket_repository().save(ticket_id, ticket_data)
         
         logger.info(f"✅ Created ticket from dashboard: {ticket_id}")
         
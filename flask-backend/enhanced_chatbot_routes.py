@@ -3,12 +3,13 @@ Enhanced Chatbot Routes with JotForm Integration
 Handles escalation from JotForm and provides advanced AI support
 """
 
-from flask import Blueprint, request, jsonify, render_template, session
+from flask import Blueprint, request, jsonify, render_template
 import logging
 import json
 import os
 from datetime import datetime
 from auth_routes import is_authenticated, get_current_user
+from ticket_repository import get_ticket_repository
 
 logger = logging.getLogger(__name__)
 
@@ -88,14 +89,14 @@ def process_chatbot_message():
             return jsonify({'error': 'Message is required'}), 400
         
         # Import existing chatbot logic
-        from app import PrashnaBot, chat_sessions, save_chat_sessions
+        from app import prashna, chat_sessions
         
-        # Initialize chatbot
-        bot = PrashnaBot()
+        # The app's bot, whose pending complaints are shared by every worker
+        bot = prashna
         
         # Add escalation context to session if not exists
         if session_id not in chat_sessions:
-            chat_sessions[session_id] = []
+            chat_sessions.create(session_id)
             
             # Add escalation context as first message if escalated
             if context.get('escalated'):
@@ -109,7 +110,7 @@ def process_chatbot_message():
                         'referral_source': context.get('referral', 'unknown')
                     }
                 }
-                chat_sessions[session_id].append(escalation_context)
+                chat_sessions.append(session_id, escalation_context)
         
         # Process message with bot
         bot_response = bot.process_message(message, session_id)
@@ -142,8 +143,7 @@ def process_chatbot_message():
             'user_info': get_current_user() if is_authenticated() else None
         }
         
-        chat_sessions[session_id].append(conversation_entry)
-        save_chat_sessions()
+        chat_sessions.append(session_id, conversation_entry)
         
         # Log escalated conversations
         if context.get('escalated'):
@@ -196,20 +196,10 @@ def request_urgent_agent():
             })
         
         # Save ticket
-        tickets_file = 'tickets.json'
-        all_tickets = {}
-        
-        if os.path.exists(tickets_file):
-            with open(tickets_file, 'r') as f:
-                all_tickets = json.load(f)
-        
-        all_tickets[ticket_id] = ticket_data
-        
-        with open(tickets_file, 'w') as f:
-            json.dump(all_tickets, f, indent=2)
+        get_ticket_repository().save(ticket_id, ticket_data)
         
         # Try to assign to available agent immediately
-        from app import find_best_available_agent, assign_ticket_to_agent, agents
+        from app import find_best_available_agent, assign_ticket_to_agent
         
         agent, agent_id, eta = find_best_available_agent('escalation', 'urgent')
         
@@ -276,29 +266,20 @@ def create_priority_ticket():
             })
         
         # Use ML models for intelligent categorization
-        from app import ml_models, predict_ticket_category, predict_ticket_priority
+        from app import model_registry, classify_ticket
         
-        if ml_models:
-            predicted_category = predict_ticket_category(data['description'], ml_models)
-            predicted_priority = predict_ticket_priority(data['description'], ml_models)
+        engine = model_registry.engine()
+        if engine:
+            predicted_category, predicted_priority = classify_ticket(data['description'], engine)
             
             # Override with ML predictions but keep high priority for escalated
             ticket_data['ml_category'] = predicted_category
             ticket_data['ml_priority'] = predicted_priority
+            ticket_data['model_version'] = engine.version
             ticket_data['priority'] = 'high'  # Keep high for escalated tickets
         
         # Save ticket
-        tickets_file = 'tickets.json'
-        all_tickets = {}
-        
-        if os.path.exists(tickets_file):
-            with open(tickets_file, 'r') as f:
-                all_tickets = json.load(f)
-        
-        all_tickets[ticket_id] = ticket_data
-        
-        with open(tickets_file, 'w') as f:
-            json.dump(all_tickets, f, indent=2)
+        get_ticket_repository().save(ticket_id, ticket_data)
         
         logger.info(f"✅ Priority ticket created from escalation: {ticket_id}")
         
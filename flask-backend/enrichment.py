@@ -0,0 +1,108 @@
+"""
+Ticket Enrichment
+Classify, route and notify stages run for each new ticket after its creation request has returned
+"""
+
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 'async' saves a minimal ticket and runs the stages on ENRICHMENT_WORKERS threads;
+# 'sync' runs them inside the creating request, as before
+ENRICHMENT_MODE = os.getenv('ENRICHMENT_MODE', 'async')
+ENRICHMENT_WORKERS = int(os.getenv('ENRICHMENT_WORKERS', '4'))
+
+class EnrichmentPipeline:
+    """Runs a ticket's stages in order on a thread pool, recording each stage on the ticket
+
+    stages is a list of (name, function). Each function gets the latest
+    copy of the ticket and returns the fields to update (or None). After
+    every stage those fields and the stage's status are merged into the
+    latest stored copy through update_ticket - under the repository lock,
+    so an agent's change made meanwhile is kept - and /api/status shows
+    progress as it happens. A failing stage is recorded as failed with its
+    error and the remaining stages still run - a notification can go out
+    for a ticket that kept its fallback category.
+
+    Stages waiting in the pool are lost if the process exits; their
+    tickets keep showing them as pending until resume() queues them again.
+    Stages already recorded as done or failed are not run twice.
+    """
+
+    def __init__(self, stages, load_ticket, update_ticket, on_update=None, workers=ENRICHMENT_WORKERS):
+        self.stages = stages
+        self.load_ticket = load_ticket  # ticket_id -> ticket dict or None
+        self.update_ticket = update_ticket  # (ticket_id, func) -> updated ticket or None, as repository.update()
+        self.on_update = on_update  # Called with the saved ticket after each stage
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):  # Not on Windows
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """A forked worker starts its own pool on first use - the parent's threads do not survive fork()"""
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def initial_status(self):
+        """Stage name -> pending status, for a ticket about to be enriched"""
+        return {name: {'status': 'pending'} for name, _ in self.stages}
+
+    def submit(self, ticket_id):
+        """Queue a saved ticket's stages on the pool"""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='enrichment')
+        return self.executor.submit(self.run, ticket_id)
+
+    def resume(self, tickets):
+        """Queue the tickets among (ticket_id, ticket) pairs that still have pending stages - returns how many"""
+        pending = [ticket_id for ticket_id, ticket in tickets
+                   if any(entry.get('status') == 'pending' for entry in (ticket.get('enrichment') or {}).values())]
+        for ticket_id in pending:
+            self.submit(ticket_id)
+        if pending:
+            logger.info(f"🔁 Resuming enrichment of {len(pending)} tickets")
+        return len(pending)
+
+    def run(self, ticket_id):
+        """Run every stage not yet recorded for one ticket; returns the final ticket"""
+        ticket = self.load_ticket(ticket_id)
+        for name, stage in self.stages:
+            if ticket is None:
+                logger.warning(f"Ticket {ticket_id} disappeared during enrichment")
+                return None
+            if ticket.get('enrichment', {}).get(name, {}).get('status', 'pending') != 'pending':
+                continue  # Done before a restart
+
+            started = time.perf_counter()
+            status = {'status': 'done'}
+            try:
+                updates = stage(dict(ticket)) or {}
+            except Exception as e:
+                logger.error(f"❌ Enrichment stage {name} failed for {ticket_id}: {e}")
+                updates = {}
+                status = {'status': 'failed', 'error': str(e)}
+            status['finished_at'] = datetime.now().isoformat()
+            status['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+            def merge(latest):
+                # Latest copy, under the repository lock - an agent may have changed it meanwhile
+                latest.update(updates)
+                latest['enrichment'] = {**latest.get('enrichment', {}), name: status}
+                return latest
+
+            ticket = self.update_ticket(ticket_id, merge)
+            if ticket is None:
+                continue
+            if self.on_update:
+                self.on_update(ticket)
+
+        logger.info(f"✨ Enrichment finished for {ticket_id}")
+        return ticket
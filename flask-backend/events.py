@@ -0,0 +1,209 @@
+"""
+Event Broadcaster
+Fan-out of ticket and agent events to Server-Sent Events subscribers, across worker processes
+"""
+
+import json
+import os
+import queue
+import threading
+import uuid
+import logging
+
+from persistence import STORAGE_MULTIPROCESS, file_lock
+
+logger = logging.getLogger(__name__)
+
+# Events a subscriber may have waiting before it is dropped as too slow
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', '100'))
+EVENTS_KEEPALIVE = int(os.getenv('EVENTS_KEEPALIVE', '15'))
+
+# Open streams per process. Each one holds a server thread for as long as the
+# client stays connected; further clients get a 503 and fall back to polling
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', '16'))
+
+# With STORAGE_MULTIPROCESS every worker appends its events to this file and
+# tails it for the others', checking every EVENTS_POLL_INTERVAL seconds; the
+# file is started afresh once it passes EVENTS_FILE_MAX_BYTES
+EVENTS_FILE = os.getenv('EVENTS_FILE', 'events.jsonl')
+EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', '0.5'))
+EVENTS_FILE_MAX_BYTES = int(os.getenv('EVENTS_FILE_MAX_BYTES', str(1024 * 1024)))
+
+class Subscription:
+    """One connected client's bounded event queue"""
+
+    def __init__(self, max_queue):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = False  # Set when the client fell too far behind and was disconnected
+
+class EventBroadcaster:
+    """Publishes events to every subscriber without ever blocking the publisher
+
+    Each subscriber has a queue of at most max_queue events. A subscriber whose
+    queue is full is dropped rather than slowing down the request that
+    published; its stream ends and the client reconnects and resyncs.
+
+    With shared_file set, several processes share one stream of events:
+    publish() also appends the event to the file, and a process with
+    subscribers tails the file on a background thread and delivers the
+    events the other processes wrote. Its own events are delivered
+    straight away and skipped when they come round in the file. A tailer
+    misses events only if the file is started afresh twice within one
+    poll_interval; the dashboards' /changes poll covers those.
+    """
+
+    def __init__(self, max_queue=EVENTS_QUEUE_SIZE, keepalive=EVENTS_KEEPALIVE,
+                 max_subscribers=EVENTS_MAX_SUBSCRIBERS, shared_file=None,
+                 poll_interval=EVENTS_POLL_INTERVAL, max_file_bytes=EVENTS_FILE_MAX_BYTES):
+        self.max_queue = max_queue
+        self.keepalive = keepalive  # Seconds between comment frames on an idle stream
+        self.max_subscribers = max_subscribers
+        self.shared_file = shared_file
+        self.poll_interval = poll_interval
+        self.max_file_bytes = max_file_bytes
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.event_id = 0
+        self.tail_thread = None
+        self.stopping = threading.Event()
+        self.origin = uuid.uuid4().hex  # Marks this process's own events in the shared file
+        if hasattr(os, 'register_at_fork'):  # Not on Windows
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """A forked worker starts with no subscribers and tails the file on its own thread"""
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.tail_thread = None
+        self.stopping = threading.Event()
+        self.origin = uuid.uuid4().hex
+
+    def subscribe(self):
+        """Register a new subscriber, or return None when max_subscribers are already connected"""
+        subscription = Subscription(self.max_queue)
+        with self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                return None
+            self.subscribers.add(subscription)
+            if self.shared_file and self.tail_thread is None:
+                self.tail_thread = threading.Thread(target=self._tail, args=(self._open_shared(),),
+                                                    name='event-tail', daemon=True)
+                self.tail_thread.start()
+        return subscription
+
+    def close(self):
+        """Stop tailing the shared file"""
+        self.stopping.set()
+        if self.tail_thread is not None:
+            self.tail_thread.join()
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self, event_type, data):
+        """Queue an event for every subscriber (and for the other processes' subscribers)"""
+        if self.shared_file:
+            self._append(event_type, data)
+        self._deliver(event_type, data)
+
+    def _append(self, event_type, data):
+        """Add an event to the shared file, starting a new file once it is too big"""
+        line = json.dumps({'origin': self.origin, 'event': event_type, 'data': data}) + '\n'
+        try:
+            with file_lock(self.shared_file):
+                if os.path.exists(self.shared_file) and os.path.getsize(self.shared_file) > self.max_file_bytes:
+                    # Replace rather than truncate: tailers finish reading the old file first
+                    temp_file = f"{self.shared_file}.{os.getpid()}.tmp"
+                    open(temp_file, 'w').close()
+                    os.replace(temp_file, self.shared_file)
+                with open(self.shared_file, 'a') as f:
+                    f.write(line)
+        except OSError as e:
+            logger.warning(f"Could not share {event_type} event with the other workers: {e}")
+
+    def _open_shared(self):
+        """The shared file, positioned after the events already in it"""
+        try:
+            open(self.shared_file, 'a').close()
+            f = open(self.shared_file, 'r')
+        except OSError as e:
+            logger.warning(f"Could not open the event file: {e}")
+            return None
+        f.seek(0, os.SEEK_END)
+        return f
+
+    def _tail(self, f):
+        """Deliver the events other processes append to the shared file, like tail -F"""
+        pending = ''
+        while not self.stopping.wait(self.poll_interval):
+            if f is None:
+                f = self._open_shared()
+                continue
+            try:
+                replaced = os.stat(self.shared_file).st_ino != os.fstat(f.fileno()).st_ino
+                pending += f.read()  # Up to the end, even when the file was just replaced
+                *lines, pending = pending.split('\n')
+                for line in lines:
+                    self._deliver_line(line)
+                if replaced:
+                    # Read the new file from its start
+                    f.close()
+                    f = open(self.shared_file, 'r')
+                    pending = ''
+            except OSError as e:
+                logger.warning(f"Event file tail failed: {e}")
+                f.close()
+                f = None
+                pending = ''
+        if f is not None:
+            f.close()
+
+    def _deliver_line(self, line):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if event.get('origin') != self.origin:
+            self._deliver(event['event'], event['data'])
+
+    def _deliver(self, event_type, data):
+        """Queue an event for this process's subscribers, dropping the ones that are full"""
+        with self.lock:
+            self.event_id += 1
+            frame = f"id: {self.event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+            for subscription in list(self.subscribers):
+                try:
+                    subscription.queue.put_nowait(frame)
+                except queue.Full:
+                    subscription.dropped = True
+                    self.subscribers.discard(subscription)
+                    logger.warning(f"Dropped slow event subscriber ({len(self.subscribers)} remaining)")
+
+    def stream(self, subscription):
+        """SSE frames for one subscriber until it disconnects or is dropped"""
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    yield subscription.queue.get(timeout=self.keepalive)
+                except queue.Empty:
+                    if subscription.dropped:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if subscription.dropped and subscription.queue.empty():
+                    return
+        finally:
+            self.unsubscribe(subscription)
+
+_event_broadcaster = None
+_event_broadcaster_lock = threading.Lock()
+
+def get_event_broadcaster():
+    """Get the process-wide event broadcaster"""
+    global _event_broadcaster
+    with _event_broadcaster_lock:
+        if _event_broadcaster is None:
+            _event_broadcaster = EventBroadcaster(shared_file=EVENTS_FILE if STORAGE_MULTIPROCESS else None)
+        return _event_broadcaster
@@ -0,0 +1,124 @@
+"""
+Bulk Export
+Streaming NDJSON export of tickets and chat transcripts for the analytics warehouse
+"""
+
+import json
+import os
+import zlib
+import logging
+from datetime import datetime
+
+from flask import Response
+
+from ticket_repository import encode_cursor, decode_cursor, changed_at
+
+logger = logging.getLogger(__name__)
+
+# Tickets read from the repository per page, and NDJSON lines sent per chunk
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '500'))
+
+def parse_since(since):
+    """ISO timestamp for the ?since= filter, or None - raises ValueError if malformed
+
+    Chat entries and ticket updates are stamped with naive local isoformat()
+    strings; new tickets use "YYYY-MM-DD HH:MM:SS", which changed_at()
+    rewrites with a 'T'. since is brought to that same form (a timestamp with
+    a UTC offset is converted to local time) so comparing the strings
+    compares the times.
+    """
+    if not since:
+        return None
+    try:
+        parsed = datetime.fromisoformat(since)
+    except ValueError:
+        raise ValueError(f"Invalid since timestamp: {since}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+def ticket_export_position(cursor):
+    """(revision, ticket_key) position from a ticket export cursor - raises ValueError if malformed"""
+    revision, ticket_key = decode_cursor(cursor)
+    try:
+        return int(revision), ticket_key
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def chat_export_position(cursor):
+    """(transcript path, entry index) position from a chat export cursor - raises ValueError if malformed"""
+    relative_path, index = decode_cursor(cursor)
+    try:
+        return relative_path, int(index)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def export_tickets(repository, since=None, after=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield one record per ticket in (revision, ticket_key) order
+
+    Each record carries the cursor to resume after it. A ticket changed
+    during the export moves to a later revision and is exported again, so
+    nothing is missed and the warehouse simply keeps the newest copy.
+    since keeps tickets updated (or, without updated_at, created) at or after
+    it; the export then starts at the earliest revision among those tickets
+    instead of reading the whole store.
+    """
+    if since:
+        start = repository.export_start(since)
+        if start is None:
+            return
+        if after is None or tuple(after) < start:
+            after = start
+
+    while True:
+        page = repository.export_page(after, limit=batch_size)
+        for ticket_key, ticket in page:
+            after = (ticket.get('revision', 0), ticket_key)
+            if since and changed_at(ticket) < since:
+                continue
+            yield {"id": ticket_key, "cursor": encode_cursor(list(after)), "ticket": ticket}
+        if len(page) < batch_size:
+            return
+
+def export_chat_sessions(store, since=None, after=None):
+    """Yield one record per chat entry, transcript by transcript in path order
+
+    since keeps entries timestamped at or after it; transcripts whose file
+    was last written before it are skipped without being read.
+    """
+    store.flush()
+    after_path, after_index = after or (None, -1)
+
+    for relative_path, session_id in store.list_sessions(start=after_path, modified_since=since):
+        start = after_index + 1 if relative_path == after_path else 0
+        for index, entry in store.iter_transcript(relative_path, start=start):
+            if since and entry.get('timestamp', '') < since:
+                continue
+            yield {"session_id": session_id, "cursor": encode_cursor([relative_path, index]), "entry": entry}
+
+def ndjson_chunks(records, batch_size=EXPORT_BATCH_SIZE):
+    """Encode records as NDJSON, batch_size lines per chunk"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record) + '\n')
+        if len(lines) >= batch_size:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+    if lines:
+        yield ''.join(lines).encode('utf-8')
+
+def gzip_chunks(chunks):
+    """Gzip a chunk stream, flushing after each chunk so the client can decode what it has so far"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def ndjson_response(records, compress=False):
+    """Streaming application/x-ndjson response, gzip-encoded when compress is set"""
+    chunks = ndjson_chunks(records)
+    response = Response(gzip_chunks(chunks) if compress else chunks, mimetype='application/x-ndjson')
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
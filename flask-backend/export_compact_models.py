@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Compact Model Export
+Prunes the pickled sklearn pipelines into numpy-only CompactTextClassifier files and reports their parity
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import logging
+
+import numpy as np
+
+from compact_model import CompactTextClassifier, compact_model_file, COMPACT_FORMAT_VERSION
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILES = ['models/customer_service_model.pkl', 'models/support_severity_classifier.pkl']
+HOLDOUT_FILE = 'models/holdout.json'
+
+# Weights with a smaller magnitude are dropped (0 keeps every weight, so the export
+# matches the original exactly; 'auto' drops as many as parity allows), and the export
+# is only written when the compact model agrees with the original on at least this
+# share of the parity texts
+COMPACT_MIN_WEIGHT = os.getenv('COMPACT_MIN_WEIGHT', '0')
+COMPACT_MIN_AGREEMENT = float(os.getenv('COMPACT_MIN_AGREEMENT', '0.99'))
+
+# Cuts 'auto' tries, as quantiles of the weight magnitudes: drop 5%, 10%, ... of the weights
+AUTO_PRUNE_QUANTILES = [step / 20 for step in range(1, 20)]
+
+# Synthetic parity texts built from random vocabulary terms, on top of the real ones
+PARITY_RANDOM_TEXTS = 2000
+
+def compact_pipeline(pipeline, min_weight=0.0):
+    """CompactTextClassifier for a fitted TfidfVectorizer + linear classifier pipeline
+
+    Weights below min_weight are dropped, and so are the terms left with
+    none: they no longer move any score, only the document's norm, which
+    the parity check measures along with the pruned weights. Raises
+    ValueError for pipelines the compact predictor cannot reproduce.
+    """
+    steps = getattr(pipeline, 'steps', None)
+    if not steps or len(steps) != 2:
+        raise ValueError("Expected a two-step (vectorizer, classifier) pipeline")
+    vectorizer, classifier = steps[0][1], steps[1][1]
+
+    params = vectorizer.get_params()
+    unsupported = {
+        'analyzer': params['analyzer'] != 'word',
+        'tokenizer': params['tokenizer'] is not None,
+        'preprocessor': params['preprocessor'] is not None,
+        'strip_accents': params['strip_accents'] is not None,
+        'norm': params.get('norm') not in ('l1', 'l2', None)
+    }
+    if any(unsupported.values()) or not hasattr(vectorizer, 'vocabulary_'):
+        raise ValueError(f"Unsupported vectorizer settings: {[name for name, bad in unsupported.items() if bad]}")
+    if not hasattr(classifier, 'coef_') or not hasattr(classifier, 'decision_function'):
+        raise ValueError(f"Unsupported classifier {type(classifier).__name__} - a linear model is required")
+
+    vocabulary = vectorizer.vocabulary_
+    terms = sorted(vocabulary)
+    columns = np.array([vocabulary[term] for term in terms])
+    idf = vectorizer.idf_[columns] if params.get('use_idf', False) else np.ones(len(terms))
+
+    weights = np.asarray(classifier.coef_)[:, columns].T  # term x class, in term order
+    keep = np.abs(weights) >= min_weight
+    weighted = keep.any(axis=1)
+    terms = [term for term, kept in zip(terms, weighted) if kept]
+    idf, weights, keep = idf[weighted], weights[weighted], keep[weighted]
+    rows, classes = np.nonzero(keep)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(terms)))])
+
+    stop_words = vectorizer.get_stop_words() or ()
+    config = {
+        'format_version': COMPACT_FORMAT_VERSION,
+        'token_pattern': params['token_pattern'],
+        'lowercase': params['lowercase'],
+        'ngram_range': list(params['ngram_range']),
+        'binary': params['binary'],
+        'sublinear_tf': params.get('sublinear_tf', False),
+        'norm': params.get('norm'),
+        'min_weight': min_weight
+    }
+    return CompactTextClassifier(
+        terms, idf.astype(np.float32), indptr.astype(np.int32),
+        classes.astype(np.int32), weights[keep].astype(np.float32),
+        np.asarray(classifier.intercept_, dtype=np.float32), np.asarray(classifier.classes_).astype(str),
+        sorted(stop_words), config)
+
+def vocabulary_terms(pipeline):
+    """Every term of the pipeline's vectorizer, pruned or not"""
+    return sorted(pipeline.steps[0][1].vocabulary_)
+
+def parity_texts(terms, real_texts, count=PARITY_RANDOM_TEXTS, seed=42):
+    """The real texts, every vocabulary term on its own, and random term combinations"""
+    rng = random.Random(seed)
+    synthetic = [' '.join(rng.choices(terms, k=rng.randint(2, 15))) for _ in range(count)]
+    return list(real_texts) + terms + synthetic
+
+def average_seconds(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+def startup_seconds(statement):
+    """Wall time of a fresh interpreter running one statement (imports included)"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-W', 'ignore', '-c', statement], check=True, capture_output=True)
+    return time.perf_counter() - started
+
+def agreement(pipeline, compact, texts):
+    """Share of the texts the compact model predicts the same class for as the pipeline"""
+    return float((pipeline.predict(texts).astype(str) == compact.predict(texts)).mean())
+
+def choose_min_weight(pipeline, texts, min_agreement=COMPACT_MIN_AGREEMENT):
+    """Largest AUTO_PRUNE_QUANTILES cut whose compact model still reaches min_agreement (0.0 if none does)"""
+    magnitudes = np.abs(np.asarray(pipeline.steps[-1][1].coef_))
+    chosen = 0.0
+    for quantile in AUTO_PRUNE_QUANTILES:
+        min_weight = float(np.quantile(magnitudes, quantile))
+        if agreement(pipeline, compact_pipeline(pipeline, min_weight), texts) < min_agreement:
+            break  # Agreement only falls as the cut grows
+        chosen = min_weight
+    return chosen
+
+def parity_report(pipeline, compact, model_file, compact_file, texts):
+    """Agreement, score differences, size, startup and latency of the compact model against the original"""
+    expected = pipeline.predict(texts)
+    predicted = compact.predict(texts)
+    agree = expected.astype(str) == predicted
+    score_diff = np.abs(pipeline.decision_function(texts) - compact.decision_function(texts))
+
+    one_text = texts[:1]
+    batch = texts[:500]
+    return {
+        'model_file': model_file,
+        'compact_file': compact_file,
+        'texts': len(texts),
+        'agreement': round(float(agree.mean()), 5),
+        'mismatches': [{'text': text, 'original': str(original), 'compact': str(new)}
+                       for text, original, new, same in zip(texts, expected, predicted, agree) if not same][:10],
+        'max_score_diff': round(float(score_diff.max()), 6),
+        'min_weight': compact.config['min_weight'],
+        'weights_kept': int(len(compact.data)),
+        'weights_total': int(np.asarray(pipeline.steps[-1][1].coef_).size),
+        'terms_kept': len(compact.terms),
+        'terms_total': len(pipeline.steps[0][1].vocabulary_),
+        'file_bytes': {'original': os.path.getsize(model_file), 'compact': os.path.getsize(compact_file)},
+        'startup_seconds': {
+            'original': round(startup_seconds(f"import joblib; joblib.load({model_file!r})"), 3),
+            'compact': round(startup_seconds(
+                f"from compact_model import CompactTextClassifier; CompactTextClassifier.load({compact_file!r})"), 3)
+        },
+        'predict_one_ms': {
+            'original': round(average_seconds(lambda: pipeline.predict(one_text), 200) * 1000, 4),
+            'compact': round(average_seconds(lambda: compact.predict(one_text), 200) * 1000, 4)
+        },
+        'predict_batch_ms': {
+            'batch_size': len(batch),
+            'original': round(average_seconds(lambda: pipeline.predict(batch), 10) * 1000, 3),
+            'compact': round(average_seconds(lambda: compact.predict(batch), 10) * 1000, 3)
+        }
+    }
+
+def load_real_texts(holdout_file, corpus_files):
+    """Holdout descriptions plus the descriptions in ticket snapshot files ({key: ticket})"""
+    texts = []
+    if holdout_file and os.path.exists(holdout_file):
+        with open(holdout_file, 'r', encoding='utf-8') as f:
+            texts.extend(example['description'] for example in json.load(f))
+    for corpus_file in corpus_files:
+        with open(corpus_file, 'r', encoding='utf-8') as f:
+            texts.extend(ticket['description'] for ticket in json.load(f).values() if ticket.get('description'))
+    return texts
+
+def export_model(model_file, real_texts, min_weight=COMPACT_MIN_WEIGHT, min_agreement=COMPACT_MIN_AGREEMENT):
+    """Compact one model and write it next to the original if it passes parity; returns the report
+
+    min_weight 'auto' picks the largest cut that still passes - trading up to
+    1 - min_agreement of the predictions for a smaller model.
+    """
+    import joblib
+
+    pipeline = joblib.load(model_file)
+    texts = parity_texts(vocabulary_terms(pipeline), real_texts)
+    if min_weight == 'auto':
+        min_weight = choose_min_weight(pipeline, texts, min_agreement)
+    compact = compact_pipeline(pipeline, float(min_weight))
+    compact_file = compact_model_file(model_file)
+
+    # Written under a temporary name and only moved into place after the parity check,
+    # so a running app watching the compact files never loads a rejected export
+    staged_file = compact_file + '.new.npz'
+    compact.save(staged_file)
+    report = parity_report(pipeline, CompactTextClassifier.load(staged_file), model_file, staged_file, texts)
+    report['compact_file'] = compact_file
+    report['written'] = report['agreement'] >= min_agreement
+    if report['written']:
+        os.replace(staged_file, compact_file)
+        logger.info(f"✅ {compact_file}: {report['agreement']:.2%} agreement on {report['texts']} texts, "
+                    f"{report['weights_kept']}/{report['weights_total']} weights and "
+                    f"{report['terms_kept']}/{report['terms_total']} terms kept (min weight {report['min_weight']:.4f})")
+    else:
+        os.remove(staged_file)
+        logger.error(f"❌ {model_file}: only {report['agreement']:.2%} agreement (minimum {min_agreement:.2%}) "
+                     f"- compact model not written")
+    return report
+
+def min_weight_arg(value):
+    return value if value == 'auto' else float(value)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export pruned, numpy-only versions of the ML models")
+    parser.add_argument('models', nargs='*', default=MODEL_FILES, help="Pickled pipelines to compact")
+    parser.add_argument('--min-weight', type=min_weight_arg, default=COMPACT_MIN_WEIGHT,
+                        help="Drop class weights smaller than this in magnitude ('auto': as many as parity allows)")
+    parser.add_argument('--min-agreement', type=float, default=COMPACT_MIN_AGREEMENT,
+                        help="Only write a compact model agreeing on at least this share of texts")
+    parser.add_argument('--holdout', default=HOLDOUT_FILE, help="Labelled holdout set to include in the parity texts")
+    parser.add_argument('--corpus', action='append', default=[], help="Ticket snapshot (tickets.json) to include")
+    parser.add_argument('--report', default=None, help="Also write the parity report here as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    real_texts = load_real_texts(args.holdout, args.corpus)
+    reports = []
+    for model_file in args.models:
+        try:
+            reports.append(export_model(model_file, real_texts, args.min_weight, args.min_agreement))
+        except ValueError as e:
+            logger.error(f"❌ {model_file}: {e}")
+            reports.append({'model_file': model_file, 'error': str(e), 'written': False})
+
+    print(json.dumps(reports, indent=2))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(reports, f, indent=2)
+    return 0 if all(report['written'] for report in reports) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
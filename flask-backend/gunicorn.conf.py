@@ -0,0 +1,47 @@
+"""
+Gunicorn Configuration
+Pre-forked workers sharing the ML models loaded once in the master process
+"""
+
+import gc
+import os
+
+# Set before app.py is imported: workers share the storage files, and the models
+# must be loaded before the fork rather than by a background thread that only
+# the master would run
+os.environ.setdefault('STORAGE_MULTIPROCESS', 'true')
+os.environ.setdefault('ML_WARMUP', 'eager')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+
+# An open /api/events stream holds one of a worker's threads until the client
+# leaves; keep at least half of them for ordinary requests
+os.environ.setdefault('EVENTS_MAX_SUBSCRIBERS', str(max(threads // 2, 1)))
+
+# Import app.py (and load the models) once in the master; workers inherit the
+# memory copy-on-write, and the model arrays are read-only memory maps of the
+# .pkl files, so no worker ever copies them
+preload_app = True
+
+def pre_fork(server, worker):
+    """Move everything loaded so far out of the collector's reach
+
+    A garbage collection in a worker touches the header of every tracked
+    object, which copies the page it sits on. Frozen objects are skipped, so
+    the preloaded modules and model objects stay shared.
+    """
+    gc.freeze()
+
+def post_fork(server, worker):
+    """Let the first worker re-queue enrichment stages left pending by the last run
+
+    Only one process may, or each ticket would be enriched (and its emails
+    sent) once per worker - and not at import, which preload_app does in
+    the master before any worker exists.
+    """
+    if worker.age == 1:
+        import app
+        app.resume_enrichment()
@@ -0,0 +1,44 @@
+"""
+HTTP Cache Validation
+Revision-based ETags and 304 Not Modified answers for the read-heavy JSON endpoints
+"""
+
+import hashlib
+import logging
+
+from flask import Response, make_response, request
+
+logger = logging.getLogger(__name__)
+
+def revision_etag(*parts):
+    """ETag value for a representation identified by its parts
+
+    The parts are store revision counters plus whatever selects the
+    representation (path, query string, user). They are hashed so the tag
+    stays short and contains no characters that need quoting.
+    """
+    key = '|'.join(repr(part) for part in parts)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+def conditional_response(build, *versions, private=False):
+    """Answer 304 when the client already has the current representation, else build() it
+
+    versions are the revision counters the body is derived from. They are
+    read before build() runs, so a change that lands while the body is
+    being built only makes the tag older than the body, never newer - the
+    next request then fetches again instead of keeping a stale copy.
+    Only 200 responses are tagged; errors pass through untouched.
+    """
+    etag = revision_etag(request.path, sorted(request.args.items(multi=True)), *versions)
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag, weak=True)
+    # Let browsers keep the body but revalidate on every use
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return response
@@ -67,7 +67,7 @@ def add_jotform_escalation(app: Flask):
             is_escalated = escalation_context.get('escalated', False)
             
             # Import existing chatbot logic
-            from app import prashna, chat_sessions, save_chat_sessions
+            from app import prashna
             
             # Process message with escalation context
             if is_escalated:
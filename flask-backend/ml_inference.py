@@ -0,0 +1,411 @@
+"""
+ML Inference
+Runs the ticket classifiers with one featurization pass per distinct vectorizer
+"""
+
+import hashlib
+import os
+import pickle
+import queue
+import re
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Micro-batching of single-ticket predictions: a request waits at most ML_BATCH_WAIT_MS
+# for others to join its batch, and a batch holds at most ML_BATCH_MAX descriptions
+# (ML_BATCH_MAX=1 turns batching off)
+ML_BATCH_WAIT_MS = float(os.getenv('ML_BATCH_WAIT_MS', '5'))
+ML_BATCH_MAX = int(os.getenv('ML_BATCH_MAX', '32'))
+
+# Seconds a request waits for its batch before predicting on its own thread instead
+ML_BATCH_TIMEOUT = float(os.getenv('ML_BATCH_TIMEOUT', '2'))
+
+# Predictions remembered per normalized description (0 turns the cache off)
+ML_CACHE_SIZE = int(os.getenv('ML_CACHE_SIZE', '10000'))
+
+# Map model output to our categories
+CATEGORY_MAPPING = {
+    'technical': 'Technical Help & Troubleshooting',
+    'billing': 'Billing & Account Questions',
+    'warranty': 'Warranty & Repairs',
+    'setup': 'Product Setup & Software',
+    'returns': 'Returns, Cancellations & Swaps',
+    'shipping': 'Shipping & Delivery',
+    'general': 'General Assistance'
+}
+
+# Map model output to our priority levels
+PRIORITY_MAPPING = {
+    'low': 'low',
+    'medium': 'medium', 
+    'high': 'high',
+    'urgent': 'urgent',
+    'critical': 'urgent'  # Map critical to urgent
+}
+
+def map_category(category):
+    """Our category name for a categorization model label"""
+    return CATEGORY_MAPPING.get(category.lower(), category)
+
+def map_priority(priority):
+    """Our priority level for a severity model label"""
+    return PRIORITY_MAPPING.get(priority.lower(), priority.lower())
+
+class StageTimings:
+    """Call counts and wall-clock time per inference stage"""
+
+    def __init__(self):
+        self.stages = {}  # stage -> [calls, total seconds, last seconds]
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self.lock:
+            calls, total, _ = self.stages.get(stage, (0, 0.0, 0.0))
+            self.stages[stage] = [calls + 1, total + seconds, seconds]
+
+    def snapshot(self):
+        """Stage -> calls, total_ms, avg_ms and last_ms"""
+        with self.lock:
+            return {
+                stage: {
+                    'calls': calls,
+                    'total_ms': round(total * 1000, 3),
+                    'avg_ms': round(total * 1000 / calls, 3),
+                    'last_ms': round(last * 1000, 3)
+                }
+                for stage, (calls, total, last) in self.stages.items()
+            }
+
+class MicroBatcher:
+    """Collects concurrent single predictions into batches run on one dispatcher thread
+
+    submit() queues an item and returns a Future. The dispatcher takes the
+    first waiting item, gathers more for up to max_wait seconds or until
+    max_batch items, runs predict_batch once and resolves every Future -
+    with the exception, if the batch failed. A lone request therefore
+    waits at most max_wait longer than an unbatched one.
+
+    The thread is started on first use, so a process forked after import
+    (gunicorn --preload) starts its own. close() ends it once the queued
+    items are done, releasing predict_batch (and the models behind it);
+    items submitted after that are predicted on the caller's thread.
+    """
+
+    STOP = object()  # Queued by close()
+
+    def __init__(self, predict_batch, max_batch=ML_BATCH_MAX, max_wait=ML_BATCH_WAIT_MS / 1000):
+        self.predict_batch = predict_batch  # Called with a list of items, returns a list of results
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    def submit(self, item):
+        """Queue one item for the next batch"""
+        future = Future()
+        with self.lock:
+            if not self.closed:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self._run, name='ml-batcher', daemon=True)
+                    self.thread.start()
+                self.queue.put((item, future))
+                return future
+
+        try:
+            future.set_result(self.predict_batch([item])[0])
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        """Stop the dispatcher after the items already queued"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self.thread is not None and self.thread.is_alive():
+                self.queue.put(self.STOP)
+
+    def _collect(self):
+        """Block for the first item, then gather more until the batch is full or max_wait passes
+
+        Returns (batch, stop) - stop is set once close()'s marker was reached.
+        """
+        item = self.queue.get()
+        if item is self.STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is self.STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if not batch:
+                continue
+            try:
+                results = self.predict_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch': round(self.items / self.batches, 2) if self.batches else 0,
+            'largest_batch': self.largest_batch,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000
+        }
+
+def files_signature(paths):
+    """(path, mtime, size) of each file - changes whenever a model file is replaced"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+def signature_version(signature):
+    """Short version string for a files_signature()"""
+    return hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:12]
+
+def model_version(paths):
+    """Short version string for the model files as they are on disk now"""
+    return signature_version(files_signature(paths))
+
+def normalize_description(description):
+    """Case- and whitespace-folded text - the vectorizers lowercase and split on word characters,
+    so descriptions that only differ in these ways get the same prediction"""
+    return re.sub(r'\s+', ' ', description).strip().lower()
+
+class PredictionCache:
+    """Bounded LRU of predictions keyed by a hash of the normalized description and model version
+
+    With model_files set, every lookup batch first checks the files' mtime
+    and size; if any model file changed, the whole cache is dropped so no
+    prediction made by replaced models is served.
+    """
+
+    def __init__(self, max_entries=ML_CACHE_SIZE, model_files=None):
+        self.max_entries = max_entries
+        self.model_files = model_files or []
+        self.signature = files_signature(self.model_files)
+        self.entries = OrderedDict()  # key -> {model name: label}, least recent first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def key(self, version, description):
+        text = f"{version}\0{normalize_description(description)}"
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def check(self):
+        """Drop everything if a model file changed since the last check"""
+        signature = files_signature(self.model_files)
+        if signature == self.signature:
+            return
+        with self.lock:
+            self.entries.clear()
+            self.signature = signature
+            self.invalidations += 1
+        logger.info("♻️ Model files changed - prediction cache cleared")
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'invalidations': self.invalidations
+            }
+
+def split_pipeline(model):
+    """(featurizer, head) of a fitted model - featurizer is None when the model takes raw text"""
+    steps = getattr(model, 'steps', None)
+    if not steps or len(steps) < 2:
+        return None, model
+    return model[:-1], steps[-1][1]
+
+def featurizer_key(featurizer):
+    """Fingerprint of a fitted featurizer - equal keys produce identical feature matrices"""
+    if featurizer is None:
+        return None
+    return hashlib.sha1(pickle.dumps(featurizer)).hexdigest()
+
+class InferenceEngine:
+    """Classifier heads sharing featurization where their fitted vectorizers are identical
+
+    Each model is split into its featurizing stages and its final estimator.
+    Featurizers with the same fitted state (parameters, vocabulary, idf)
+    are run once per call and their sparse matrix is handed to every head
+    that uses them. Each featurize and predict stage is timed.
+
+    predict_one() serves single-ticket requests through a MicroBatcher, so
+    concurrent requests share one vectorized predict. predict_one() and
+    predict_items() answer repeated descriptions from the optional cache.
+    """
+
+    def __init__(self, models, max_batch=ML_BATCH_MAX, max_wait=ML_BATCH_WAIT_MS / 1000,
+                 version='unversioned', cache=None, batch_timeout=ML_BATCH_TIMEOUT):
+        self.version = version  # Part of every cache key
+        self.cache = cache
+        self.batch_timeout = batch_timeout
+        self.batch_timeouts = 0
+        self.heads = {}  # model name -> (featurizer key, estimator)
+        self.featurizers = {}  # featurizer key -> (featurizer, stage name)
+        self.timings = StageTimings()
+
+        users = {}
+        for name, model in models.items():
+            featurizer, head = split_pipeline(model)
+            key = featurizer_key(featurizer)
+            self.heads[name] = (key, head)
+            if featurizer is not None:
+                self.featurizers.setdefault(key, featurizer)
+                users.setdefault(key, []).append(name)
+
+        for key, names in users.items():
+            self.featurizers[key] = (self.featurizers[key], f"featurize:{'+'.join(names)}")
+            if len(names) > 1:
+                logger.info(f"🔗 Models {', '.join(names)} share one featurization pass")
+        if len(users) > 1:
+            logger.info(f"ℹ️ {len(users)} distinct vectorizers - each is run once per prediction")
+
+        self.batcher = MicroBatcher(self._predict_items, max_batch, max_wait) if max_batch > 1 else None
+
+    def predict(self, descriptions, names=None):
+        """Model name -> list of predicted labels for a list of descriptions"""
+        names = names or list(self.heads)
+
+        features = {None: descriptions}  # Models without a featurizer take the raw text
+        for key in {self.heads[name][0] for name in names} - {None}:
+            featurizer, stage = self.featurizers[key]
+            started = time.perf_counter()
+            features[key] = featurizer.transform(descriptions)
+            self.timings.record(stage, time.perf_counter() - started)
+
+        predictions = {}
+        for name in names:
+            key, head = self.heads[name]
+            started = time.perf_counter()
+            predictions[name] = list(head.predict(features[key]))
+            self.timings.record(f"predict:{name}", time.perf_counter() - started)
+        return predictions
+
+    def _predict_items(self, descriptions):
+        """Per-description {model name: label} dicts"""
+        predictions = self.predict(descriptions)
+        return [{name: labels[position] for name, labels in predictions.items()}
+                for position in range(len(descriptions))]
+
+    def _predict_uncached(self, description):
+        if self.batcher is None:
+            return self._predict_items([description])[0]
+        try:
+            return self.batcher.submit(description).result(timeout=self.batch_timeout)
+        except FutureTimeoutError:
+            # The dispatcher is stuck behind a slow batch - don't hold the request for it
+            self.batch_timeouts += 1
+            logger.warning(f"⏱️ No batched prediction within {self.batch_timeout}s - predicting directly")
+            return self._predict_items([description])[0]
+
+    def close(self):
+        """Stop the micro-batching thread - called when the registry drops this engine's version"""
+        if self.batcher is not None:
+            self.batcher.close()
+
+    def predict_one(self, description):
+        """Model name -> label for one description, from the cache or batched with concurrent callers"""
+        if self.cache is None:
+            return self._predict_uncached(description)
+
+        self.cache.check()
+        key = self.cache.key(self.version, description)
+        prediction = self.cache.get(key)
+        if prediction is None:
+            prediction = self._predict_uncached(description)
+            self.cache.put(key, prediction)
+        return prediction
+
+    def predict_items(self, descriptions):
+        """Per-description {model name: label} dicts, predicting only what the cache doesn't have"""
+        if self.cache is None:
+            return self._predict_items(descriptions)
+
+        self.cache.check()
+        keys = [self.cache.key(self.version, description) for description in descriptions]
+        found = {key: self.cache.get(key) for key in dict.fromkeys(keys)}
+        missing = [key for key, prediction in found.items() if prediction is None]
+
+        if missing:
+            texts = {key: description for key, description in zip(keys, descriptions)}
+            for key, prediction in zip(missing, self._predict_items([texts[key] for key in missing])):
+                found[key] = prediction
+                self.cache.put(key, prediction)
+        return [found[key] for key in keys]
+
+    def stats(self):
+        """Featurizer sharing, per-stage timings and micro-batching counters"""
+        return {
+            'models': list(self.heads),
+            'featurizers': [stage for _, stage in self.featurizers.values()],
+            'timings': self.timings.snapshot(),
+            'batching': {**self.batcher.stats(), 'timeouts': self.batch_timeouts} if self.batcher else None,
+            'cache': self.cache.stats() if self.cache else None,
+            'version': self.version
+        }
@@ -0,0 +1,18 @@
+"""
+ML Test Fixtures
+Labelled descriptions and small fitted pipelines shared by the offline ML tests
+"""
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+TEXTS = ["my laptop will not boot", "I was charged twice this month", "refund my invoice please",
+         "the screen is flickering", "server down everything broken", "question about my plan"]
+CATEGORIES = ['technical', 'billing', 'billing', 'technical', 'technical', 'general']
+PRIORITIES = ['High', 'Medium', 'Low', 'Medium', 'Urgent', 'Low']
+
+def fit_pipeline(labels, texts=TEXTS, C=1.0, **vectorizer_params):
+    """TfidfVectorizer + LogisticRegression pipeline, the shape of the shipped models, fitted on texts"""
+    return Pipeline([('tfidf', TfidfVectorizer(**vectorizer_params)),
+                     ('clf', LogisticRegression(C=C))]).fit(texts, labels)
@@ -0,0 +1,362 @@
+"""
+Model Registry
+Versioned ML models that are reloaded, validated and swapped in without a restart
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import logging
+from datetime import datetime
+
+from ml_inference import InferenceEngine, files_signature, signature_version
+from persistence import atomic_write_json, file_lock
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the model files for a new version (0 turns watching off)
+ML_MODEL_WATCH_INTERVAL = float(os.getenv('ML_MODEL_WATCH_INTERVAL', '5'))
+
+# Labelled descriptions a new version is scored on before it goes live. Each model
+# must reach its ML_HOLDOUT_MIN_ACCURACY floor (name=floor pairs, a bare number for
+# any model not named) and score at most ML_HOLDOUT_MAX_DROP below the version it
+# replaces. The floors sit well above chance: 0.2 for 5 categories, 0.25 for 4 priorities
+ML_HOLDOUT_FILE = os.getenv('ML_HOLDOUT_FILE', 'models/holdout.json')
+ML_HOLDOUT_MIN_ACCURACY = os.getenv('ML_HOLDOUT_MIN_ACCURACY', 'categorization=0.5,priority=0.3')
+ML_HOLDOUT_MAX_DROP = float(os.getenv('ML_HOLDOUT_MAX_DROP', '0.1'))
+
+# The version every worker should serve (and whether a rollback pinned it), kept
+# next to a versions/ directory holding the files of the active and previous versions
+ML_MODEL_STATE_FILE = os.getenv('ML_MODEL_STATE_FILE', 'models/active.json')
+
+class ModelValidationError(Exception):
+    """A model version that could not be loaded or did not pass the holdout check"""
+
+def parse_min_accuracy(value):
+    """Model name -> holdout accuracy floor from "0.3" or "categorization=0.5,priority=0.3"
+
+    A bare number is the floor of every model not named (None key);
+    raises ValueError if malformed.
+    """
+    floors = {}
+    for part in str(value).split(','):
+        if not part.strip():
+            continue
+        name, _, floor = part.rpartition('=')
+        floors[name.strip() or None] = float(floor)
+    return floors
+
+def load_holdout(holdout_file):
+    """[{"description": ..., "labels": {model name: label}}] from the holdout file ([] if missing)"""
+    if not holdout_file or not os.path.exists(holdout_file):
+        return []
+    with open(holdout_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def score_holdout(engine, holdout):
+    """Model name -> accuracy on the holdout examples labelled for that model"""
+    if not holdout:
+        return {}
+    predictions = engine.predict([example['description'] for example in holdout])
+    accuracy = {}
+    for name, labels in predictions.items():
+        pairs = [(str(label).lower(), str(example['labels'][name]).lower())
+                 for label, example in zip(labels, holdout) if name in example.get('labels', {})]
+        if pairs:
+            accuracy[name] = round(sum(predicted == expected for predicted, expected in pairs) / len(pairs), 3)
+    return accuracy
+
+class ModelVersion:
+    """One loaded set of models with its inference engine and holdout scores"""
+
+    def __init__(self, version, engine, accuracy, signature, files):
+        self.version = version
+        self.engine = engine
+        self.accuracy = accuracy  # Model name -> holdout accuracy
+        self.signature = signature  # Model files signature the version was loaded from (None if followed)
+        self.files = files  # Paths the models were loaded from
+        self.loaded_at = datetime.now().isoformat()
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'accuracy': self.accuracy,
+            'loaded_at': self.loaded_at
+        }
+
+class ModelRegistry:
+    """The active model version plus the one it replaced, swapped without a restart
+
+    reload() loads the model files with load_models() on the calling thread
+    (the watcher's or an admin request's) while requests keep using the
+    active version. The new version runs one warm-up prediction, is scored
+    on the holdout set and only then replaces the active version in a
+    single assignment - a request that already took the old engine simply
+    finishes with it. The replaced version stays loaded for rollback().
+
+    The watcher reloads once the model files have changed and then stayed
+    unchanged for a whole interval, so a file still being copied is not
+    loaded half-written. A version that fails is not retried until the
+    files change again.
+
+    Each process has its own registry. With state_file set they agree on
+    one version: every activation hard-links the version's files into
+    versions/<version>/ beside the state file and records it there, and
+    each watcher switches to whatever version the file names - the
+    previous one by a swap, any other by loading its archived files. A
+    rollback pins its version: no new model files are picked up until an
+    explicit reload(force=True). load_initial() starts from the recorded
+    version, so reloads and rollbacks also survive a restart.
+
+    New model files must be moved into place (written elsewhere, then
+    renamed over the old ones): the active version may be memory-mapped
+    from the old files, and overwriting them in place would change it.
+    """
+
+    def __init__(self, model_files, load_models, cache=None, holdout_file=ML_HOLDOUT_FILE,
+                 min_accuracy=ML_HOLDOUT_MIN_ACCURACY, max_drop=ML_HOLDOUT_MAX_DROP,
+                 watch_interval=ML_MODEL_WATCH_INTERVAL, state_file=None):
+        self.model_files = model_files
+        self.load_models = load_models  # paths -> {model name: fitted model}, or None on failure
+        self.cache = cache  # Shared by every version - cache keys include the version
+        self.holdout_file = holdout_file
+        self.min_accuracy = min_accuracy if isinstance(min_accuracy, dict) else parse_min_accuracy(min_accuracy)
+        self.max_drop = max_drop
+        self.watch_interval = watch_interval
+        self.state_file = state_file
+        self.archive_dir = os.path.join(os.path.dirname(state_file), 'versions') if state_file else None
+        self.active = None
+        self.previous = None
+        self.pinned = False  # A rollback holds the active version until a forced reload
+        self.attempted_signature = None  # Files signature of the last load attempt
+        self.last_error = None
+        self.reloads = 0
+        self.rollbacks = 0
+        self.reload_lock = threading.Lock()  # One load or swap at a time
+        self.ready = threading.Event()  # Set once the first load attempt has finished
+        self.stopping = threading.Event()
+        self.thread = None
+        if hasattr(os, 'register_at_fork'):  # Not on Windows
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """Fresh lock and watcher in a forked worker - the parent's thread does not survive fork()"""
+        self.reload_lock = threading.Lock()
+        self.stopping = threading.Event()
+        if self.thread is not None:
+            self.thread = None
+            self.watch()
+
+    def engine(self):
+        """Inference engine of the active version, or None before the first successful load"""
+        active = self.active
+        return active.engine if active else None
+
+    def reload(self, force=False):
+        """Load, validate and activate the model files - raises ModelValidationError if rejected
+
+        Without force nothing is loaded when the files are the ones the
+        active version came from, or while a rollback has pinned it.
+        """
+        with self.reload_lock, file_lock(self.state_file, enabled=bool(self.state_file)):
+            self._follow(self._read_state())  # Another worker may have activated these files already
+            signature = files_signature(self.model_files)
+            version = signature_version(signature)
+            self.attempted_signature = signature
+            if not force and self.active and (self.pinned or version == self.active.version):
+                return self.active
+
+            try:
+                files = self._archive(version) if self.state_file else self.model_files
+                candidate = self._load_version(version, files, signature)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"❌ Model version rejected: {e}")
+                if self.state_file and version not in {v.version for v in (self.active, self.previous) if v}:
+                    shutil.rmtree(os.path.join(self.archive_dir, version), ignore_errors=True)
+                raise
+
+            self._activate(candidate)
+            self.pinned = False
+            self._write_state()
+            self.last_error = None
+            self.reloads += 1
+            logger.info(f"🔄 Model version {candidate.version} is now active {candidate.accuracy}")
+            return candidate
+
+    def _activate(self, candidate):
+        if self.previous is not None:
+            self.previous.engine.close()  # Dropped for good - let its batcher thread and models go
+        self.previous, self.active = self.active, candidate
+
+    def _load_version(self, version, files, signature=None, check=True):
+        started = time.perf_counter()
+        models = self.load_models(files)
+        if not models:
+            raise ModelValidationError(f"Model files for version {version} could not be loaded")
+
+        engine = InferenceEngine(models, version=version, cache=self.cache)
+        try:
+            accuracy = self._validate(engine, version, check)
+        except Exception:
+            engine.close()
+            raise
+
+        logger.info(f"🤖 Model version {version} loaded and validated in {time.perf_counter() - started:.2f}s")
+        return ModelVersion(version, engine, accuracy, signature, files)
+
+    def _validate(self, engine, version, check=True):
+        """Warm up and score a candidate engine - returns its holdout accuracy, raises ModelValidationError if rejected"""
+        engine.predict(["warm up"])  # First predict pays one-off setup costs
+        accuracy = score_holdout(engine, load_holdout(self.holdout_file))
+        if not check:
+            return accuracy  # Already validated by the worker that activated it
+
+        for name, score in accuracy.items():
+            floor = self.min_accuracy.get(name, self.min_accuracy.get(None, 0))
+            if score < floor:
+                raise ModelValidationError(
+                    f"Model {name} of version {version} scored {score} on the holdout set, "
+                    f"below the minimum {floor}")
+            current = self.active.accuracy.get(name) if self.active else None
+            if current is not None and score < current - self.max_drop:
+                raise ModelValidationError(
+                    f"Model {name} of version {version} scored {score} on the holdout set, "
+                    f"more than {self.max_drop} below the active version's {current}")
+        return accuracy
+
+    def rollback(self):
+        """Swap the previous version back in and pin it - raises ValueError if there is none"""
+        with self.reload_lock, file_lock(self.state_file, enabled=bool(self.state_file)):
+            state = self._read_state()
+            self._follow(state)
+            if self.previous is None and state and state.get('previous'):
+                # Restarted since: load the previous version from its archived files
+                previous = state['previous']
+                self.previous = self._load_version(previous['version'], previous['files'], check=False)
+            if self.previous is None:
+                raise ValueError("No previous model version to roll back to")
+            self.active, self.previous = self.previous, self.active
+            self.pinned = True
+            self._write_state()
+            self.rollbacks += 1
+            logger.info(f"⏪ Rolled back to model version {self.active.version}")
+            return self.active
+
+    def sync(self):
+        """Switch to the version recorded in the state file, if another process changed it"""
+        with self.reload_lock:
+            self._follow(self._read_state())
+
+    def _read_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return None
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read the model state file: {e}")
+            return None
+
+    def _follow(self, state):
+        """Make the state file's version active here too (call with reload_lock held)"""
+        if not state or not state.get('active'):
+            return
+        self.pinned = state.get('pinned', False)
+        version = state['active']['version']
+        if self.active and self.active.version == version:
+            return
+        if self.previous and self.previous.version == version:
+            self.active, self.previous = self.previous, self.active
+        else:
+            try:
+                self._activate(self._load_version(version, state['active']['files'], check=False))
+            except Exception as e:
+                logger.error(f"❌ Could not switch to model version {version}: {e}")
+                return
+        logger.info(f"🔁 Switched to model version {version}, recorded in {self.state_file}")
+
+    def _archive(self, version):
+        """Hard-link the model files into versions/<version>/ - returns the archived paths"""
+        directory = os.path.join(self.archive_dir, version)
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for path in self.model_files:
+            target = os.path.join(directory, os.path.basename(path))
+            if not os.path.exists(target):
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copy2(path, target)  # Another filesystem, or no hard links
+            files.append(target)
+        return files
+
+    def _write_state(self):
+        """Record the active and previous versions and drop the other archived ones"""
+        if not self.state_file:
+            return
+        kept = [version for version in (self.active, self.previous) if version is not None]
+        atomic_write_json(self.state_file, {
+            'active': {'version': self.active.version, 'files': self.active.files},
+            'previous': {'version': self.previous.version, 'files': self.previous.files} if self.previous else None,
+            'pinned': self.pinned,
+            'updated_at': datetime.now().isoformat()
+        }, fsync=True)
+        for name in os.listdir(self.archive_dir):
+            if name not in {version.version for version in kept}:
+                shutil.rmtree(os.path.join(self.archive_dir, name), ignore_errors=True)
+
+    def load_initial(self):
+        """First load at startup, from the recorded version if there is one; failures leave the
+        registry without models and are logged"""
+        try:
+            self.reload()
+        except Exception:
+            pass
+        finally:
+            self.ready.set()
+
+    def watch(self):
+        """Start the thread that reloads when the model files change"""
+        if self.watch_interval <= 0 or self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        self.thread.start()
+
+    def _watch(self):
+        seen = files_signature(self.model_files)
+        state_seen = files_signature([self.state_file]) if self.state_file else None
+        while not self.stopping.wait(self.watch_interval):
+            if self.state_file and files_signature([self.state_file]) != state_seen:
+                state_seen = files_signature([self.state_file])
+                self.sync()
+
+            signature = files_signature(self.model_files)
+            if signature != seen:
+                seen = signature  # Still being written? Wait for it to settle for one interval
+                continue
+            if signature == self.attempted_signature:
+                continue
+            try:
+                self.reload()
+            except Exception:
+                pass  # Logged by reload(); the active version keeps serving
+
+    def stop(self):
+        self.stopping.set()
+
+    def status(self):
+        """Active and previous versions, the last rejection and reload counters"""
+        active, previous = self.active, self.previous
+        return {
+            'active': active.to_dict() if active else None,
+            'previous': previous.to_dict() if previous else None,
+            'ready': self.ready.is_set(),
+            'pinned': self.pinned,
+            'last_error': self.last_error,
+            'reloads': self.reloads,
+            'rollbacks': self.rollbacks,
+            'watch_interval': self.watch_interval
+        }
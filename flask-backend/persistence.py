@@ -0,0 +1,209 @@
+"""
+Persistence Manager
+Group-commit flushing of the JSON stores from a background thread
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Durability: 'sync' flushes (and fsyncs) on the request thread, 'group' batches
+# changes and flushes them from a background thread every PERSISTENCE_FLUSH_INTERVAL
+# seconds, or as soon as PERSISTENCE_MAX_PENDING changes are waiting
+PERSISTENCE_MODE = os.getenv('PERSISTENCE_MODE', 'group')
+PERSISTENCE_FLUSH_INTERVAL = float(os.getenv('PERSISTENCE_FLUSH_INTERVAL', '0.1'))
+PERSISTENCE_MAX_PENDING = int(os.getenv('PERSISTENCE_MAX_PENDING', '200'))
+
+# Seconds between runs of the periodic tasks (idle session eviction) on the flusher thread
+PERSISTENCE_HOUSEKEEPING_INTERVAL = float(os.getenv('PERSISTENCE_HOUSEKEEPING_INTERVAL', '30'))
+
+# Set when several worker processes (e.g. gunicorn -w 4) share the same data files
+STORAGE_MULTIPROCESS = os.getenv('STORAGE_MULTIPROCESS', 'false').lower() in ('1', 'true', 'yes')
+
+@contextmanager
+def file_lock(path, enabled=True):
+    """Hold an exclusive advisory lock on <path>.lock for the duration of the block
+
+    Locks are per open file, so nested file_lock() calls on the same path
+    from one process deadlock - take the lock once around the whole operation.
+    """
+    if not enabled:
+        yield
+        return
+
+    with open(f"{path}.lock", 'a+') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10 seconds
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def atomic_write_json(path, data, indent=2, fsync=False):
+    """Write JSON to a temp file and rename it over the target"""
+    temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # Unique per writer
+    with open(temp_file, 'w') as f:
+        json.dump(data, f, indent=indent)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(temp_file, path)
+
+class PersistenceManager:
+    """Tracks dirty stores and flushes them in sync or group-commit mode
+
+    The background thread also runs the registered periodic tasks every
+    housekeeping_interval seconds, in either mode, so idle state is released
+    even when no request arrives to trigger it.
+    """
+
+    def __init__(self, mode=PERSISTENCE_MODE, flush_interval=PERSISTENCE_FLUSH_INTERVAL,
+                 max_pending=PERSISTENCE_MAX_PENDING, housekeeping_interval=PERSISTENCE_HOUSEKEEPING_INTERVAL):
+        if mode not in ('sync', 'group'):
+            logger.warning(f"Unknown PERSISTENCE_MODE '{mode}', using group commit")
+            mode = 'group'
+        self.mode = mode
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.housekeeping_interval = housekeeping_interval
+        self.stores = {}  # name -> flush function taking fsync
+        self.periodic = {}  # name -> function run every housekeeping_interval
+        self.dirty = set()
+        self.pending = 0  # Changes marked since the last flush
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.running = False
+        if hasattr(os, 'register_at_fork'):  # Not on Windows
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """Fresh locks and flusher thread in a forked worker (gunicorn --preload)
+
+        Only the forking thread survives fork(), so the parent's flusher is
+        gone and a lock it held at that moment would never be released.
+        """
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        if self.running:
+            self.running = False
+            self.start()
+
+    def register(self, name, flush_func):
+        """Register a store's flush function, called as flush_func(fsync)"""
+        self.stores[name] = flush_func
+
+    def register_periodic(self, name, func):
+        """Register a task the background thread runs every housekeeping_interval seconds"""
+        self.periodic[name] = func
+
+    def mark_dirty(self, name):
+        """Record that a store has unflushed changes"""
+        if self.mode == 'sync' or not self.running:
+            self.flush([name])
+            return
+
+        with self.lock:
+            self.dirty.add(name)
+            self.pending += 1
+            if self.pending >= self.max_pending:
+                self.wakeup.set()
+
+    def flush(self, names=None):
+        """Flush the given stores now (every dirty store when names is None)"""
+        with self.lock:
+            if names is None:
+                names = set(self.dirty)
+            self.dirty.difference_update(names)
+            self.pending = 0
+
+        with self.flush_lock:
+            for name in names:
+                try:
+                    self.stores[name](True)
+                except Exception as e:
+                    logger.error(f"Failed to flush {name}: {e}")
+                    with self.lock:
+                        self.dirty.add(name)  # Retry on the next flush
+
+    def start(self):
+        """Start the background thread: the group-commit flusher and the periodic tasks
+
+        In sync mode the thread only runs the periodic tasks, and is not
+        started when there are none.
+        """
+        if self.running or (self.mode != 'group' and not self.periodic):
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='persistence-flusher', daemon=True)
+        self.thread.start()
+        if self.mode == 'group':
+            logger.info(f"Group-commit flusher started (every {self.flush_interval}s or {self.max_pending} changes)")
+
+    def _run(self):
+        interval = self.flush_interval if self.mode == 'group' else self.housekeeping_interval
+        next_housekeeping = time.monotonic() + self.housekeeping_interval
+        while self.running:
+            self.wakeup.wait(min(interval, self.housekeeping_interval))
+            self.wakeup.clear()
+            with self.lock:
+                names = set(self.dirty)
+            if names:
+                self.flush(names)
+            if time.monotonic() >= next_housekeeping:
+                next_housekeeping = time.monotonic() + self.housekeeping_interval
+                self.run_periodic()
+
+    def run_periodic(self):
+        """Run every periodic task now"""
+        for name, func in list(self.periodic.items()):
+            try:
+                func()
+            except Exception as e:
+                logger.error(f"Periodic task {name} failed: {e}")
+
+    def stop(self):
+        """Stop the background flusher and flush everything that is pending"""
+        self.running = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+        self.flush()
+
+_persistence_manager = None
+_persistence_manager_lock = threading.Lock()
+
+def get_persistence_manager():
+    """Get the process-wide persistence manager"""
+    global _persistence_manager
+    with _persistence_manager_lock:
+        if _persistence_manager is None:
+            _persistence_manager = PersistenceManager()
+        return _persistence_manager
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Ticket Re-classification Job
+Re-scores every stored ticket with the current ML models and writes the category/priority changes back
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+from ml_inference import InferenceEngine, files_signature, signature_version, map_category, map_priority
+from persistence import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_MODEL_FILE = 'models/customer_service_model.pkl'
+PRIORITY_MODEL_FILE = 'models/support_severity_classifier.pkl'
+
+# Tickets per batch sent to a worker, and where progress is saved between batches
+RECLASSIFY_BATCH_SIZE = int(os.getenv('RECLASSIFY_BATCH_SIZE', '500'))
+RECLASSIFY_CHECKPOINT_FILE = os.getenv('RECLASSIFY_CHECKPOINT_FILE', 'reclassify_checkpoint.json')
+
+FIELDS = ('category', 'priority')
+
+def load_models(category_model_file, priority_model_file):
+    """Load both models with their arrays memory-mapped, as the app does"""
+    import joblib
+    return {
+        'categorization': joblib.load(category_model_file, mmap_mode='r'),
+        'priority': joblib.load(priority_model_file, mmap_mode='r')
+    }
+
+_worker_engine = None  # Each pool worker's own inference engine
+
+def init_worker(model_files):
+    """Pool initializer: load the models once per worker"""
+    global _worker_engine
+    _worker_engine = InferenceEngine(load_models(*model_files), max_batch=1)
+
+def classify_batch(descriptions):
+    """(category, priority) per description, run in a pool worker"""
+    predictions = _worker_engine.predict(descriptions)
+    return [(map_category(category), map_priority(priority))
+            for category, priority in zip(predictions['categorization'], predictions['priority'])]
+
+def classified_fields(ticket):
+    """Ticket field the classifier's category and priority are stored in
+
+    Escalated tickets keep their forced priority and carry the predictions
+    in ml_category/ml_priority instead.
+    """
+    if 'ml_category' in ticket or 'ml_priority' in ticket:
+        return {'category': 'ml_category', 'priority': 'ml_priority'}
+    return {'category': 'category', 'priority': 'priority'}
+
+def ticket_diff(ticket, category, priority, fields):
+    """{ticket field: (old, new)} for the selected fields whose prediction differs"""
+    predicted = {'category': category, 'priority': priority}
+    targets = classified_fields(ticket)
+    return {targets[field]: (ticket.get(targets[field]), predicted[field])
+            for field in fields if ticket.get(targets[field]) != predicted[field]}
+
+def load_checkpoint(checkpoint_file):
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return None
+    with open(checkpoint_file, 'r') as f:
+        return json.load(f)
+
+def ticket_position(ticket_key, ticket):
+    """(created_at, ticket_key) cursor position of a ticket in the newest-first order"""
+    return [ticket.get('created_at') or '', ticket_key]
+
+def iter_batches(repository, before, batch_size):
+    """Pages of (ticket_key, ticket), newest first, starting after the cursor position before
+
+    Saves never change a ticket's (created_at, ticket_key), so a ticket the
+    app - or this job - updates mid-run keeps its place and is visited
+    exactly once. Tickets created after the run started sort ahead of the
+    cursor and are left alone: the app classified them with these models.
+    """
+    while True:
+        page, before = repository.query_tickets(limit=batch_size, cursor=before)
+        if page:
+            yield page
+        if before is None:
+            return
+
+def reclassify(repository, model_files, workers=None, batch_size=RECLASSIFY_BATCH_SIZE,
+               checkpoint_file=RECLASSIFY_CHECKPOINT_FILE, resume=False, dry_run=False,
+               fields=FIELDS, diff_file=None, max_batches=None):
+    """Re-score every ticket stored before the run started; returns the final checkpoint
+
+    The main process streams tickets from the repository in batches and
+    keeps up to two batches per worker in flight; each worker loads the
+    models once and runs one vectorized predict per batch. Results are
+    applied in order: every ticket whose category or priority changed is
+    updated in its latest stored copy, the whole batch in one locked write
+    (update_many), and only then does the checkpoint move past it - so a
+    run stopped at any point resumes (resume=True) without losing or
+    repeating a write. The checkpoint also records how far diff_file had
+    got, and a resumed run cuts off any lines written after that.
+    """
+    version = signature_version(files_signature(model_files))
+    checkpoint = load_checkpoint(checkpoint_file) if resume else None
+    if checkpoint and checkpoint.get('completed'):
+        logger.info("✅ Checkpoint says the run already completed - nothing to resume")
+        return checkpoint
+    if checkpoint and checkpoint.get('order') != 'created_at':
+        raise ValueError("Checkpoint was made by an older version of this job - start a fresh run instead of resuming")
+    if checkpoint and checkpoint['model_version'] != version:
+        raise ValueError(f"Checkpoint was made with model version {checkpoint['model_version']}, "
+                         f"the models are now {version} - start a fresh run instead of resuming")
+    if checkpoint is None:
+        checkpoint = {
+            'model_version': version,
+            'order': 'created_at',
+            'after': None,
+            'fields': list(fields),
+            'dry_run': dry_run,
+            'processed': 0,
+            'changed': 0,
+            'skipped': 0,
+            'started_at': datetime.now().isoformat(),
+            'completed': False
+        }
+    else:
+        logger.info(f"⏩ Resuming after {checkpoint['processed']} tickets")
+
+    total = repository.count()
+    started = time.monotonic()
+    processed_at_start = checkpoint['processed']
+    diff_output = None
+    if diff_file:
+        if checkpoint.get('diff_file') == diff_file and os.path.exists(diff_file):
+            # Lines written after the last checkpoint are written again by this run
+            os.truncate(diff_file, min(checkpoint['diff_offset'], os.path.getsize(diff_file)))
+        diff_output = open(diff_file, 'a')
+        checkpoint['diff_file'] = diff_file
+        checkpoint['diff_offset'] = diff_output.tell()
+    workers = workers or os.cpu_count() or 1
+    pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(model_files,)) if workers > 1 else None
+    if pool is None:
+        init_worker(model_files)
+
+    def reclassifier(diff, prediction):
+        def reclassified(current):
+            # Latest copy, under the repository lock - the app may have changed it meanwhile
+            diff.update(ticket_diff(current, *prediction, checkpoint['fields']))
+            if not diff:
+                return None
+            current.update({field: new for field, (_, new) in diff.items()})
+            current.update({
+                'ai_processed': True,
+                'model_version': version,
+                'reclassified_at': datetime.now().isoformat(),
+                'updated_at': datetime.now().isoformat()
+            })
+            return current
+        return reclassified
+
+    def apply(batch, predictions):
+        diffs = {}  # ticket_key -> {field: (old, new)}, filled in as the batch is written
+        updates = []
+        for (ticket_key, ticket), prediction in zip(batch, predictions):
+            if prediction is None:
+                checkpoint['skipped'] += 1
+                continue
+            diff = diffs[ticket_key] = {}
+            if checkpoint['dry_run']:
+                current = repository.get(ticket_key)
+                if current is not None:
+                    diff.update(ticket_diff(current, *prediction, checkpoint['fields']))
+            else:
+                updates.append((ticket_key, reclassifier(diff, prediction)))
+        if updates:
+            repository.update_many(updates)
+
+        for ticket_key, diff in diffs.items():
+            if diff and diff_output:
+                diff_output.write(json.dumps({
+                    'id': ticket_key,
+                    'changes': {field: {'old': old, 'new': new} for field, (old, new) in diff.items()}
+                }) + '\n')
+            if diff:
+                checkpoint['changed'] += 1
+        checkpoint['processed'] += len(batch)
+
+        if repository.engine == 'json':
+            repository.flush(fsync=True)
+        checkpoint['after'] = ticket_position(*batch[-1])
+        checkpoint['updated_at'] = datetime.now().isoformat()
+        if diff_output:
+            diff_output.flush()
+            checkpoint['diff_offset'] = diff_output.tell()
+        if checkpoint_file:
+            atomic_write_json(checkpoint_file, checkpoint, fsync=True)
+
+        rate = (checkpoint['processed'] - processed_at_start) / max(time.monotonic() - started, 1e-9)
+        remaining = max(total - checkpoint['processed'], 0)
+        logger.info(f"📊 {checkpoint['processed']}/{total} tickets, {checkpoint['changed']} "
+                    f"{'would change' if checkpoint['dry_run'] else 'changed'}, "
+                    f"{rate:.0f}/s, ~{remaining / rate if rate else 0:.0f}s left")
+
+    def predict(batch):
+        """Submit a batch's descriptions; tickets without one get no prediction"""
+        descriptions = [ticket.get('description') for _, ticket in batch]
+        texts = [description for description in descriptions if description]
+        if not texts:
+            result = []
+        elif pool is None:
+            result = classify_batch(texts)
+        else:
+            result = pool.apply_async(classify_batch, (texts,))
+        return descriptions, result
+
+    def collect(descriptions, result):
+        predictions = iter(result if isinstance(result, list) else result.get())
+        return [next(predictions) if description else None for description in descriptions]
+
+    in_flight = deque()  # (batch, descriptions, pending predictions), oldest first
+
+    def finish_oldest():
+        batch, descriptions, result = in_flight.popleft()
+        apply(batch, collect(descriptions, result))
+
+    stopped = False
+    try:
+        batches = 0
+        for batch in iter_batches(repository, checkpoint['after'], batch_size):
+            if max_batches is not None and batches >= max_batches:
+                stopped = True
+                break
+            in_flight.append((batch, *predict(batch)))
+            batches += 1
+            if len(in_flight) >= workers * 2:
+                finish_oldest()
+        while in_flight:
+            finish_oldest()
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if diff_output:
+            diff_output.close()
+
+    if not stopped:
+        checkpoint['completed'] = True
+        checkpoint['updated_at'] = datetime.now().isoformat()
+        if checkpoint_file:
+            atomic_write_json(checkpoint_file, checkpoint, fsync=True)
+        logger.info(f"✅ Re-classified {checkpoint['processed']} tickets: {checkpoint['changed']} "
+                    f"{'would change' if checkpoint['dry_run'] else 'changed'}, "
+                    f"{checkpoint['skipped']} without a description")
+    else:
+        logger.info(f"⏸️ Stopped after {batches} batches - run again with --resume to continue")
+    return checkpoint
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score every stored ticket with the current ML models")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=RECLASSIFY_BATCH_SIZE, help="Tickets per predict batch")
+    parser.add_argument('--checkpoint', default=RECLASSIFY_CHECKPOINT_FILE, help="Checkpoint file")
+    parser.add_argument('--resume', action='store_true', help="Continue the run recorded in the checkpoint")
+    parser.add_argument('--dry-run', action='store_true', help="Report the changes without saving them")
+    parser.add_argument('--fields', default=','.join(FIELDS), help="Fields to update: category,priority")
+    parser.add_argument('--diff-file', default=None, help="Append each ticket's changes here as NDJSON")
+    parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches")
+    parser.add_argument('--category-model', default=CATEGORY_MODEL_FILE)
+    parser.add_argument('--priority-model', default=PRIORITY_MODEL_FILE)
+    args = parser.parse_args(argv)
+
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()]
+    if not fields or set(fields) - set(FIELDS):
+        parser.error(f"--fields must be a subset of {','.join(FIELDS)}")
+
+    logging.basicConfig(level=logging.INFO)
+    from ticket_repository import create_ticket_repository
+
+    # The app keeps running and writing the same files: lock and catch up around each
+    # batch as its workers do. With the JSON store the app must run with
+    # STORAGE_MULTIPROCESS=true too (gunicorn.conf.py sets it), or it neither sees these
+    # changes straight away nor numbers its own after them - stop it otherwise
+    repository = create_ticket_repository(multiprocess=True)
+    try:
+        reclassify(repository, [args.category_model, args.priority_model], workers=args.workers,
+                   batch_size=args.batch_size, checkpoint_file=args.checkpoint, resume=args.resume,
+                   dry_run=args.dry_run, fields=fields, diff_file=args.diff_file,
+                   max_batches=args.max_batches)
+    except ValueError as e:
+        logger.error(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Offline Test for the Chat Session Store
+Tests per-session transcript files without running the server
+"""
+
+import logging
+import json
+import os
+import tempfile
+import time
+
+from chat_store import ChatSessionStore, PendingComplaintStore
+from persistence import PersistenceManager
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_append_and_lazy_load():
+    """Each turn is one append to the session's own file"""
+    with tempfile.TemporaryDirectory() as directory:
+        sessions_dir = os.path.join(directory, 'chat_sessions')
+        store = ChatSessionStore(sessions_dir, legacy_file=None)
+
+        store.append('session-a', {'user_message': 'hi'})
+        store.append('session-a', {'user_message': 'help'})
+        store.append('session-b', {'user_message': 'hello'})
+
+        with open(store._path('session-a')) as f:
+            assert len(f.readlines()) == 2
+
+        # A fresh store loads nothing until a session is asked for
+        reloaded = ChatSessionStore(sessions_dir, legacy_file=None)
+        assert reloaded.resident_count() == 0
+        assert 'session-a' in reloaded
+        assert [e['user_message'] for e in reloaded['session-a']] == ['hi', 'help']
+        assert reloaded.resident_count() == 1
+        assert reloaded.get('missing') is None
+
+        logger.info("✅ Per-session append and lazy load work")
+    return True
+
+def test_legacy_migration():
+    """The old chat_sessions.json is split into per-session files once"""
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_file = os.path.join(directory, 'chat_sessions.json')
+        with open(legacy_file, 'w') as f:
+            json.dump({'old-session': [{'user_message': 'hi'}, {'user_message': 'bye'}]}, f)
+
+        store = ChatSessionStore(os.path.join(directory, 'chat_sessions'), legacy_file)
+
+        assert not os.path.exists(legacy_file)
+        assert os.path.exists(f"{legacy_file}.migrated")
+        assert len(store['old-session']) == 2
+
+        logger.info("✅ Legacy chat sessions migration works")
+    return True
+
+def test_lru_eviction():
+    """Only max_resident sessions stay in memory; evicted ones reload from disk"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = ChatSessionStore(os.path.join(directory, 'chat_sessions'), legacy_file=None, max_resident=2)
+
+        for session_id in ['a', 'b', 'c']:
+            store.append(session_id, {'user_message': session_id})
+
+        assert store.resident_count() == 2
+        assert 'a' not in store.sessions
+        assert store['a'] == [{'user_message': 'a'}]
+        assert store.resident_count() == 2
+
+        logger.info("✅ LRU eviction of chat sessions works")
+    return True
+
+def test_idle_ttl():
+    """Sessions idle longer than the TTL are evicted on the next access"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = ChatSessionStore(os.path.join(directory, 'chat_sessions'), legacy_file=None, idle_ttl=0)
+
+        store.append('a', {'user_message': 'hi'})
+        store.append('b', {'user_message': 'hi'})
+
+        assert 'a' not in store.sessions
+        assert 'a' in store
+
+        logger.info("✅ Idle TTL eviction works")
+    return True
+
+def test_periodic_eviction():
+    """The persistence thread evicts idle sessions and spills idle complaints with no further access"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = ChatSessionStore(os.path.join(directory, 'chat_sessions'), legacy_file=None, idle_ttl=0.05)
+        complaints = PendingComplaintStore(directory, idle_ttl=0.05)
+        store.append('a', {'user_message': 'hi'})
+        complaints['a'] = {'name': 'Alice'}
+
+        manager = PersistenceManager(mode='sync', housekeeping_interval=0.1)
+        manager.register_periodic('evict_chat_sessions', store.evict_idle)
+        manager.register_periodic('evict_pending_complaints', complaints.evict_idle)
+        manager.start()
+        try:
+            deadline = time.monotonic() + 5
+            while (store.resident_count() or len(complaints)) and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            manager.stop()
+
+        assert store.resident_count() == 0 and store['a'] == [{'user_message': 'hi'}]
+        assert len(complaints) == 0 and os.path.exists(complaints._path('a'))
+
+        logger.info("✅ Idle sessions are evicted without an access")
+    return True
+
+def test_pending_complaint_spill():
+    """Evicted pending complaints are spilled to disk and rehydrated"""
+    with tempfile.TemporaryDirectory() as directory:
+        complaints = PendingComplaintStore(directory, max_resident=1)
+
+        complaints['a'] = {'name': 'Alice'}
+        complaints['b'] = {'name': 'Bob'}
+
+        assert len(complaints) == 1
+        assert os.path.exists(complaints._path('a'))
+        assert 'a' in complaints
+
+        complaints['a']['email'] = 'alice@example.com'
+        assert not os.path.exists(complaints._path('a'))
+        assert complaints['a'] == {'name': 'Alice', 'email': 'alice@example.com'}
+
+        del complaints['a']
+        assert 'a' not in complaints
+
+        logger.info("✅ Pending complaint spill and rehydrate works")
+    return True
+
+def test_multiprocess_pending_expiry():
+    """Shared complaint files expire after the TTL without access, and housekeeping deletes them"""
+    with tempfile.TemporaryDirectory() as directory:
+        first = PendingComplaintStore(directory, idle_ttl=0.2, multiprocess=True)
+        second = PendingComplaintStore(directory, idle_ttl=0.2, multiprocess=True)
+
+        first['a'] = {'name': 'Alice'}
+        first['b'] = {'name': 'Bob'}
+        assert second['a'] == {'name': 'Alice'} and len(second) == 2
+
+        # Reads keep 'a' alive; 'b' is left alone until it expires
+        for _ in range(3):
+            time.sleep(0.1)
+            assert 'a' in second
+        assert 'b' not in second and len(first) == 1
+        try:
+            first['b']
+            assert False, "Expired complaint was returned"
+        except KeyError:
+            pass
+
+        time.sleep(0.25)
+        assert os.path.exists(first._path('a'))
+        first.evict_idle()
+        assert not os.path.exists(first._path('a')) and len(second) == 0
+
+        logger.info("✅ Shared pending complaints expire on disk")
+    return True
+
+def run_chat_store_tests():
+    """Run all offline chat store tests"""
+    tests = [
+        ("Append and Lazy Load", test_append_and_lazy_load),
+        ("Legacy Migration", test_legacy_migration),
+        ("LRU Eviction", test_lru_eviction),
+        ("Idle TTL", test_idle_ttl),
+        ("Periodic Eviction", test_periodic_eviction),
+        ("Pending Complaint Spill", test_pending_complaint_spill),
+        ("Multiprocess Pending Expiry", test_multiprocess_pending_expiry),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Chat Store Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_chat_store_tests()
+    exit(0 if success else 1)
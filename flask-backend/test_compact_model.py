@@ -0,0 +1,119 @@
+"""
+Offline Test for the Compact Model Export
+Tests that the numpy-only classifier reproduces the sklearn pipelines without running the server
+"""
+
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+from compact_model import CompactTextClassifier
+from export_compact_models import agreement, choose_min_weight, compact_pipeline, parity_texts, vocabulary_terms
+import ml_test_fixtures
+from ml_test_fixtures import fit_pipeline
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TEXTS = ml_test_fixtures.TEXTS + ["can I upgrade my plan", "the app crashes when I log in"]
+LABELS = ml_test_fixtures.CATEGORIES + ['sales', 'technical']
+
+def fit_pipelines():
+    """The two vectorizer set-ups the shipped models use, plus a binary classifier"""
+    return [
+        fit_pipeline(LABELS, TEXTS, C=100, ngram_range=(1, 2), stop_words='english', max_features=5000),
+        fit_pipeline(LABELS, TEXTS, C=100),
+        fit_pipeline([label == 'technical' for label in LABELS], TEXTS, sublinear_tf=True),
+    ]
+
+def test_unpruned_parity():
+    """Without pruning the compact model matches the pipeline, also after a save/load round trip"""
+    with tempfile.TemporaryDirectory() as directory:
+        for number, pipeline in enumerate(fit_pipelines()):
+            path = os.path.join(directory, f'model{number}.compact.npz')
+            compact_pipeline(pipeline, min_weight=0).save(path)
+            compact = CompactTextClassifier.load(path)
+
+            texts = parity_texts(vocabulary_terms(pipeline), TEXTS + ["", "Charged TWICE, laptop won't boot!"],
+                                 count=200)
+            scores = pipeline.decision_function(texts)
+            assert np.allclose(compact.decision_function(texts), scores, atol=1e-5)
+
+            # Classes tied in the original (e.g. a term seen once in each) may break either way in float32
+            if scores.ndim == 1:
+                clear = np.abs(scores) > 1e-4
+            else:
+                top_two = np.sort(scores, axis=1)[:, -2:]
+                clear = top_two[:, 1] - top_two[:, 0] > 1e-4
+            assert clear.mean() > 0.9
+            assert (compact.predict(texts) == pipeline.predict(texts).astype(str))[clear].all()
+
+    logger.info("✅ Compact models match their pipelines")
+    return True
+
+def test_pruning():
+    """Pruning drops the small weights, and the terms left without any"""
+    pipeline = fit_pipelines()[0]
+    coef = pipeline.steps[-1][1].coef_
+    threshold = float(np.quantile(np.abs(coef), 0.9))
+
+    compact = compact_pipeline(pipeline, min_weight=threshold)
+    assert len(compact.data) == int((np.abs(coef) >= threshold).sum()) < coef.size
+    assert np.abs(compact.data).min() >= np.float32(threshold)
+
+    vocabulary = pipeline.steps[0][1].vocabulary_
+    weighted = sorted(term for term, column in vocabulary.items() if (np.abs(coef[:, column]) >= threshold).any())
+    assert compact.terms == weighted and len(weighted) < len(vocabulary)
+    assert len(compact.idf) == len(compact.terms) and (np.diff(compact.indptr) > 0).all()
+
+    logger.info("✅ Pruning keeps only the large weights and the terms that have them")
+    return True
+
+def test_auto_min_weight():
+    """The chosen cut is the largest one whose predictions still agree often enough"""
+    pipeline = fit_pipelines()[0]
+    texts = parity_texts(vocabulary_terms(pipeline), TEXTS, count=200)
+
+    min_weight = choose_min_weight(pipeline, texts, min_agreement=0.9)
+    compact = compact_pipeline(pipeline, min_weight)
+    assert min_weight > 0 and len(compact.data) < pipeline.steps[-1][1].coef_.size
+    assert agreement(pipeline, compact, texts) >= 0.9
+    assert choose_min_weight(pipeline, texts, min_agreement=1.01) == 0.0  # Nothing passes
+
+    logger.info("✅ Automatic pruning stops at the agreement floor")
+    return True
+
+def run_compact_model_tests():
+    """Run all offline compact model tests"""
+    tests = [
+        ("Unpruned Parity", test_unpruned_parity),
+        ("Pruning", test_pruning),
+        ("Auto Min Weight", test_auto_min_weight),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Compact Model Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_compact_model_tests()
+    exit(0 if success else 1)
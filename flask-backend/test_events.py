@@ -0,0 +1,126 @@
+"""
+Offline Test for the Event Broadcaster
+Tests SSE fan-out and slow-consumer dropping without running the server
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from events import EventBroadcaster
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_fan_out():
+    """Every subscriber receives each event as an SSE frame"""
+    broadcaster = EventBroadcaster(max_queue=10, keepalive=1)
+    first = broadcaster.subscribe()
+    second = broadcaster.subscribe()
+
+    broadcaster.publish('ticket-created', {'id': 'ZER0-2025-001'})
+
+    for subscription in (first, second):
+        frame = subscription.queue.get_nowait()
+        assert frame.startswith('id: 1\nevent: ticket-created\n')
+        assert '"ZER0-2025-001"' in frame
+
+    logger.info("✅ Events fan out to every subscriber")
+    return True
+
+def test_slow_consumer_dropped():
+    """A full subscriber is dropped, gets what was queued, then its stream ends"""
+    broadcaster = EventBroadcaster(max_queue=2, keepalive=1)
+    slow = broadcaster.subscribe()
+    fast = broadcaster.subscribe()
+
+    for number in range(3):
+        broadcaster.publish('agent-status-changed', {'number': number})
+        fast.queue.get_nowait()
+
+    assert slow.dropped and slow not in broadcaster.subscribers
+    assert fast in broadcaster.subscribers
+
+    frames = list(broadcaster.stream(slow))
+    assert frames[0].startswith('retry:')
+    assert len(frames) == 3  # retry + the 2 queued events
+
+    logger.info("✅ Slow consumers are dropped without blocking publishers")
+    return True
+
+def test_subscriber_limit():
+    """Past max_subscribers a subscribe is refused until a stream ends"""
+    broadcaster = EventBroadcaster(max_queue=10, keepalive=1, max_subscribers=2)
+    first = broadcaster.subscribe()
+    assert broadcaster.subscribe() is not None
+    assert broadcaster.subscribe() is None
+
+    broadcaster.unsubscribe(first)
+    assert broadcaster.subscribe() is not None
+
+    logger.info("✅ Subscribers are capped")
+    return True
+
+def test_shared_file():
+    """Broadcasters sharing a file (one per worker) see each other's events once, also across a new file"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.jsonl')
+        first, second = (EventBroadcaster(max_queue=50, keepalive=1, shared_file=path,
+                                          poll_interval=0.01, max_file_bytes=500) for _ in range(2))
+        first_subscription = first.subscribe()
+        second_subscription = second.subscribe()
+        first.publish('ticket-created', {'id': 'ZER0-2025-001'})  # Creates the file while both tail it
+
+        for subscription in (first_subscription, second_subscription):
+            assert '"ZER0-2025-001"' in subscription.queue.get(timeout=5)
+
+        # Enough events to start the file afresh a few times
+        for number in range(20):
+            second.publish('agent-status-changed', {'number': number})
+            assert f'"number": {number}}}' in first_subscription.queue.get(timeout=5)
+        assert os.path.getsize(path) <= 500 + 100
+
+        # Own events are delivered once, straight away, and not again from the file
+        time.sleep(0.2)
+        assert first_subscription.queue.empty()
+        assert second_subscription.queue.qsize() == 20
+        first.close()
+        second.close()
+
+    logger.info("✅ Events are shared through the file")
+    return True
+
+def run_event_tests():
+    """Run all offline event broadcaster tests"""
+    tests = [
+        ("Fan Out", test_fan_out),
+        ("Slow Consumer Dropped", test_slow_consumer_dropped),
+        ("Subscriber Limit", test_subscriber_limit),
+        ("Shared File", test_shared_file),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Event Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_event_tests()
+    exit(0 if success else 1)
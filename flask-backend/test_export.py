@@ -0,0 +1,143 @@
+"""
+Offline Test for the Bulk Export
+Tests NDJSON ticket and chat transcript exports, resuming and gzip without running the server
+"""
+
+import logging
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from chat_store import ChatSessionStore, PendingComplaintStore
+from export import (export_tickets, export_chat_sessions, ndjson_chunks, gzip_chunks,
+                    ticket_export_position, chat_export_position, parse_since)
+from ticket_repository import JsonTicketRepository, SqliteTicketRepository
+from ticket_store import TicketStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_repositories(directory):
+    """Both engines over the same 5 tickets, saved one at a time"""
+    def store():
+        return TicketStore(os.path.join(directory, 'tickets.json'),
+                           os.path.join(directory, 'tickets_changes.jsonl'))
+
+    json_repo = JsonTicketRepository(store()).load()
+    for number in range(1, 6):
+        json_repo.save(f"ZER0-2025-00{number}", {'id': f"ZER0-2025-00{number}",
+                                                 'created_at': f"2025-08-0{number}T10:00:00"})
+    sqlite_repo = SqliteTicketRepository(os.path.join(directory, 'tickets.db'), import_store=store()).load()
+    return [json_repo, sqlite_repo]
+
+def test_ticket_export_resumes():
+    """Paged ticket exports cover every ticket once and resume from any line's cursor"""
+    with tempfile.TemporaryDirectory() as directory:
+        for repo in make_repositories(directory):
+            records = list(export_tickets(repo, batch_size=2))
+            assert [record['id'] for record in records] == [f"ZER0-2025-00{n}" for n in range(1, 6)]
+
+            resumed = list(export_tickets(repo, after=ticket_export_position(records[2]['cursor']), batch_size=2))
+            assert [record['id'] for record in resumed] == ['ZER0-2025-004', 'ZER0-2025-005']
+
+            recent = list(export_tickets(repo, since='2025-08-04'))
+            assert [record['id'] for record in recent] == ['ZER0-2025-004', 'ZER0-2025-005']
+
+            # An older ticket updated later is included; nothing changed since the last update exports nothing
+            repo.save('ZER0-2025-002', dict(repo.get('ZER0-2025-002'), updated_at='2025-08-09T10:00:00'))
+            recent = list(export_tickets(repo, since='2025-08-05'))
+            assert [record['id'] for record in recent] == ['ZER0-2025-005', 'ZER0-2025-002']
+            assert list(export_tickets(repo, since='2025-08-10')) == []
+
+            # Exported tickets are copies, safe to encode while the stored ones change
+            assert recent[-1]['ticket'] is not repo.get('ZER0-2025-002')
+
+            logger.info(f"✅ {repo.engine} ticket export pages and resumes")
+    return True
+
+def test_since_matches_new_ticket_stamps():
+    """A ticket stamped the way create_complaint stamps it is exported by a same-day since"""
+    created = datetime.now().replace(microsecond=0)
+    with tempfile.TemporaryDirectory() as directory:
+        for repo in make_repositories(directory):
+            repo.save('ZER0-2025-006', {'id': 'ZER0-2025-006',
+                                        'created_at': created.strftime("%Y-%m-%d %H:%M:%S")})
+
+            since = parse_since((created - timedelta(minutes=1)).isoformat())
+            assert [record['id'] for record in export_tickets(repo, since=since)] == ['ZER0-2025-006']
+            since = parse_since((created + timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M:%S"))
+            assert list(export_tickets(repo, since=since)) == []
+
+            logger.info(f"✅ {repo.engine} since= export compares both timestamp formats")
+    return True
+
+def test_chat_export_resumes():
+    """Chat exports stream transcript entries only, and resume mid-transcript"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = ChatSessionStore(directory, legacy_file=None)
+        store.on_dirty = lambda: None  # Buffered - the export flushes first
+        for session_id in ('session-a', 'session-b'):
+            for number in range(3):
+                store.append(session_id, {'timestamp': f"2025-08-0{number + 1}T10:00:00", 'n': number})
+        PendingComplaintStore(directory, multiprocess=True)['session-a'] = {'step': 'email'}
+
+        records = list(export_chat_sessions(store))
+        assert len(records) == 6
+        assert sorted({record['session_id'] for record in records}) == ['session-a', 'session-b']
+
+        resumed = list(export_chat_sessions(store, after=chat_export_position(records[1]['cursor'])))
+        assert [record['cursor'] for record in resumed] == [record['cursor'] for record in records[2:]]
+
+        recent = list(export_chat_sessions(store, since='2025-08-03'))
+        assert [record['entry']['n'] for record in recent] == [2, 2]
+
+        logger.info("✅ Chat export streams entries and resumes")
+    return True
+
+def test_gzip_chunks():
+    """The gzip stream decodes to the same NDJSON"""
+    records = [{'n': number} for number in range(10)]
+    plain = b''.join(ndjson_chunks(records, batch_size=3))
+    compressed = b''.join(gzip_chunks(ndjson_chunks(records, batch_size=3)))
+
+    assert gzip.decompress(compressed) == plain
+    assert [json.loads(line) for line in plain.splitlines()] == records
+
+    logger.info("✅ Gzip export decodes to the same lines")
+    return True
+
+def run_export_tests():
+    """Run all offline export tests"""
+    tests = [
+        ("Ticket Export Resumes", test_ticket_export_resumes),
+        ("Since Matches New Ticket Stamps", test_since_matches_new_ticket_stamps),
+        ("Chat Export Resumes", test_chat_export_resumes),
+        ("Gzip Chunks", test_gzip_chunks),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Export Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_export_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,100 @@
+"""
+Offline Test for Revision-based ETags
+Tests 304 Not Modified handling on a throwaway Flask app without running the server
+"""
+
+import logging
+
+from flask import Flask, jsonify
+
+from http_cache import conditional_response
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_app(state):
+    """App with one endpoint tagged from state['revision'] that counts how often it builds"""
+    app = Flask(__name__)
+
+    @app.route('/items')
+    def items():
+        def build():
+            state['builds'] += 1
+            if state.get('fail'):
+                return jsonify({'success': False}), 500
+            return jsonify({'success': True, 'revision': state['revision']})
+        return conditional_response(build, state['revision'])
+
+    return app
+
+def test_not_modified_until_revision_changes():
+    """A matching If-None-Match gets an empty 304 without building the body"""
+    state = {'revision': 1, 'builds': 0}
+    client = make_app(state).test_client()
+
+    first = client.get('/items')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/')
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    cached = client.get('/items', headers={'If-None-Match': etag})
+    assert cached.status_code == 304 and cached.data == b''
+    assert cached.headers['ETag'] == etag
+    assert state['builds'] == 1
+
+    state['revision'] = 2
+    changed = client.get('/items', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert state['builds'] == 2
+
+    logger.info("✅ Unchanged responses are answered with 304")
+    return True
+
+def test_query_string_and_errors():
+    """Different query strings get different tags, error responses get none"""
+    state = {'revision': 1, 'builds': 0}
+    client = make_app(state).test_client()
+
+    first_page = client.get('/items?limit=10').headers['ETag']
+    second_page = client.get('/items?limit=10&cursor=abc').headers['ETag']
+    assert first_page != second_page
+    assert client.get('/items?cursor=abc&limit=10').headers['ETag'] == second_page
+
+    state['fail'] = True
+    failed = client.get('/items', headers={'If-None-Match': 'W/"other"'})
+    assert failed.status_code == 500 and 'ETag' not in failed.headers
+
+    logger.info("✅ ETags depend on the query string and skip errors")
+    return True
+
+def run_http_cache_tests():
+    """Run all offline ETag tests"""
+    tests = [
+        ("Not Modified Until Revision Changes", test_not_modified_until_revision_changes),
+        ("Query String And Errors", test_query_string_and_errors),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"ETag Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_http_cache_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,201 @@
+"""
+Offline Test for the ML Inference Engine
+Tests shared featurization and stage timings on small pipelines without running the server
+"""
+
+import logging
+import copy
+import os
+import tempfile
+import threading
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from ml_inference import InferenceEngine, MicroBatcher, PredictionCache
+from ml_test_fixtures import CATEGORIES, PRIORITIES, TEXTS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_models(shared):
+    """Category and priority pipelines, fitted on the same (shared) or different vectorizers"""
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    category_features = vectorizer.transform(TEXTS)
+    category = Pipeline([('tfidf', vectorizer), ('clf', LogisticRegression().fit(category_features, CATEGORIES))])
+
+    # Separately pickled models never share objects, so copy the fitted vectorizer
+    other = copy.deepcopy(vectorizer) if shared else TfidfVectorizer(ngram_range=(1, 2)).fit(TEXTS)
+    priority = Pipeline([('tfidf', other), ('clf', LogisticRegression().fit(other.transform(TEXTS), PRIORITIES))])
+    return {'categorization': category, 'priority': priority}
+
+def test_shared_featurizer():
+    """Identical fitted vectorizers are run once and predictions match the pipelines"""
+    models = make_models(shared=True)
+    engine = InferenceEngine(models)
+
+    predictions = engine.predict(TEXTS)
+    assert predictions['categorization'] == list(models['categorization'].predict(TEXTS))
+    assert predictions['priority'] == list(models['priority'].predict(TEXTS))
+
+    timings = engine.stats()['timings']
+    assert list(engine.stats()['featurizers']) == ['featurize:categorization+priority']
+    assert timings['featurize:categorization+priority']['calls'] == 1
+    assert timings['predict:categorization']['calls'] == 1
+
+    logger.info("✅ Shared vectorizer featurizes once for both heads")
+    return True
+
+def test_distinct_featurizers():
+    """Different vectorizers each run once per call"""
+    models = make_models(shared=False)
+    engine = InferenceEngine(models)
+
+    predictions = engine.predict(TEXTS[:2])
+    assert predictions['priority'] == list(models['priority'].predict(TEXTS[:2]))
+    assert sorted(engine.stats()['featurizers']) == ['featurize:categorization', 'featurize:priority']
+
+    engine.predict(TEXTS[:1], names=['priority'])
+    timings = engine.stats()['timings']
+    assert timings['featurize:priority']['calls'] == 2
+    assert timings['featurize:categorization']['calls'] == 1
+
+    logger.info("✅ Distinct vectorizers are featurized separately")
+    return True
+
+def test_batch_matches_single():
+    """One batched call predicts the same labels as one call per description"""
+    engine = InferenceEngine(make_models(shared=False))
+
+    batch = engine.predict(TEXTS)
+    for position, text in enumerate(TEXTS):
+        single = engine.predict([text])
+        assert single['categorization'][0] == batch['categorization'][position]
+        assert single['priority'][0] == batch['priority'][position]
+
+    logger.info("✅ Batched predictions match single predictions")
+    return True
+
+def test_micro_batching():
+    """Concurrent single predictions are answered from shared batches"""
+    batches = []
+
+    def predict_batch(items):
+        batches.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(predict_batch, max_batch=8, max_wait=0.05)
+    results = {}
+
+    def caller(number):
+        results[number] = batcher.submit(number).result(timeout=5)
+
+    threads = [threading.Thread(target=caller, args=(number,)) for number in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {number: number * 2 for number in range(20)}
+    assert sum(batches) == 20 and max(batches) <= 8 and len(batches) < 20
+
+    # A failed batch fails every caller in it, and the dispatcher keeps going
+    failing = MicroBatcher(lambda items: 1 / 0, max_batch=4, max_wait=0.01)
+    try:
+        failing.submit(1).result(timeout=5)
+        assert False, "expected the batch error"
+    except ZeroDivisionError:
+        pass
+
+    engine = InferenceEngine(make_models(shared=True), max_batch=4, max_wait=0.01)
+    assert engine.predict_one(TEXTS[0]) == {name: labels[0] for name, labels in engine.predict(TEXTS[:1]).items()}
+
+    logger.info(f"✅ 20 concurrent predictions ran in {len(batches)} batches")
+    return True
+
+def test_batcher_close_and_timeout():
+    """close() ends the dispatcher thread, and a stuck dispatcher falls back to a direct prediction"""
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_batch=4, max_wait=0.01)
+    assert batcher.submit(1).result(timeout=5) == 2
+    thread = batcher.thread
+    batcher.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert batcher.submit(3).result(timeout=0) == 6 and batcher.thread is thread  # Inline once closed
+
+    engine = InferenceEngine(make_models(shared=True), max_batch=4, max_wait=0.01, batch_timeout=0.2)
+    release = threading.Event()
+    engine.batcher.predict_batch = lambda items: release.wait(10) and engine._predict_items(items)
+    try:
+        expected = engine._predict_items(TEXTS[:1])[0]
+        assert engine.predict_one(TEXTS[0]) == expected
+        assert engine.stats()['batching']['timeouts'] == 1
+    finally:
+        release.set()
+        engine.close()
+
+    logger.info("✅ Batcher stops on close and requests never wait past the timeout")
+    return True
+
+def test_prediction_cache():
+    """Repeats hit the cache, the LRU bound holds and a changed model file clears it"""
+    with tempfile.TemporaryDirectory() as directory:
+        model_file = os.path.join(directory, 'model.pkl')
+        with open(model_file, 'w') as f:
+            f.write('v1')
+
+        cache = PredictionCache(max_entries=3, model_files=[model_file])
+        engine = InferenceEngine(make_models(shared=False), max_batch=1, version='v1', cache=cache)
+
+        first = engine.predict_one("My laptop  will not BOOT")
+        assert engine.predict_one("my laptop will not boot ") == first
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+        items = engine.predict_items(TEXTS)
+        assert items == engine._predict_items(TEXTS)
+        assert cache.stats()['entries'] == 3
+
+        with open(model_file, 'w') as f:
+            f.write('version two')
+        engine.predict_one(TEXTS[-1])
+        assert cache.stats()['invalidations'] == 1 and cache.stats()['entries'] == 1
+
+    logger.info("✅ Prediction cache hits, evicts and invalidates")
+    return True
+
+def run_ml_inference_tests():
+    """Run all offline ML inference tests"""
+    tests = [
+        ("Shared Featurizer", test_shared_featurizer),
+        ("Distinct Featurizers", test_distinct_featurizers),
+        ("Batch Matches Single", test_batch_matches_single),
+        ("Micro Batching", test_micro_batching),
+        ("Batcher Close and Timeout", test_batcher_close_and_timeout),
+        ("Prediction Cache", test_prediction_cache),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"ML Inference Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_ml_inference_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,234 @@
+"""
+Offline Test for the Model Registry
+Tests versioned reload, holdout validation and rollback on small pipelines without running the server
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+
+from ml_test_fixtures import CATEGORIES, TEXTS, fit_pipeline
+from model_registry import ModelRegistry, ModelValidationError
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def replace_model_file(model_file, content):
+    """Write a new model file and move it into place, with a distinct mtime"""
+    staged = model_file + '.new'
+    with open(staged, 'w') as f:
+        f.write(content)
+    os.replace(staged, model_file)
+    later = time.time() + len(content)
+    os.utime(model_file, (later, later))
+
+def make_registry(directory, current, **options):
+    """Registry whose load_models() returns current['models'], scored on TEXTS/CATEGORIES"""
+    model_file = os.path.join(directory, 'model.pkl')
+    holdout_file = os.path.join(directory, 'holdout.json')
+    replace_model_file(model_file, 'v1')
+    with open(holdout_file, 'w') as f:
+        json.dump([{"description": text, "labels": {"categorization": label}}
+                   for text, label in zip(TEXTS, CATEGORIES)], f)
+
+    options = dict({'min_accuracy': 0.5, 'max_drop': 0.1, 'watch_interval': 0}, **options)
+    registry = ModelRegistry([model_file], lambda paths: current['models'], holdout_file=holdout_file, **options)
+    return registry, model_file
+
+def test_reload_and_rollback():
+    """A new version is swapped in and the old one can be rolled back to instantly"""
+    with tempfile.TemporaryDirectory() as directory:
+        current = {'models': {'categorization': fit_pipeline(CATEGORIES)}}
+        registry, model_file = make_registry(directory, current)
+        registry.load_initial()
+        first = registry.engine()
+        assert first is not None and registry.ready.is_set()
+        assert registry.status()['active']['accuracy']['categorization'] >= 0.5
+
+        # Unchanged files are not reloaded
+        assert registry.reload() is registry.active and registry.engine() is first
+
+        replace_model_file(model_file, 'version 2')
+        current['models'] = {'categorization': fit_pipeline(CATEGORIES)}
+        registry.reload()
+        second = registry.engine()
+        assert second is not first and second.version != first.version
+        assert registry.status()['previous']['version'] == first.version
+
+        registry.rollback()
+        assert registry.engine() is first
+        registry.rollback()
+        assert registry.engine() is second
+
+        # A third version drops the first for good, stopping its batcher thread
+        first.predict_one(TEXTS[0])
+        replace_model_file(model_file, 'the third version')
+        assert registry.reload() is registry.active  # Pinned by the rollbacks
+        registry.reload(force=True)
+        first.batcher.thread.join(timeout=5)
+        assert first.batcher.closed and not first.batcher.thread.is_alive()
+
+        logger.info("✅ Reload and rollback work")
+    return True
+
+def test_rejected_version_keeps_active():
+    """A version scoring too low on the holdout set never replaces the active one"""
+    with tempfile.TemporaryDirectory() as directory:
+        current = {'models': {'categorization': fit_pipeline(CATEGORIES)}}
+        registry, model_file = make_registry(directory, current)
+        registry.load_initial()
+        first = registry.engine()
+
+        replace_model_file(model_file, 'a worse version')
+        current['models'] = {'categorization': fit_pipeline(['general'] * 5 + ['billing'])}
+        try:
+            registry.reload()
+            assert False, "A worse model was activated"
+        except ModelValidationError:
+            pass
+        assert registry.engine() is first
+        assert 'holdout' in registry.status()['last_error']
+        assert registry.attempted_signature != registry.active.signature
+
+        # Nothing to roll back to yet
+        try:
+            registry.rollback()
+            assert False, "Rolled back without a previous version"
+        except ValueError:
+            pass
+
+        logger.info("✅ Rejected version leaves the active one serving")
+    return True
+
+def test_rejected_version_archive_removed():
+    """A per-model floor rejects a version, and its archived files are not kept"""
+    with tempfile.TemporaryDirectory() as directory:
+        current = {'models': {'categorization': fit_pipeline(CATEGORIES)}}
+        registry, model_file = make_registry(directory, current, min_accuracy='categorization=0.5,0',
+                                             state_file=os.path.join(directory, 'active.json'))
+        assert registry.min_accuracy == {'categorization': 0.5, None: 0}
+        registry.load_initial()
+        archived = os.listdir(os.path.join(directory, 'versions'))
+        assert archived == [registry.active.version]
+
+        replace_model_file(model_file, 'a worse version')
+        current['models'] = {'categorization': fit_pipeline(['general'] * 5 + ['billing'])}
+        try:
+            registry.reload()
+            assert False, "A worse model was activated"
+        except ModelValidationError:
+            pass
+        assert os.listdir(os.path.join(directory, 'versions')) == archived
+
+        registry.active.engine.close()
+        logger.info("✅ Rejected version leaves no archived files behind")
+    return True
+
+def test_failed_initial_load():
+    """Without loadable models the registry is ready but has no engine"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry, _ = make_registry(directory, {'models': None})
+        registry.load_initial()
+        assert registry.ready.is_set() and registry.engine() is None
+        assert registry.status()['last_error']
+
+        logger.info("✅ Failed load leaves the fallback classification in place")
+    return True
+
+def test_shared_state():
+    """Workers sharing a state file serve one version; a rollback is pinned and survives a restart"""
+    with tempfile.TemporaryDirectory() as directory:
+        model_file = os.path.join(directory, 'model.pkl')
+        state_file = os.path.join(directory, 'active.json')
+        models = {'v1': {'categorization': fit_pipeline(CATEGORIES)},
+                  'version 2': {'categorization': fit_pipeline(CATEGORIES)}}
+        loaded = []
+
+        def load_models(paths):
+            """Models for the file's content - so loading an archived copy gives the old models"""
+            loaded.append(paths[0])
+            with open(paths[0]) as f:
+                return models[f.read()]
+
+        def start_worker():
+            registry = ModelRegistry([model_file], load_models, min_accuracy=0, watch_interval=0,
+                                     state_file=state_file)
+            registry.load_initial()
+            return registry
+
+        replace_model_file(model_file, 'v1')
+        first, second = start_worker(), start_worker()
+        v1 = first.active.version
+        assert second.active.version == v1
+
+        # A reload in one worker reaches the other without it looking at the model files
+        replace_model_file(model_file, 'version 2')
+        first.reload()
+        v2 = first.active.version
+        assert v2 != v1 and second.active.version == v1
+        second.sync()
+        assert second.active.version == v2 and second.previous.version == v1
+        assert loaded[-1] != model_file  # From the archived copy
+
+        # A rollback in the other worker is pinned everywhere: the unchanged files are not reloaded
+        second.rollback()
+        first.sync()
+        assert first.active.version == second.active.version == v1
+        assert first.pinned and first.reload().version == v1
+
+        # A restart serves the rolled-back version even though model.pkl is version 2
+        restarted = start_worker()
+        assert restarted.active.version == v1 and restarted.pinned
+        assert restarted.engine().predict_one(TEXTS[0])['categorization'] == 'technical'
+
+        # Until an explicit reload unpins it
+        restarted.reload(force=True)
+        assert restarted.active.version == v2 and not restarted.pinned
+        first.sync()
+        assert first.active.version == v2
+        assert sorted(os.listdir(os.path.join(directory, 'versions'))) == sorted([v1, v2])
+
+        for registry in (first, second, restarted):
+            for version in (registry.active, registry.previous):
+                if version is not None:
+                    version.engine.close()
+
+        logger.info("✅ Reloads and rollbacks reach every worker and survive restarts")
+    return True
+
+def run_model_registry_tests():
+    """Run all offline model registry tests"""
+    tests = [
+        ("Reload And Rollback", test_reload_and_rollback),
+        ("Rejected Version Keeps Active", test_rejected_version_keeps_active),
+        ("Rejected Version Archive Removed", test_rejected_version_archive_removed),
+        ("Failed Initial Load", test_failed_initial_load),
+        ("Shared State", test_shared_state),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Model Registry Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_model_registry_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,121 @@
+"""
+Offline Test for the Persistence Manager
+Tests sync and group-commit flushing of the JSON stores without running the server
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from persistence import PersistenceManager
+from ticket_store import TicketStore
+from chat_store import ChatSessionStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_store(directory, manager):
+    """Create a ticket store whose writes go through the persistence manager"""
+    store = TicketStore(os.path.join(directory, 'tickets.json'),
+                        os.path.join(directory, 'tickets_changes.jsonl'))
+    store.load()
+    manager.register('tickets', store.flush)
+    store.on_dirty = lambda: manager.mark_dirty('tickets')
+    return store
+
+def test_sync_mode():
+    """Sync mode writes every change before returning"""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = PersistenceManager(mode='sync')
+        store = make_store(directory, manager)
+
+        store.tickets['ZER0-2025-001'] = {'id': 'ZER0-2025-001'}
+        store.append('ZER0-2025-001')
+
+        with open(store.log_file) as f:
+            assert len(f.readlines()) == 1
+
+        logger.info("✅ Sync mode writes immediately")
+    return True
+
+def test_group_commit():
+    """Group mode batches changes into one write and flushes everything on stop"""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = PersistenceManager(mode='group', flush_interval=60, max_pending=1000)
+        manager.start()
+        store = make_store(directory, manager)
+
+        for number in range(1, 11):
+            ticket_id = f"ZER0-2025-{number:03d}"
+            store.tickets[ticket_id] = {'id': ticket_id}
+            store.append(ticket_id)
+
+        # Nothing written until the flusher runs
+        assert not os.path.exists(store.log_file)
+        assert len(store.pending) == 10
+
+        manager.stop()
+        with open(store.log_file) as f:
+            assert len(f.readlines()) == 10
+        assert store.pending == []
+
+        logger.info("✅ Group commit batches and flushes on stop")
+    return True
+
+def test_flush_on_max_pending():
+    """Reaching max_pending wakes the flusher before the interval"""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = PersistenceManager(mode='group', flush_interval=60, max_pending=5)
+        manager.start()
+        chat_sessions = ChatSessionStore(os.path.join(directory, 'chat_sessions'), legacy_file=None)
+        manager.register('chat_sessions', chat_sessions.flush)
+        chat_sessions.on_dirty = lambda: manager.mark_dirty('chat_sessions')
+
+        for turn in range(5):
+            chat_sessions.append('session-1', {'type': 'user', 'message': f"turn {turn}"})
+
+        deadline = time.monotonic() + 5
+        while chat_sessions.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not chat_sessions.pending
+
+        reloaded = ChatSessionStore(os.path.join(directory, 'chat_sessions'), legacy_file=None)
+        assert len(reloaded['session-1']) == 5
+        manager.stop()
+
+        logger.info("✅ Flusher wakes when max_pending changes are waiting")
+    return True
+
+def run_persistence_tests():
+    """Run all offline persistence manager tests"""
+    tests = [
+        ("Sync Mode", test_sync_mode),
+        ("Group Commit", test_group_commit),
+        ("Flush On Max Pending", test_flush_on_max_pending),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Persistence Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_persistence_tests()
+    exit(0 if success else 1)
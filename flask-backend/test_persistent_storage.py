@@ -8,6 +8,8 @@ import json
 import os
 import time
 
+from ticket_store import TicketStore
+
 BASE_URL = "http://172.28.0.217:5000"
 
 def test_persistent_storage():
@@ -34,14 +36,13 @@ def test_persistent_storage():
     ticket_id = data['ticket_id']
     print(f"✅ Ticket created: {ticket_id}")
     
-    # Step 2: Check if ticket file was created
-    print("\n2️⃣ Checking if tickets.json file was created...")
-    if os.path.exists('tickets.json'):
-        print("✅ tickets.json file exists")
+    # Step 2: Check if ticket was written to the snapshot or change log
+    print("\n2️⃣ Checking if tickets.json / tickets_changes.jsonl were written...")
+    if os.path.exists('tickets.json') or os.path.exists('tickets_changes.jsonl'):
+        print("✅ Ticket store files exist")
         
-        # Read the file
-        with open('tickets.json', 'r') as f:
-            tickets_data = json.load(f)
+        # Read the snapshot and replay the change log
+        tickets_data = TicketStore('tickets.json', 'tickets_changes.jsonl').load()
         
         if ticket_id in tickets_data:
             print(f"✅ Ticket {ticket_id} found in file")
@@ -52,7 +53,7 @@ def test_persistent_storage():
             print(f"❌ Ticket {ticket_id} not found in file")
             return False
     else:
-        print("❌ tickets.json file not created")
+        print("❌ Ticket store files not created")
         return False
     
     # Step 3: Test API retrieval
@@ -0,0 +1,180 @@
+"""
+Offline Test for the Ticket Re-classification Job
+Tests pooled re-scoring, dry runs and resuming from a checkpoint without running the server
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+import joblib
+
+from ml_test_fixtures import CATEGORIES, PRIORITIES, TEXTS, fit_pipeline
+from reclassify_tickets import reclassify
+from ticket_store import TicketStore
+from ticket_repository import JsonTicketRepository, SqliteTicketRepository
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def write_models(directory):
+    """Fit and dump small category and priority pipelines, returning their files"""
+    files = []
+    for name, labels in (('category', CATEGORIES), ('priority', PRIORITIES)):
+        model = fit_pipeline(labels, C=100)
+        path = os.path.join(directory, f'{name}.pkl')
+        joblib.dump(model, path)
+        files.append(path)
+    return files
+
+def write_tickets(directory):
+    """Tickets stored with the fallback category/priority, plus an escalated one and one without text"""
+    tickets = {
+        f'ZER0-2025-{number:03d}': {
+            'id': f'ZER0-2025-{number:03d}',
+            'description': text,
+            'category': 'General Assistance',
+            'priority': 'medium',
+            'ai_processed': False,
+            'created_at': f'2025-08-0{number % 9 + 1}T10:00:00'
+        }
+        for number, text in enumerate(TEXTS, start=1)
+    }
+    tickets['PRIORITY-20250807-ABCD1234'] = {
+        'ticket_number': 'PRIORITY-20250807-ABCD1234',
+        'description': 'my laptop will not boot',
+        'priority': 'high',
+        'ml_category': 'General Assistance',
+        'ml_priority': 'medium',
+        'created_at': '2025-08-07T10:00:00'
+    }
+    tickets['ZER0-2025-099'] = {'id': 'ZER0-2025-099', 'category': 'General Assistance', 'priority': 'low'}
+    with open(os.path.join(directory, 'tickets.json'), 'w') as f:
+        json.dump(tickets, f)
+
+def json_repository(directory, multiprocess=False):
+    return JsonTicketRepository(TicketStore(os.path.join(directory, 'tickets.json'),
+                                            os.path.join(directory, 'tickets_changes.jsonl'),
+                                            multiprocess=multiprocess)).load()
+
+def test_pooled_resume():
+    """A run stopped after one batch resumes where it left off and rewrites each changed ticket once"""
+    with tempfile.TemporaryDirectory() as directory:
+        model_files = write_models(directory)
+        write_tickets(directory)
+        checkpoint_file = os.path.join(directory, 'checkpoint.json')
+        diff_file = os.path.join(directory, 'diffs.ndjson')
+
+        repository = json_repository(directory)
+        first = reclassify(repository, model_files, workers=2, batch_size=3,
+                           checkpoint_file=checkpoint_file, diff_file=diff_file, max_batches=1)
+        assert first['processed'] == 3 and not first['completed']
+
+        # A crash after the next batch's lines were written, before its checkpoint
+        with open(diff_file, 'a') as f:
+            f.write(json.dumps({'id': 'written-before-the-crash', 'changes': {}}) + '\n')
+
+        # Restart from the checkpoint in a fresh process view of the files
+        repository = json_repository(directory)
+        final = reclassify(repository, model_files, workers=2, batch_size=3,
+                           checkpoint_file=checkpoint_file, diff_file=diff_file, resume=True)
+        assert final['completed'] and final['processed'] == 8 and final['skipped'] == 1
+
+        repository = json_repository(directory)
+        laptop = repository.get('ZER0-2025-001')
+        assert laptop['category'] == 'Technical Help & Troubleshooting' and laptop['priority'] == 'high'
+        assert laptop['ai_processed'] and laptop['model_version'] == final['model_version']
+
+        escalated = repository.get('PRIORITY-20250807-ABCD1234')
+        assert escalated['priority'] == 'high' and escalated['ml_priority'] == 'high'
+        assert escalated['ml_category'] == 'Technical Help & Troubleshooting'
+        assert repository.get('ZER0-2025-099')['category'] == 'General Assistance'
+
+        with open(diff_file) as f:
+            changed_ids = [json.loads(line)['id'] for line in f]
+        assert len(changed_ids) == len(set(changed_ids)) == final['changed']
+        assert 'written-before-the-crash' not in changed_ids
+
+        logger.info("✅ Pooled run resumes from its checkpoint")
+    return True
+
+def test_dry_run():
+    """A dry run reports the changes but saves nothing (SQLite engine, in-process)"""
+    with tempfile.TemporaryDirectory() as directory:
+        model_files = write_models(directory)
+        write_tickets(directory)
+        store = TicketStore(os.path.join(directory, 'tickets.json'), os.path.join(directory, 'tickets_changes.jsonl'))
+        repository = SqliteTicketRepository(os.path.join(directory, 'tickets.db'), import_store=store).load()
+        revision = repository.revision()
+
+        result = reclassify(repository, model_files, workers=1, batch_size=4, dry_run=True,
+                            fields=['category'], checkpoint_file=os.path.join(directory, 'checkpoint.json'))
+        assert result['completed'] and result['changed'] > 0
+        assert repository.revision() == revision
+        assert repository.get('ZER0-2025-001')['category'] == 'General Assistance'
+
+        logger.info("✅ Dry run leaves the tickets untouched")
+    return True
+
+def test_live_updates():
+    """Tickets the app changes mid-run are still re-classified, and keep the app's change"""
+    with tempfile.TemporaryDirectory() as directory:
+        model_files = write_models(directory)
+        write_tickets(directory)
+        checkpoint_file = os.path.join(directory, 'checkpoint.json')
+        app = json_repository(directory, multiprocess=True)
+        job = json_repository(directory, multiprocess=True)
+
+        first = reclassify(job, model_files, workers=1, batch_size=3,
+                           checkpoint_file=checkpoint_file, max_batches=1)
+        assert first['processed'] == 3
+
+        # The app works every ticket - the ones visited and the ones still to come
+        for ticket_key, _ in app.list_tickets():
+            app.update(ticket_key, lambda ticket: {**ticket, 'status': 'in-progress'})
+
+        final = reclassify(job, model_files, workers=1, batch_size=3,
+                           checkpoint_file=checkpoint_file, resume=True)
+        assert final['completed'] and final['processed'] == 8
+
+        repository = json_repository(directory)
+        laptop = repository.get('ZER0-2025-001')  # Not in the first batch
+        assert laptop['category'] == 'Technical Help & Troubleshooting' and laptop['status'] == 'in-progress'
+        assert all(ticket['status'] == 'in-progress' for _, ticket in repository.list_tickets())
+
+        logger.info("✅ Tickets changed by the app mid-run are re-classified once")
+    return True
+
+def run_reclassify_tests():
+    """Run all offline re-classification job tests"""
+    tests = [
+        ("Pooled Resume", test_pooled_resume),
+        ("Dry Run", test_dry_run),
+        ("Live Updates", test_live_updates),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Re-classification Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_reclassify_tests()
+    exit(0 if success else 1)
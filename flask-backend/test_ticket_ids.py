@@ -0,0 +1,127 @@
+"""
+Offline Test for the Ticket ID Allocator
+Tests block reservation and uniqueness across processes without running the server
+"""
+
+import logging
+import multiprocessing
+import os
+import tempfile
+from datetime import datetime
+from multiprocessing import Pool
+
+from ticket_ids import TicketIdAllocator, format_ticket_id, parse_ticket_id
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_sequential_ids():
+    """IDs carry the current year and continue after a restart"""
+    with tempfile.TemporaryDirectory() as directory:
+        counter_file = os.path.join(directory, 'ticket_counter.json')
+        year = datetime.now().year
+
+        allocator = TicketIdAllocator(counter_file)
+        assert allocator.allocate() == format_ticket_id(year, 1)
+        assert allocator.allocate() == format_ticket_id(year, 2)
+
+        restarted = TicketIdAllocator(counter_file)
+        assert restarted.allocate() == format_ticket_id(year, 3)
+
+        logger.info("✅ Sequential IDs work")
+    return True
+
+def test_seed_from_existing_tickets():
+    """A year missing from the counter file starts after the highest existing ticket"""
+    with tempfile.TemporaryDirectory() as directory:
+        allocator = TicketIdAllocator(os.path.join(directory, 'ticket_counter.json'), seed=lambda year: 41)
+        ticket_id = allocator.allocate()
+        assert parse_ticket_id(ticket_id) == (datetime.now().year, 42)
+        assert parse_ticket_id('PRIORITY-20250101-ABCD1234') is None
+
+        logger.info("✅ Counter is seeded from existing tickets")
+    return True
+
+def allocate_ids(counter_file):
+    """Worker process: allocate IDs from its own allocator"""
+    allocator = TicketIdAllocator(counter_file, block_size=5)
+    return [allocator.allocate() for _ in range(30)]
+
+def test_unique_across_processes():
+    """Workers reserving blocks from one counter file never hand out the same ID"""
+    with tempfile.TemporaryDirectory() as directory:
+        counter_file = os.path.join(directory, 'ticket_counter.json')
+        with Pool(4) as pool:
+            results = pool.map(allocate_ids, [counter_file] * 4)
+
+        ticket_ids = [ticket_id for worker_ids in results for ticket_id in worker_ids]
+        assert len(set(ticket_ids)) == 120
+
+        # Each worker's own IDs are increasing
+        for worker_ids in results:
+            sequences = [parse_ticket_id(ticket_id)[1] for ticket_id in worker_ids]
+            assert sequences == sorted(sequences)
+
+        logger.info("✅ IDs are unique across processes")
+    return True
+
+inherited_allocator = None  # Set before forking, used by the forked workers
+
+def allocate_inherited_ids(count):
+    """Forked worker: allocate IDs from the allocator inherited from the parent"""
+    return [inherited_allocator.allocate() for _ in range(count)]
+
+def test_unique_after_fork():
+    """Workers forked from a process holding a reserved block (gunicorn --preload) reserve their own"""
+    global inherited_allocator
+    if not hasattr(os, 'register_at_fork'):
+        logger.info("ℹ️ No fork() on this platform - skipped")
+        return True
+
+    with tempfile.TemporaryDirectory() as directory:
+        inherited_allocator = TicketIdAllocator(os.path.join(directory, 'ticket_counter.json'), block_size=5)
+        parent_ids = [inherited_allocator.allocate()]  # The parent now holds an unused block
+
+        with multiprocessing.get_context('fork').Pool(3) as pool:
+            results = pool.map(allocate_inherited_ids, [3] * 3)
+        parent_ids += [inherited_allocator.allocate() for _ in range(3)]
+
+        ticket_ids = parent_ids + [ticket_id for worker_ids in results for ticket_id in worker_ids]
+        assert len(set(ticket_ids)) == 13
+
+        logger.info("✅ IDs are unique across forked workers")
+    return True
+
+def run_ticket_id_tests():
+    """Run all offline ticket ID allocator tests"""
+    tests = [
+        ("Sequential IDs", test_sequential_ids),
+        ("Seed From Existing Tickets", test_seed_from_existing_tickets),
+        ("Unique Across Processes", test_unique_across_processes),
+        ("Unique After Fork", test_unique_after_fork),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Ticket ID Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_ticket_id_tests()
+    exit(0 if success else 1)
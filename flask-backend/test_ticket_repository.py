@@ -0,0 +1,270 @@
+"""
+Offline Test for the Ticket Repository
+Runs the same lookups against the JSON and SQLite storage engines
+"""
+
+import logging
+import json
+import os
+import tempfile
+from multiprocessing import Pool
+
+from ticket_store import TicketStore
+from ticket_repository import JsonTicketRepository, SqliteTicketRepository
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_TICKETS = {
+    'ZER0-2025-001': {
+        'id': 'ZER0-2025-001',
+        'customer_email': 'Customer@Example.com',
+        'status': 'registered',
+        'created_at': '2025-08-07T07:31:46'
+    },
+    'PRIORITY-20250807-ABCD1234': {
+        'ticket_number': 'PRIORITY-20250807-ABCD1234',
+        'user_uid': 'uid_123',
+        'user_email': 'user@example.com',
+        'status': 'resolved',
+        'created_at': '2025-08-08T10:00:00'
+    }
+}
+
+def make_repositories(directory):
+    """Create both repositories over the same JSON snapshot"""
+    with open(os.path.join(directory, 'tickets.json'), 'w') as f:
+        json.dump(SAMPLE_TICKETS, f)
+
+    def store():
+        return TicketStore(os.path.join(directory, 'tickets.json'),
+                           os.path.join(directory, 'tickets_changes.jsonl'))
+
+    json_repo = JsonTicketRepository(store()).load()
+    sqlite_repo = SqliteTicketRepository(os.path.join(directory, 'tickets.db'), import_store=store()).load()
+    return [json_repo, sqlite_repo]
+
+def test_lookups():
+    """Primary key, alias, email and user lookups agree across engines"""
+    with tempfile.TemporaryDirectory() as directory:
+        for repo in make_repositories(directory):
+            assert repo.count() == 2
+            assert repo.get('ZER0-2025-001')['status'] == 'registered'
+
+            key, ticket = repo.resolve('PRIORITY-20250807-ABCD1234')
+            assert key == 'PRIORITY-20250807-ABCD1234'
+            assert repo.resolve('missing') == (None, None)
+
+            assert [key for key, _ in repo.find_by_customer_email('customer@example.com')] == ['ZER0-2025-001']
+            assert [key for key, _ in repo.find_for_user('uid_123', None)] == ['PRIORITY-20250807-ABCD1234']
+            assert [key for key, _ in repo.find_for_user(None, 'user@example.com')] == ['PRIORITY-20250807-ABCD1234']
+
+            # Newest first
+            assert [key for key, _ in repo.list_tickets()][0] == 'PRIORITY-20250807-ABCD1234'
+
+            logger.info(f"✅ {repo.engine} repository lookups work")
+    return True
+
+def test_save_updates_indexes():
+    """Saved changes are visible through the indexed lookups"""
+    with tempfile.TemporaryDirectory() as directory:
+        for repo in make_repositories(directory):
+            ticket = repo.get('ZER0-2025-001')
+            ticket['customer_email'] = 'new@example.com'
+            repo.save('ZER0-2025-001', ticket)
+
+            assert repo.find_by_customer_email('customer@example.com') == []
+            assert len(repo.find_by_customer_email('NEW@example.com')) == 1
+
+            logger.info(f"✅ {repo.engine} repository saves work")
+    return True
+
+def test_replayed_changes_update_indexes():
+    """Changes written by another process are indexed when the log is replayed"""
+    with tempfile.TemporaryDirectory() as directory:
+        reader, writer = make_repositories(directory)[0], make_repositories(directory)[0]
+
+        ticket = writer.get('ZER0-2025-001')
+        ticket['ticket_number'] = 'URGENT-20250807-0000AAAA'
+        ticket['customer_email'] = 'moved@example.com'
+        writer.save('ZER0-2025-001', ticket)
+
+        assert reader.resolve('URGENT-20250807-0000AAAA')[0] == 'ZER0-2025-001'
+        assert reader.find_by_customer_email('customer@example.com') == []
+        assert [key for key, _ in reader.find_by_customer_email('moved@example.com')] == ['ZER0-2025-001']
+
+        # A compaction elsewhere forces a full reload, which rebuilds the indexes
+        writer.compact()
+        assert reader.resolve('URGENT-20250807-0000AAAA')[0] == 'ZER0-2025-001'
+
+        logger.info("✅ Replayed changes update the JSON indexes")
+    return True
+
+def test_query_pages():
+    """Filtered, newest-first pages follow the cursor without repeats on both engines"""
+    with tempfile.TemporaryDirectory() as directory:
+        for repo in make_repositories(directory):
+            for number in range(1, 8):
+                ticket_id = f"ZER0-2026-{number:03d}"
+                repo.save(ticket_id, {
+                    'id': ticket_id,
+                    'status': 'registered' if number % 2 else 'resolved',
+                    'priority': 'high',
+                    'created_at': f"2026-01-0{number}T09:00:00"
+                })
+
+            seen = []
+            page, cursor = repo.query_tickets({'status': 'registered'}, limit=3)
+            seen += [key for key, _ in page]
+            while cursor:
+                page, cursor = repo.query_tickets({'status': 'registered'}, limit=3, cursor=cursor)
+                seen += [key for key, _ in page]
+
+            # ZER0-2025-001 is registered too, and oldest
+            assert seen == ['ZER0-2026-007', 'ZER0-2026-005', 'ZER0-2026-003', 'ZER0-2026-001', 'ZER0-2025-001']
+            assert repo.count_tickets({'status': 'registered'}) == 5
+
+            page, cursor = repo.query_tickets({'created_from': '2026-01-02', 'created_to': '2026-01-03'})
+            assert [key for key, _ in page] == ['ZER0-2026-003', 'ZER0-2026-002'] and cursor is None
+            assert repo.count_tickets({'priority': 'high', 'created_to': '2026-01-04'}) == 4
+
+            # Changing a filtered field moves the ticket to the other value's bucket
+            repo.save('ZER0-2026-007', dict(repo.get('ZER0-2026-007'), status='resolved'))
+            assert repo.count_tickets({'status': 'registered'}) == 4
+            assert repo.count_tickets({'status': 'resolved', 'priority': 'high'}) == 4
+            assert repo.count_tickets({'status': 'resolved', 'created_from': '2026-01-05'}) == 2
+            assert repo.count_tickets({'status': 'closed'}) == 0
+            page, cursor = repo.query_tickets({'status': 'resolved', 'priority': 'high'}, limit=2)
+            assert [key for key, _ in page] == ['ZER0-2026-007', 'ZER0-2026-006'] and cursor is not None
+
+            logger.info(f"✅ {repo.engine} repository pagination works")
+    return True
+
+def test_changes_since():
+    """Each save gets a higher revision and only later changes are returned"""
+    with tempfile.TemporaryDirectory() as directory:
+        for repo in make_repositories(directory):
+            start = repo.revision()
+
+            ticket = repo.get('ZER0-2025-001')
+            ticket['status'] = 'closed'
+            repo.save('ZER0-2025-001', ticket)
+            middle = repo.revision()
+            assert middle > start
+
+            repo.save('ZER0-2026-001', {'id': 'ZER0-2026-001', 'created_at': '2026-01-01T09:00:00'})
+
+            changes, reset = repo.changes_since(start)
+            assert not reset
+            assert [key for key, _ in changes] == ['ZER0-2025-001', 'ZER0-2026-001']
+            assert [key for key, _ in repo.changes_since(middle)[0]] == ['ZER0-2026-001']
+            assert repo.changes_since(repo.revision()) == ([], False)
+
+            # Too many changes, or a revision from the future, means reload everything
+            assert repo.changes_since(start, limit=1) == ([], True)
+            assert repo.changes_since(repo.revision() + 10) == ([], True)
+
+            logger.info(f"✅ {repo.engine} repository change feed works")
+    return True
+
+def test_version_covers_buffered_saves():
+    """The version changes on save even while the change is buffered for group commit"""
+    with tempfile.TemporaryDirectory() as directory:
+        for repo in make_repositories(directory):
+            if repo.engine == 'json':
+                repo.store.on_dirty = lambda: None  # Buffer until flush(), as under group commit
+
+            seen = [repo.version()]
+            ticket = repo.get('ZER0-2025-001')
+            ticket['status'] = 'closed'
+            repo.save('ZER0-2025-001', ticket)
+            seen.append(repo.version())
+            if repo.engine == 'json':
+                repo.flush()  # Assigns the revision
+                seen.append(repo.version())
+            repo.save('ZER0-2025-001', ticket)
+            seen.append(repo.version())
+
+            assert len(set(seen)) == len(seen)
+            logger.info(f"✅ {repo.engine} repository version tracks every save")
+    return True
+
+def multiprocess_repository(directory):
+    """A worker's JSON repository over shared files, with group commit hooked up"""
+    store = TicketStore(os.path.join(directory, 'tickets.json'),
+                        os.path.join(directory, 'tickets_changes.jsonl'), multiprocess=True)
+    store.on_dirty = lambda: None  # Would buffer until flush() without multiprocess
+    return JsonTicketRepository(store).load()
+
+def increment_views(args):
+    """Worker process: read-modify-write one ticket's counter through its own repository"""
+    directory, times = args
+    repo = multiprocess_repository(directory)
+    for _ in range(times):
+        repo.update('ZER0-2025-001', lambda ticket: {**ticket, 'views': ticket.get('views', 0) + 1})
+
+def test_concurrent_updates():
+    """update() never loses a concurrent change, and multiprocess saves are visible to other workers at once"""
+    with tempfile.TemporaryDirectory() as directory:
+        for repo in make_repositories(directory):
+            if repo.engine == 'sqlite':
+                repo.update('ZER0-2025-001', lambda ticket: {**ticket, 'status': 'closed'})
+                assert repo.get('ZER0-2025-001')['status'] == 'closed'
+                assert repo.update('missing', lambda ticket: ticket) is None
+
+        with Pool(4) as pool:
+            pool.map(increment_views, [(directory, 25)] * 4)
+
+        reader, writer = multiprocess_repository(directory), multiprocess_repository(directory)
+        assert reader.get('ZER0-2025-001')['views'] == 100
+
+        # A batch is one locked write, applied in order
+        def increment(ticket):
+            return {**ticket, 'views': ticket.get('views', 0) + 1}
+        updated = writer.update_many([('ZER0-2025-001', increment), ('missing', increment),
+                                      ('ZER0-2025-001', increment)])
+        assert updated[1] is None and updated[2]['views'] == 102
+        assert reader.get('ZER0-2025-001')['views'] == 102
+
+        writer.save('ZER0-2025-002', {'id': 'ZER0-2025-002', 'created_at': '2025-08-09T10:00:00'})
+        assert reader.get('ZER0-2025-002') is not None  # No group-commit delay between workers
+
+        logger.info("✅ Concurrent updates are all kept")
+    return True
+
+def run_ticket_repository_tests():
+    """Run all offline ticket repository tests"""
+    tests = [
+        ("Lookups", test_lookups),
+        ("Save Updates Indexes", test_save_updates_indexes),
+        ("Replayed Changes Update Indexes", test_replayed_changes_update_indexes),
+        ("Query Pages", test_query_pages),
+        ("Changes Since", test_changes_since),
+        ("Version Covers Buffered Saves", test_version_covers_buffered_saves),
+        ("Concurrent Updates", test_concurrent_updates),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Ticket Repository Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_ticket_repository_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,128 @@
+"""
+Offline Test for the Ticket Statistics
+Tests incrementally maintained counters against a full recount without running the server
+"""
+
+import logging
+import os
+import tempfile
+
+from ticket_repository import JsonTicketRepository, SqliteTicketRepository
+from ticket_stats import TicketAggregates, RESOLVED_STATUSES
+from ticket_store import TicketStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def recount(tickets):
+    """Counters the slow way, as the dashboard used to compute them"""
+    resolved = [t for t in tickets if t.get('status') in RESOLVED_STATUSES]
+    return {
+        'total': len(tickets),
+        'open': len(tickets) - len(resolved),
+        'resolved': len(resolved),
+        'urgent': len([t for t in tickets if t.get('priority') == 'urgent']),
+        'resolution_time': sum(t.get('resolution_time', 0) for t in resolved)
+    }
+
+def sample_ticket(number):
+    return {
+        'id': f"ZER0-2025-{number:03d}",
+        'created_at': f"2025-08-{number % 28 + 1:02d}T10:00:00",
+        'status': ['registered', 'in_progress', 'resolved', 'closed'][number % 4],
+        'priority': ['low', 'urgent'][number % 2],
+        'category': ['technical', 'billing', 'general'][number % 3],
+        'assigned_agent_id': ['sarah_tech', 'mike_billing'][number % 2],
+        'resolution_time': number,
+        'user_uid': 'uid-1' if number % 3 == 0 else None,
+        'user_email': 'user@example.com' if number % 2 == 0 else 'other@example.com'
+    }
+
+def test_counters_follow_changes():
+    """Updates move a ticket's contribution, including changes made in place"""
+    aggregates = TicketAggregates()
+    tickets = {number: sample_ticket(number) for number in range(1, 21)}
+    for number, ticket in tickets.items():
+        aggregates.update(number, ticket)
+
+    # Change some tickets in place, as the status routes do, then re-save them
+    for number in (2, 5, 9):
+        tickets[number]['status'] = 'resolved'
+        tickets[number]['priority'] = 'urgent'
+        aggregates.update(number, tickets[number])
+
+    assert aggregates.counters('all') == recount(list(tickets.values()))
+    assert aggregates.counters('category', 'billing') == recount(
+        [t for t in tickets.values() if t['category'] == 'billing'])
+    assert aggregates.summary()['by_agent']['sarah_tech'] == recount(
+        [t for t in tickets.values() if t['assigned_agent_id'] == 'sarah_tech'])
+
+    owned = [t for t in tickets.values() if t['user_uid'] == 'uid-1' or t['user_email'] == 'user@example.com']
+    assert aggregates.user_counters('uid-1', 'user@example.com') == recount(owned)
+
+    aggregates.update(1, None)
+    assert aggregates.counters('all')['total'] == 19
+
+    logger.info("✅ Counters match a full recount after changes")
+    return True
+
+def test_repository_user_stats():
+    """Both engines answer user stats from counters that track saves"""
+    with tempfile.TemporaryDirectory() as directory:
+        def store():
+            return TicketStore(os.path.join(directory, 'tickets.json'),
+                               os.path.join(directory, 'tickets_changes.jsonl'))
+
+        json_repo = JsonTicketRepository(store()).load()
+        for number in range(1, 13):
+            json_repo.save(f"ZER0-2025-{number:03d}", sample_ticket(number))
+        sqlite_repo = SqliteTicketRepository(os.path.join(directory, 'tickets.db'), import_store=store()).load()
+
+        for repo in (json_repo, sqlite_repo):
+            ticket = repo.get('ZER0-2025-004')
+            ticket['status'] = 'closed'
+            repo.save('ZER0-2025-004', ticket)
+
+            owned = [ticket for _, ticket in repo.find_for_user('uid-1', 'user@example.com')]
+            expected = recount(owned)
+            stats = repo.user_stats('uid-1', 'user@example.com')
+            assert stats['total_tickets'] == expected['total']
+            assert stats['open_tickets'] == expected['open']
+            assert stats['urgent_tickets'] == expected['urgent']
+            assert stats['avg_resolution_time'] == expected['resolution_time'] / expected['resolved']
+            assert repo.stats_summary()['all']['total'] == 12
+
+            logger.info(f"✅ {repo.engine} repository keeps user stats current")
+    return True
+
+def run_ticket_stats_tests():
+    """Run all offline ticket statistics tests"""
+    tests = [
+        ("Counters Follow Changes", test_counters_follow_changes),
+        ("Repository User Stats", test_repository_user_stats),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Ticket Stats Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_ticket_stats_tests()
+    exit(0 if success else 1)
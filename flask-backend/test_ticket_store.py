@@ -0,0 +1,143 @@
+"""
+Offline Test for the Ticket Store
+Tests the snapshot + append-only change log without running the server
+"""
+
+import logging
+import json
+import os
+import tempfile
+from multiprocessing import Pool
+
+from ticket_store import TicketStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_store(directory, compact_every=500, multiprocess=False):
+    """Create a ticket store inside a scratch directory"""
+    return TicketStore(os.path.join(directory, 'tickets.json'),
+                       os.path.join(directory, 'tickets_changes.jsonl'),
+                       compact_every=compact_every, multiprocess=multiprocess)
+
+def test_append_and_replay():
+    """Changes appended to the log are replayed on the next load"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        store.load()
+
+        store.tickets['ZER0-2025-001'] = {'id': 'ZER0-2025-001', 'status': 'registered'}
+        store.append('ZER0-2025-001')
+        store.tickets['ZER0-2025-001']['status'] = 'closed'
+        store.append('ZER0-2025-001')
+
+        # Only the log was written, one line per change
+        assert not os.path.exists(store.snapshot_file)
+        with open(store.log_file) as f:
+            assert len(f.readlines()) == 2
+
+        reloaded = make_store(directory)
+        reloaded.load()
+        assert reloaded.tickets['ZER0-2025-001']['status'] == 'closed'
+
+        logger.info("✅ Change log replay works")
+    return True
+
+def test_compaction():
+    """Compaction folds the log into the snapshot and truncates it"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory, compact_every=3)
+        store.load()
+
+        for number in range(1, 4):
+            ticket_id = f"ZER0-2025-{number:03d}"
+            store.tickets[ticket_id] = {'id': ticket_id}
+            store.append(ticket_id)
+
+        assert store.log_records == 0
+        assert os.path.getsize(store.log_file) == 0
+        with open(store.snapshot_file) as f:
+            assert len(json.load(f)) == 3
+
+        logger.info("✅ Periodic compaction works")
+    return True
+
+def test_torn_log_line():
+    """A partially written final record is skipped instead of failing the load"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        store.load()
+        store.tickets['ZER0-2025-001'] = {'id': 'ZER0-2025-001'}
+        store.append('ZER0-2025-001')
+
+        with open(store.log_file, 'a') as f:
+            f.write('{"op": "put", "id": "ZER0-2025-0')
+
+        reloaded = make_store(directory)
+        reloaded.load()
+        assert list(reloaded.tickets) == ['ZER0-2025-001']
+
+        logger.info("✅ Torn log records are ignored")
+    return True
+
+def write_tickets(args):
+    """Worker process: save tickets through its own store instance"""
+    directory, worker = args
+    store = make_store(directory, compact_every=7, multiprocess=True)
+    store.load()
+    for number in range(25):
+        ticket_id = f"ZER0-W{worker}-{number:03d}"
+        store.tickets[ticket_id] = {'id': ticket_id, 'worker': worker}
+        store.append(ticket_id)
+    return len(store.tickets)
+
+def test_multiprocess_writers():
+    """Concurrent workers appending and compacting never lose each other's tickets"""
+    with tempfile.TemporaryDirectory() as directory:
+        with Pool(4) as pool:
+            pool.map(write_tickets, [(directory, worker) for worker in range(4)])
+
+        reloaded = make_store(directory, multiprocess=True)
+        reloaded.load()
+        assert len(reloaded.tickets) == 100
+
+        # Writers caught up before stamping, so no two tickets share a revision
+        revisions = [ticket['revision'] for ticket in reloaded.tickets.values()]
+        assert len(set(revisions)) == 100 and reloaded.revision == max(revisions)
+
+        logger.info("✅ Multiprocess writers keep every ticket")
+    return True
+
+def run_ticket_store_tests():
+    """Run all offline ticket store tests"""
+    tests = [
+        ("Append and Replay", test_append_and_replay),
+        ("Compaction", test_compaction),
+        ("Torn Log Line", test_torn_log_line),
+        ("Multiprocess Writers", test_multiprocess_writers),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        logger.info(f"\n--- Testing {test_name} ---")
+        try:
+            if test_func():
+                passed += 1
+                logger.info(f"✅ {test_name} PASSED")
+            else:
+                failed += 1
+                logger.error(f"❌ {test_name} FAILED")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ {test_name} FAILED with exception: {e}")
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Ticket Store Test Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_ticket_store_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,91 @@
+"""
+Ticket ID Allocator
+Unique ZER0-<year>-<sequence> ticket IDs from a per-year counter file
+"""
+
+import json
+import os
+import re
+import threading
+import logging
+from datetime import datetime
+
+from persistence import atomic_write_json, file_lock
+
+logger = logging.getLogger(__name__)
+
+TICKET_ID_PATTERN = re.compile(r'^ZER0-(\d{4})-(\d+)$')
+
+def format_ticket_id(year, sequence):
+    """Ticket ID for a year and sequence number, e.g. ZER0-2025-007"""
+    return f"ZER0-{year}-{sequence:03d}"
+
+def parse_ticket_id(ticket_id):
+    """(year, sequence) of a ZER0-<year>-<sequence> ID, or None for other formats"""
+    match = TICKET_ID_PATTERN.match(ticket_id or '')
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+class TicketIdAllocator:
+    """Hands out ticket IDs from blocks reserved in a shared counter file
+
+    The counter file maps each year to the next unreserved sequence number.
+    A process reserves block_size numbers at a time under the file lock and
+    allocates from its block in memory, so several workers never hand out the
+    same ID and only touch the file once per block. Numbers left in a block
+    when a process exits are skipped, which leaves gaps but never duplicates.
+    """
+
+    def __init__(self, counter_file='ticket_counter.json', block_size=1, seed=None):
+        self.counter_file = counter_file
+        self.block_size = max(1, block_size)
+        self.seed = seed  # Called as seed(year) -> highest sequence already used, for years not in the file
+        self.lock = threading.Lock()
+        self.year = None
+        self.next_sequence = 0
+        self.block_end = 0  # First sequence number past our reserved block
+        if hasattr(os, 'register_at_fork'):  # Not on Windows
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """A forked worker reserves its own block instead of sharing the parent's"""
+        self.lock = threading.Lock()
+        self.year = None
+        self.next_sequence = 0
+        self.block_end = 0
+
+    def _read_counters(self):
+        if not os.path.exists(self.counter_file):
+            return {}
+        try:
+            with open(self.counter_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            # Re-seeding from the existing tickets is safe, just slower
+            logger.error(f"Failed to read ticket counter file, re-seeding: {e}")
+            return {}
+
+    def _reserve_block(self, year):
+        """Reserve the next block of sequence numbers for a year"""
+        with file_lock(self.counter_file):
+            counters = self._read_counters()
+            start = counters.get(str(year))
+            if start is None:
+                start = (self.seed(year) if self.seed else 0) + 1
+            counters[str(year)] = start + self.block_size
+            atomic_write_json(self.counter_file, counters, fsync=True)
+
+        self.year = year
+        self.next_sequence = start
+        self.block_end = start + self.block_size
+
+    def allocate(self):
+        """Next ticket ID for the current year"""
+        year = datetime.now().year
+        with self.lock:
+            if year != self.year or self.next_sequence >= self.block_end:
+                self._reserve_block(year)
+            sequence = self.next_sequence
+            self.next_sequence += 1
+        return format_ticket_id(year, sequence)
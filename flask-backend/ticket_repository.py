@@ -0,0 +1,752 @@
+"""
+Ticket Repository
+Storage-engine independent access to tickets (JSON change log or SQLite)
+"""
+
+import json
+import os
+import base64
+import bisect
+import copy
+import sqlite3
+import threading
+import logging
+
+from ticket_store import TicketStore
+from ticket_stats import TicketAggregates, dashboard_stats
+from persistence import get_persistence_manager, STORAGE_MULTIPROCESS
+
+logger = logging.getLogger(__name__)
+
+# Storage configuration
+TICKET_STORAGE = os.getenv('TICKET_STORAGE', 'json')  # 'json' or 'sqlite'
+TICKETS_FILE = os.getenv('TICKETS_FILE', 'tickets.json')
+TICKETS_LOG_FILE = os.getenv('TICKETS_LOG_FILE', 'tickets_changes.jsonl')
+TICKETS_DB_FILE = os.getenv('TICKETS_DB_FILE', 'tickets.db')
+TICKETS_COMPACT_EVERY = int(os.getenv('TICKETS_COMPACT_EVERY', '500'))
+
+# Fields /api/tickets can filter on with an exact match
+FILTER_FIELDS = ['status', 'priority', 'category', 'assigned_agent_id']
+
+def encode_cursor(position):
+    """Opaque page cursor for a (created_at, ticket_key) position"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """(created_at, ticket_key) position from a page cursor - raises ValueError if malformed"""
+    try:
+        created_at, ticket_key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(created_at), str(ticket_key)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def changed_at(ticket):
+    """When a ticket last changed, for ?since= exports: updated_at, else created_at
+
+    New tickets are stamped "YYYY-MM-DD HH:MM:SS" and updates isoformat(),
+    so the date/time separator is normalised to 'T' to compare the two.
+    """
+    changed = ticket.get('updated_at') or ticket.get('created_at') or ''
+    return changed.replace(' ', 'T', 1)
+
+def _date_bounds(filters):
+    """(lowest, highest) created_at sort keys for the created_from / created_to filters
+
+    created_to is inclusive, so created_to=2025-08-07 covers the whole day.
+    """
+    return filters.get('created_from') or '', (filters.get('created_to') or '\uffff') + '\uffff'
+
+class JsonTicketRepository:
+    """Tickets held in memory and persisted through the TicketStore change log
+
+    The in-memory tickets are the shared cache for app.py and every blueprint.
+    Reads first check the store files' mtime/size so changes written by other
+    processes are picked up without re-parsing the store on every request.
+
+    Secondary indexes (customer email, ticket_number/id alias, user UID and
+    user email) are kept up to date on save and on replayed changes, so
+    lookups by those fields don't scan every ticket. Each value of the
+    /api/tickets filter fields also has its own created_at-sorted bucket, so
+    a filtered page walks only the smallest matching bucket and a filtered
+    count is a bisect. The dashboard counters (TicketAggregates) are moved
+    along with them.
+    """
+
+    engine = 'json'
+
+    def __init__(self, store):
+        self.store = store
+        self.tickets = store.tickets
+        self.lock = threading.RLock()
+
+        # Index name -> value -> {ticket_key: None} (a dict keeps ticket order)
+        self.indexes = {'customer_email': {}, 'user_uid': {}, 'user_email': {}}
+        self.aliases = {}  # ticket_number / id -> ticket_key
+        self.by_created = []  # Sorted (created_at, ticket_key), oldest first
+        self.by_revision = []  # Sorted (revision, ticket_key), oldest change first
+        self.by_changed = []  # Sorted (updated_at, else created_at, ticket_key), oldest first
+        self.by_value = {}  # (filter field, value) -> sorted (created_at, ticket_key), oldest first
+        self.indexed = {}  # ticket_key -> values it is currently indexed under
+        self.aggregates = TicketAggregates()
+        store.on_put = self._index
+        store.on_reload = self._rebuild_indexes
+
+    def _index_values(self, ticket):
+        """Index name -> values a ticket should be found under"""
+        return {
+            'customer_email': {(ticket.get('customer_email') or '').lower()} - {''},
+            'user_uid': {ticket.get('user_uid')} - {None, ''},
+            'user_email': {ticket.get('user_email'), ticket.get('email')} - {None, ''},
+            'alias': {ticket.get('ticket_number'), ticket.get('id')} - {None, ''},
+        }
+
+    def _sorted_index(self, name):
+        """Sorted list of (key value, ticket_key) for 'created_at', 'revision' or a (field, value) bucket"""
+        if name == 'created_at':
+            return self.by_created
+        if name == 'revision':
+            return self.by_revision
+        if name == 'changed_at':
+            return self.by_changed
+        return self.by_value.setdefault(name, [])
+
+    def _index(self, ticket_key):
+        """Move a ticket from the index entries of its old field values to its current ones"""
+        old = self.indexed.pop(ticket_key, None)
+        if old:
+            old_values, old_positions = old
+            for name, entry in old_positions.items():
+                entries = self._sorted_index(name)
+                position = bisect.bisect_left(entries, entry)
+                if position < len(entries) and entries[position] == entry:
+                    del entries[position]
+                if not entries and isinstance(name, tuple):
+                    del self.by_value[name]
+
+            for name, values in old_values.items():
+                for value in values:
+                    if name == 'alias':
+                        if self.aliases.get(value) == ticket_key:
+                            del self.aliases[value]
+                        continue
+                    keys = self.indexes[name].get(value)
+                    if keys is not None:
+                        keys.pop(ticket_key, None)
+                        if not keys:
+                            del self.indexes[name][value]
+
+        ticket = self.tickets.get(ticket_key)
+        self.aggregates.update(ticket_key, ticket)
+        if ticket is None:
+            return
+        new_values = self._index_values(ticket)
+        for name, values in new_values.items():
+            for value in values:
+                if name == 'alias':
+                    self.aliases[value] = ticket_key
+                else:
+                    self.indexes[name].setdefault(value, {})[ticket_key] = None
+
+        created = (ticket.get('created_at') or '', ticket_key)
+        new_positions = {
+            'created_at': created,
+            'revision': (ticket.get('revision', 0), ticket_key),
+            'changed_at': (changed_at(ticket), ticket_key),
+        }
+        for field in FILTER_FIELDS:
+            if isinstance(ticket.get(field), str) and ticket[field]:  # Filters only ever match strings
+                new_positions[(field, ticket[field])] = created
+        for name, entry in new_positions.items():
+            bisect.insort(self._sorted_index(name), entry)
+        self.indexed[ticket_key] = (new_values, new_positions)
+
+    def _rebuild_indexes(self):
+        """Index every ticket from scratch after a full reload"""
+        for index in self.indexes.values():
+            index.clear()
+        self.aliases.clear()
+        self.by_created.clear()
+        self.by_revision.clear()
+        self.by_changed.clear()
+        self.by_value.clear()
+        self.indexed.clear()
+        self.aggregates.clear()
+        for ticket_key in self.tickets:
+            self._index(ticket_key)
+
+    def _lookup(self, name, value):
+        """Ticket keys indexed under a value"""
+        return list(self.indexes[name].get(value, ()))
+
+    def load(self):
+        """Load the snapshot and replay the change log"""
+        with self.lock:
+            self.store.load()
+        return self
+
+    def count(self):
+        """Total number of tickets"""
+        with self.lock:
+            self.store.refresh()
+            return len(self.tickets)
+
+    def get(self, ticket_key):
+        """Get a ticket by its primary key"""
+        with self.lock:
+            self.store.refresh()
+            return self.tickets.get(ticket_key)
+
+    def resolve(self, ticket_id):
+        """Find a ticket by primary key, ticket_number or id alias - returns (key, ticket)"""
+        with self.lock:
+            self.store.refresh()
+            if ticket_id in self.tickets:
+                return ticket_id, self.tickets[ticket_id]
+
+            key = self.aliases.get(ticket_id)
+            if key in self.tickets:
+                return key, self.tickets[key]
+
+        return None, None
+
+    def save(self, ticket_key, ticket):
+        """Insert or update a ticket"""
+        with self.lock:
+            self.tickets[ticket_key] = ticket
+            self._index(ticket_key)
+            self.store.append(ticket_key)
+
+    def update(self, ticket_key, func):
+        """Read-modify-write of one ticket, atomic across threads and (multiprocess) workers
+
+        func gets a copy of the latest stored ticket and returns the ticket
+        to save, or None to leave it unchanged. Returns the stored ticket
+        afterwards, or None if there is no such ticket.
+        """
+        return self.update_many([(ticket_key, func)])[0]
+
+    def update_many(self, updates):
+        """update() for a batch of (ticket_key, func) pairs - returns the stored tickets in order
+
+        The whole batch is one read-modify-write: other workers are kept out
+        until it is done and the changes go to the log in a single append.
+        """
+        with self.lock, self.store.transaction():
+            return [self._update(ticket_key, func) for ticket_key, func in updates]
+
+    def _update(self, ticket_key, func):
+        ticket = self.tickets.get(ticket_key)
+        if ticket is None:
+            return None
+        updated = func(copy.deepcopy(ticket))
+        if updated is None:
+            return ticket
+        self.tickets[ticket_key] = updated
+        self._index(ticket_key)
+        self.store.append(ticket_key)
+        return updated
+
+    def find_by_customer_email(self, email):
+        """Tickets whose customer_email matches (case-insensitive)"""
+        with self.lock:
+            self.store.refresh()
+            return [(key, self.tickets[key]) for key in self._lookup('customer_email', email.lower())]
+
+    def find_for_user(self, user_uid, email):
+        """Tickets owned by a dashboard user (matched by UID or email)"""
+        with self.lock:
+            self.store.refresh()
+            keys = dict.fromkeys(self._lookup('user_uid', user_uid) + self._lookup('user_email', email))
+            return [(key, self.tickets[key]) for key in keys]
+
+    def list_tickets(self):
+        """All tickets, newest first"""
+        with self.lock:
+            self.store.refresh()
+            return [(key, self.tickets[key]) for _, key in reversed(self.by_created)]
+
+    def _candidates(self, filters, before=None):
+        """(entries, start, end, wanted): the slice of the smallest filter bucket (or of the created_at
+        index) within the date bounds and before the cursor, and the field filters still to check"""
+        wanted = [(field, filters[field]) for field in FILTER_FIELDS if filters.get(field)]
+        buckets = [self.by_value.get(name, []) for name in wanted]
+        entries = min(buckets, key=len) if buckets else self.by_created
+
+        lowest, highest = _date_bounds(filters)
+        start = bisect.bisect_left(entries, (lowest,))
+        end = bisect.bisect_left(entries, (highest,))
+        if before is not None:
+            end = min(end, bisect.bisect_left(entries, tuple(before)))
+        return entries, start, max(start, end), wanted
+
+    def _matching_entries(self, filters, before=None):
+        """(created_at, ticket_key) entries matching the filters, newest first, optionally only before a cursor"""
+        entries, start, end, wanted = self._candidates(filters, before)
+        for position in range(end - 1, start - 1, -1):
+            ticket = self.tickets[entries[position][1]]
+            if all(ticket.get(field) == value for field, value in wanted):
+                yield entries[position]
+
+    def query_tickets(self, filters=None, limit=50, cursor=None):
+        """Newest-first page of tickets matching the filters - returns (items, next cursor position)
+
+        Walks the smallest bucket among the filtered values from the cursor,
+        so a page costs about `limit` tickets unless several field filters
+        are combined and rarely match together.
+        """
+        filters = filters or {}
+        with self.lock:
+            self.store.refresh()
+            items = []
+            last_entry = None  # (created_at, ticket_key) of the last item taken
+            for entry in self._matching_entries(filters, before=cursor):
+                if len(items) == limit:
+                    # There is at least one more match - the next page starts after the last item
+                    return items, list(last_entry) if last_entry else None
+                items.append((entry[1], self.tickets[entry[1]]))
+                last_entry = entry
+            return items, None
+
+    def count_tickets(self, filters=None):
+        """Number of tickets matching the filters
+
+        A bisect of one bucket for at most one field filter (plus dates);
+        combined field filters walk the smallest of their buckets.
+        """
+        filters = filters or {}
+        with self.lock:
+            self.store.refresh()
+            entries, start, end, wanted = self._candidates(filters)
+            if len(wanted) <= 1:
+                return end - start
+            return sum(1 for _ in self._matching_entries(filters))
+
+    def flush(self, fsync=False):
+        """Write buffered changes to the change log"""
+        with self.lock:
+            self.store.flush(fsync)
+
+    def revision(self):
+        """Current ticket revision - the highest revision of any written change"""
+        with self.lock:
+            self.store.refresh()
+            return self.store.revision
+
+    def version(self):
+        """Token that changes with every ticket change, including ones not flushed yet
+
+        Revisions are assigned when buffered changes are written, so the
+        number of buffered changes is part of the token: (revision, pending)
+        never repeats because pending only grows until a flush raises revision.
+        """
+        with self.lock:
+            self.store.refresh()
+            return (self.store.revision, len(self.store.pending))
+
+    def changes_since(self, revision, limit=500):
+        """Tickets changed after a revision, oldest change first - returns (items, reset)
+
+        reset is True when the caller should reload everything instead: the
+        revision is ahead of the store (it was replaced or restored) or more
+        than `limit` tickets changed since.
+        """
+        with self.lock:
+            self.store.refresh()
+            if revision > self.store.revision:
+                return [], True
+            start = bisect.bisect_left(self.by_revision, (revision + 1,))
+            if len(self.by_revision) - start > limit:
+                return [], True
+            return [(key, self.tickets[key]) for _, key in self.by_revision[start:]], False
+
+    def export_page(self, after=None, limit=500):
+        """Up to `limit` tickets in (revision, ticket_key) order, after a position - for bulk exports
+
+        The tickets are copies taken under the lock, so the caller can encode
+        them while other requests keep saving.
+        """
+        with self.lock:
+            self.store.refresh()
+            start = bisect.bisect_right(self.by_revision, tuple(after)) if after else 0
+            return [(key, copy.deepcopy(self.tickets[key])) for _, key in self.by_revision[start:start + limit]]
+
+    def export_start(self, since):
+        """Export position just before the earliest-changed ticket updated (or created) at or after since
+
+        None when no ticket changed since then. Only tickets at or after
+        that revision can match, so a since= export starts there.
+        """
+        with self.lock:
+            self.store.refresh()
+            start = bisect.bisect_left(self.by_changed, (since,))
+            revisions = [self.tickets[key].get('revision', 0) for _, key in self.by_changed[start:]]
+            return (min(revisions), '') if revisions else None
+
+    def user_stats(self, user_uid, email):
+        """Dashboard statistics over a user's tickets, from the maintained counters"""
+        with self.lock:
+            self.store.refresh()
+            return dashboard_stats(self.aggregates.user_counters(user_uid, email))
+
+    def stats_summary(self):
+        """Overall, per-category and per-agent ticket counters"""
+        with self.lock:
+            self.store.refresh()
+            return self.aggregates.summary()
+
+    def compact(self):
+        """Fold the change log into the snapshot"""
+        with self.lock:
+            self.store.compact()
+
+class SqliteTicketRepository:
+    """Tickets stored in SQLite with secondary indexes on the lookup fields"""
+
+    engine = 'sqlite'
+
+    # Lookup columns extracted from the ticket JSON; the full ticket lives in `data`
+    INDEXED_COLUMNS = ['ticket_number', 'ticket_ref', 'customer_email', 'user_uid', 'user_email',
+                       'email', 'assigned_agent_id', 'status', 'created_at', 'priority', 'category',
+                       'revision', 'updated_at']
+    COLUMN_TYPES = {'revision': 'INTEGER'}  # Everything else is TEXT
+
+    def __init__(self, db_file, import_store=None):
+        self.db_file = db_file
+        self.import_store = import_store  # JSON store imported on first start
+        self.lock = threading.Lock()
+        self.conn = None
+        self.inherited_connections = []  # Connections a forked worker got from its parent - never touched
+        self.aggregates = TicketAggregates()
+        self.aggregates_revision = -1  # Changes up to this revision are counted in aggregates
+        if hasattr(os, 'register_at_fork'):  # Not on Windows
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _after_fork(self):
+        """Open a connection of our own in a forked worker (gunicorn --preload)
+
+        SQLite connections must not be used across fork(); the inherited one
+        is kept referenced but never used or closed here, so closing it cannot
+        disturb the parent's locks.
+        """
+        self.lock = threading.Lock()
+        if self.conn is not None:
+            self.inherited_connections.append(self.conn)
+            self.conn = self._connect()
+
+    def load(self):
+        """Open the database, create the schema and import the JSON store if empty"""
+        self.conn = self._connect()
+
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS tickets (
+                    ticket_key TEXT PRIMARY KEY,
+                    ticket_number TEXT,
+                    ticket_ref TEXT,
+                    customer_email TEXT,
+                    user_uid TEXT,
+                    user_email TEXT,
+                    email TEXT,
+                    assigned_agent_id TEXT,
+                    status TEXT,
+                    created_at TEXT,
+                    data TEXT NOT NULL
+                )
+            """)
+            self._add_missing_columns()
+            # Tickets written before revisions existed sort first in change feeds and exports
+            self.conn.execute("UPDATE tickets SET revision = 0 WHERE revision IS NULL")
+            for column in self.INDEXED_COLUMNS:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_tickets_{column} ON tickets ({column})")
+
+        if self.count() == 0 and self.import_store is not None:
+            self._import_json_store()
+
+        logger.info(f"Opened SQLite ticket store {self.db_file} with {self.count()} tickets")
+        return self
+
+    def _add_missing_columns(self):
+        """Add lookup columns introduced after the database was created, filled from the ticket JSON"""
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(tickets)")}
+        for column in self.INDEXED_COLUMNS:
+            if column not in existing:
+                column_type = self.COLUMN_TYPES.get(column, 'TEXT')
+                self.conn.execute(f"ALTER TABLE tickets ADD COLUMN {column} {column_type}")
+                self.conn.execute(f"UPDATE tickets SET {column} = json_extract(data, '$.{column}')")
+                logger.info(f"Added column {column} to {self.db_file}")
+
+    def _import_json_store(self):
+        """One-time import of the existing JSON tickets"""
+        imported = self.import_store.load()
+        if not imported:
+            return
+
+        with self.lock, self.conn:
+            self.conn.executemany(self._upsert_sql(),
+                                  [self._row(key, ticket) for key, ticket in imported.items()])
+        logger.info(f"Imported {len(imported)} tickets from {self.import_store.snapshot_file} into {self.db_file}")
+
+    def _upsert_sql(self):
+        columns = ['ticket_key'] + self.INDEXED_COLUMNS + ['data']
+        placeholders = ', '.join('?' for _ in columns)
+        return f"INSERT OR REPLACE INTO tickets ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def _row(self, ticket_key, ticket):
+        """Column values for one ticket"""
+        return (
+            ticket_key,
+            ticket.get('ticket_number'),
+            ticket.get('id'),
+            (ticket.get('customer_email') or '').lower() or None,
+            ticket.get('user_uid'),
+            ticket.get('user_email'),
+            ticket.get('email'),
+            ticket.get('assigned_agent_id'),
+            ticket.get('status'),
+            ticket.get('created_at') or '',
+            ticket.get('priority'),
+            ticket.get('category'),
+            ticket.get('revision', 0),
+            ticket.get('updated_at'),
+            json.dumps(ticket)
+        )
+
+    def _query(self, sql, params=()):
+        """Run a query returning (key, ticket) pairs"""
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [(key, json.loads(data)) for key, data in rows]
+
+    def count(self):
+        """Total number of tickets"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+    def get(self, ticket_key):
+        """Get a ticket by its primary key"""
+        rows = self._query("SELECT ticket_key, data FROM tickets WHERE ticket_key = ?", (ticket_key,))
+        return rows[0][1] if rows else None
+
+    def resolve(self, ticket_id):
+        """Find a ticket by primary key, ticket_number or id alias - returns (key, ticket)"""
+        rows = self._query("""
+            SELECT ticket_key, data FROM tickets WHERE ticket_key = ?
+            UNION ALL SELECT ticket_key, data FROM tickets WHERE ticket_number = ?
+            UNION ALL SELECT ticket_key, data FROM tickets WHERE ticket_ref = ?
+            LIMIT 1
+        """, (ticket_id, ticket_id, ticket_id))
+        return rows[0] if rows else (None, None)
+
+    def save(self, ticket_key, ticket):
+        """Insert or update a ticket, stamping it with the next revision"""
+        with self.lock:
+            # IMMEDIATE takes the write lock up front, so no other process can use the same revision
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write(ticket_key, ticket)
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def update(self, ticket_key, func):
+        """Read-modify-write of one ticket in a single write transaction
+
+        func gets the latest stored ticket and returns the ticket to save, or
+        None to leave it unchanged. Returns the stored ticket afterwards, or
+        None if there is no such ticket.
+        """
+        return self.update_many([(ticket_key, func)])[0]
+
+    def update_many(self, updates):
+        """update() for a batch of (ticket_key, func) pairs in one write transaction
+
+        Returns the stored tickets in order; the batch commits (or rolls back) as a whole.
+        """
+        with self.lock:
+            # Taking the write lock before the reads keeps other processes out until we commit
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                results = [self._update(ticket_key, func) for ticket_key, func in updates]
+                self.conn.commit()
+                return results
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def _update(self, ticket_key, func):
+        row = self.conn.execute("SELECT data FROM tickets WHERE ticket_key = ?", (ticket_key,)).fetchone()
+        ticket = json.loads(row[0]) if row else None
+        updated = func(ticket) if ticket is not None else None
+        if updated is None:
+            return ticket
+        self._write(ticket_key, updated, commit=False)
+        return updated
+
+    def _write(self, ticket_key, ticket, commit=True):
+        """Stamp the next revision, upsert and (unless batched) commit - inside a BEGIN IMMEDIATE transaction"""
+        revision = self.conn.execute("SELECT COALESCE(MAX(revision), 0) + 1 FROM tickets").fetchone()[0]
+        ticket['revision'] = revision
+        self.conn.execute(self._upsert_sql(), self._row(ticket_key, ticket))
+        if commit:
+            self.conn.commit()
+
+    def find_by_customer_email(self, email):
+        """Tickets whose customer_email matches (case-insensitive)"""
+        return self._query("SELECT ticket_key, data FROM tickets WHERE customer_email = ?",
+                           (email.lower(),))
+
+    def find_for_user(self, user_uid, email):
+        """Tickets owned by a dashboard user (matched by UID or email)"""
+        return self._query("""
+            SELECT ticket_key, data FROM tickets WHERE user_uid = ?
+            UNION SELECT ticket_key, data FROM tickets WHERE user_email = ?
+            UNION SELECT ticket_key, data FROM tickets WHERE email = ?
+        """, (user_uid, email, email))
+
+    def list_tickets(self):
+        """All tickets, newest first"""
+        return self._query("SELECT ticket_key, data FROM tickets ORDER BY created_at DESC, ticket_key DESC")
+
+    def _where(self, filters, before=None):
+        """WHERE clause and parameters for the filters, optionally only before a cursor position"""
+        lowest, highest = _date_bounds(filters)
+        clauses = ["created_at >= ?", "created_at < ?"]
+        params = [lowest, highest]
+        for field in FILTER_FIELDS:
+            if filters.get(field):
+                clauses.append(f"{field} = ?")
+                params.append(filters[field])
+        if before is not None:
+            clauses.append("(created_at, ticket_key) < (?, ?)")
+            params.extend(before)
+        return " AND ".join(clauses), params
+
+    def query_tickets(self, filters=None, limit=50, cursor=None):
+        """Newest-first page of tickets matching the filters - returns (items, next cursor position)"""
+        where, params = self._where(filters or {}, before=cursor)
+        items = self._query(f"""
+            SELECT ticket_key, data FROM tickets WHERE {where}
+            ORDER BY created_at DESC, ticket_key DESC LIMIT ?
+        """, params + [limit + 1])
+
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        last_key, last_ticket = items[-1]
+        return items, [last_ticket.get('created_at') or '', last_key]
+
+    def count_tickets(self, filters=None):
+        """Number of tickets matching the filters"""
+        where, params = self._where(filters or {})
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM tickets WHERE {where}", params).fetchone()[0]
+
+    def revision(self):
+        """Current ticket revision - the highest revision of any written change"""
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(MAX(revision), 0) FROM tickets").fetchone()[0]
+
+    def version(self):
+        """Token that changes with every ticket change - saves are committed with their revision"""
+        return self.revision()
+
+    def changes_since(self, revision, limit=500):
+        """Tickets changed after a revision, oldest change first - returns (items, reset)"""
+        if revision > self.revision():
+            return [], True
+        items = self._query("SELECT ticket_key, data FROM tickets WHERE revision > ? ORDER BY revision LIMIT ?",
+                            (revision, limit + 1))
+        if len(items) > limit:
+            return [], True
+        return items, False
+
+    def export_page(self, after=None, limit=500):
+        """Up to `limit` tickets in (revision, ticket_key) order, after a position - for bulk exports"""
+        return self._query("""
+            SELECT ticket_key, data FROM tickets WHERE (revision, ticket_key) > (?, ?)
+            ORDER BY revision, ticket_key LIMIT ?
+        """, (*(after or (-1, '')), limit))
+
+    def export_start(self, since):
+        """Export position just before the earliest-changed ticket updated (or created) at or after since
+
+        None when no ticket changed since then. Timestamps are compared in
+        the same 'T'-separated form as changed_at().
+        """
+        with self.lock:
+            revision = self.conn.execute("""
+                SELECT MIN(revision) FROM (
+                    SELECT MIN(revision) AS revision FROM tickets WHERE replace(updated_at, ' ', 'T') >= ?
+                    UNION ALL
+                    SELECT MIN(revision) FROM tickets WHERE updated_at IS NULL AND replace(created_at, ' ', 'T') >= ?
+                )
+            """, (since, since)).fetchone()[0]
+        return (revision, '') if revision is not None else None
+
+    def _catch_up_aggregates(self):
+        """Count the changes committed (by any process) since the aggregates were last read"""
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT ticket_key, revision, data FROM tickets WHERE revision > ? ORDER BY revision
+            """, (self.aggregates_revision,)).fetchall()
+            for ticket_key, revision, data in rows:
+                self.aggregates.update(ticket_key, json.loads(data))
+                self.aggregates_revision = max(self.aggregates_revision, revision)
+
+    def user_stats(self, user_uid, email):
+        """Dashboard statistics over a user's tickets, from the maintained counters"""
+        self._catch_up_aggregates()
+        with self.lock:
+            return dashboard_stats(self.aggregates.user_counters(user_uid, email))
+
+    def stats_summary(self):
+        """Overall, per-category and per-agent ticket counters"""
+        self._catch_up_aggregates()
+        with self.lock:
+            return self.aggregates.summary()
+
+    def compact(self):
+        """Checkpoint the SQLite write-ahead log"""
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def create_ticket_repository(engine=None, multiprocess=None):
+    """Create and load a ticket repository for the configured storage engine
+
+    multiprocess defaults to STORAGE_MULTIPROCESS; a separate process
+    writing alongside the app (a batch job) passes True.
+    """
+    engine = engine or TICKET_STORAGE
+    multiprocess = STORAGE_MULTIPROCESS if multiprocess is None else multiprocess
+    store = TicketStore(TICKETS_FILE, TICKETS_LOG_FILE, compact_every=TICKETS_COMPACT_EVERY,
+                        multiprocess=multiprocess)
+
+    if engine == 'sqlite':
+        # SQLite commits in WAL mode on save and does its own locking between processes;
+        # the change log is only read for the import
+        return SqliteTicketRepository(TICKETS_DB_FILE, import_store=store).load()
+    if engine != 'json':
+        logger.warning(f"Unknown TICKET_STORAGE '{engine}', using JSON storage")
+
+    repository = JsonTicketRepository(store).load()
+    persistence = get_persistence_manager()
+    persistence.register('tickets', repository.flush)
+    store.on_dirty = lambda: persistence.mark_dirty('tickets')
+    return repository
+
+_ticket_repository = None
+_ticket_repository_lock = threading.Lock()
+
+def get_ticket_repository():
+    """Get the process-wide ticket repository shared by the app and its blueprints"""
+    global _ticket_repository
+    with _ticket_repository_lock:
+        if _ticket_repository is None:
+            _ticket_repository = create_ticket_repository()
+        return _ticket_repository
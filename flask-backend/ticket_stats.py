@@ -0,0 +1,113 @@
+"""
+Ticket Statistics
+Incrementally maintained ticket counters per user, agent, category and overall
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+RESOLVED_STATUSES = ('resolved', 'closed')
+
+# Counters kept for every group; resolution_time is the sum over resolved tickets
+COUNTERS = ('total', 'open', 'resolved', 'urgent', 'resolution_time')
+
+def empty_counters():
+    return dict.fromkeys(COUNTERS, 0)
+
+def dashboard_stats(counters):
+    """The /api/dashboard/stats shape from a group's counters"""
+    return {
+        'total_tickets': counters['total'],
+        'open_tickets': counters['open'],
+        'resolved_tickets': counters['resolved'],
+        'urgent_tickets': counters['urgent'],
+        'avg_resolution_time': counters['resolution_time'] / counters['resolved'] if counters['resolved'] else 0
+    }
+
+class TicketAggregates:
+    """Counters per group, moved as each ticket changes instead of recounted per request
+
+    Groups are ('all',), ('category', c), ('agent', assigned_agent_id) and,
+    for the user dashboard, ('user_uid', uid), ('user_email', email) and
+    ('user_pair', uid, email). A dashboard user owns the tickets matching
+    their UID or their email, so their stats are uid + email - pair, which
+    counts a ticket matching both only once.
+
+    Each ticket's last contribution is remembered, so an update subtracts
+    exactly what was added before even when the caller changed the ticket
+    dict in place. Callers hold the repository lock.
+    """
+
+    def __init__(self):
+        self.groups = {}  # group key -> counters
+        self.contributions = {}  # ticket_key -> (group keys, counter deltas)
+
+    def _contribution(self, ticket):
+        """(group keys, counter deltas) a ticket adds"""
+        resolved = ticket.get('status') in RESOLVED_STATUSES
+        deltas = {
+            'total': 1,
+            'open': 0 if resolved else 1,
+            'resolved': 1 if resolved else 0,
+            'urgent': 1 if ticket.get('priority') == 'urgent' else 0,
+            'resolution_time': (ticket.get('resolution_time') or 0) if resolved else 0
+        }
+
+        keys = [('all',), ('category', ticket.get('category') or 'general')]
+        if ticket.get('assigned_agent_id'):
+            keys.append(('agent', ticket['assigned_agent_id']))
+        user_uid = ticket.get('user_uid')
+        emails = {ticket.get('user_email'), ticket.get('email')} - {None, ''}
+        if user_uid:
+            keys.append(('user_uid', user_uid))
+        for email in emails:
+            keys.append(('user_email', email))
+            if user_uid:
+                keys.append(('user_pair', user_uid, email))
+        return keys, deltas
+
+    def _apply(self, keys, deltas, sign):
+        for key in keys:
+            counters = self.groups.setdefault(key, empty_counters())
+            for name, delta in deltas.items():
+                counters[name] += sign * delta
+            if not counters['total']:
+                del self.groups[key]
+
+    def update(self, ticket_key, ticket):
+        """Move a ticket's contribution to its current state (ticket None removes it)"""
+        old = self.contributions.pop(ticket_key, None)
+        if old:
+            self._apply(*old, -1)
+        if ticket is not None:
+            new = self._contribution(ticket)
+            self._apply(*new, 1)
+            self.contributions[ticket_key] = new
+
+    def clear(self):
+        self.groups.clear()
+        self.contributions.clear()
+
+    def counters(self, *key):
+        """Copy of one group's counters (zeros for an empty group)"""
+        return dict(self.groups.get(key) or empty_counters())
+
+    def user_counters(self, user_uid, email):
+        """Counters over the tickets a dashboard user owns (matched by UID or email)"""
+        combined = empty_counters()
+        parts = [(('user_uid', user_uid), 1), (('user_email', email), 1), (('user_pair', user_uid, email), -1)]
+        for key, sign in parts:
+            for name, value in self.groups.get(key, {}).items():
+                combined[name] += sign * value
+        return combined
+
+    def summary(self):
+        """Overall, per-category and per-agent counters"""
+        return {
+            'all': self.counters('all'),
+            'by_category': {key[1]: dict(counters) for key, counters in self.groups.items()
+                            if key[0] == 'category'},
+            'by_agent': {key[1]: dict(counters) for key, counters in self.groups.items()
+                         if key[0] == 'agent'}
+        }
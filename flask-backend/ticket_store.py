@@ -0,0 +1,261 @@
+"""
+Ticket Store
+Append-only change log with periodic compacted snapshots for ticket persistence
+"""
+
+import json
+import os
+import logging
+from contextlib import contextmanager
+
+from persistence import atomic_write_json, file_lock
+
+logger = logging.getLogger(__name__)
+
+class TicketStore:
+    """Ticket persistence backed by a JSON snapshot plus an append-only JSONL change log
+
+    With multiprocess set, loads, log appends and compaction hold an advisory
+    lock on the log file, and a writer first catches up on what other
+    processes appended, so several workers can share the same files. Changes
+    are then written as they are made rather than group-committed, so another
+    worker never serves a ticket older than one it was just told about, and
+    transaction() holds the lock across a read-modify-write. Compaction
+    takes the lock in either mode, so it never truncates log lines another
+    process appended after the catch-up.
+
+    Every written change stamps the ticket with the next store revision
+    (ticket['revision']), so readers can ask for what changed since a revision.
+    """
+
+    def __init__(self, snapshot_file='tickets.json', log_file='tickets_changes.jsonl', compact_every=500,
+                 multiprocess=False):
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        self.compact_every = compact_every  # Log records written before the snapshot is rewritten
+        self.multiprocess = multiprocess
+        self.tickets = {}
+        self.revision = 0  # Highest ticket revision written or replayed
+        self.log_records = 0
+        self.log_offset = 0  # Bytes of the change log already applied to memory
+        self.signature = None  # (snapshot, log) file stats as of our last load or write
+        self.pending = []  # Change records not yet written
+        self.on_dirty = None  # Group commit hook - when set, flush() is left to the caller
+        self.on_put = None  # Called as on_put(ticket_id) when a replayed record changes a ticket
+        self.on_reload = None  # Called once a full reload has read the snapshot, before the log replay
+        self.in_transaction = False  # Appends are written when transaction() ends
+
+    def _file_signature(self, path):
+        try:
+            stat = os.stat(path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _signature(self):
+        return (self._file_signature(self.snapshot_file), self._file_signature(self.log_file))
+
+    def _locked(self):
+        """Lock held while reading or writing the files in multiprocess mode"""
+        return file_lock(self.log_file, self.multiprocess)
+
+    def load(self):
+        """Load the snapshot and replay the change log tail on top of it"""
+        with self._locked():
+            return self._load()
+
+    def _load(self):
+        self.tickets.clear()
+        self.revision = 0
+        self.log_records = 0
+        self.log_offset = 0
+        self.signature = self._signature()
+
+        if os.path.exists(self.snapshot_file):
+            try:
+                with open(self.snapshot_file, 'r') as f:
+                    self.tickets.update(json.load(f))
+            except Exception as e:
+                logger.error(f"Failed to load tickets snapshot: {e}")
+
+        self.revision = max((ticket.get('revision', 0) for ticket in self.tickets.values()), default=0)
+        if self.on_reload:
+            self.on_reload()
+        self._replay_log()
+
+        logger.info(f"Loaded {len(self.tickets)} tickets ({self.log_records} replayed from {self.log_file})")
+        return self.tickets
+
+    def _replay_log(self):
+        """Apply complete change log records written after log_offset"""
+        if not os.path.exists(self.log_file):
+            return 0
+
+        with open(self.log_file, 'rb') as f:
+            f.seek(self.log_offset)
+            data = f.read()
+
+        # A trailing line without a newline is still being written - pick it up next time
+        complete = data[:data.rfind(b'\n') + 1]
+        replayed = 0
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn write from a crash - everything around it is intact
+                logger.warning(f"Skipping unreadable change log record in {self.log_file}")
+                continue
+            self._apply(record)
+            replayed += 1
+
+        self.log_offset += len(complete)
+        self.log_records += replayed
+        return replayed
+
+    def refresh(self):
+        """Pick up changes written by other processes since our last load or write"""
+        if self._signature() == self.signature:
+            return False
+        with self._locked():
+            return self._catch_up()
+
+    def _catch_up(self):
+        """Apply other writers' changes, keeping our unwritten ones on top"""
+        signature = self._signature()
+        if signature == self.signature:
+            return False
+
+        snapshot_signature, log_signature = signature
+        if (self.signature is not None and snapshot_signature == self.signature[0]
+                and log_signature is not None
+                and log_signature[1] >= self.log_offset):
+            # Only the log grew - replay just the new tail
+            self.signature = signature
+            self._replay_log()
+        else:
+            # Snapshot was compacted (or files replaced) elsewhere - reload everything
+            self._load()
+
+        for record in self.pending:
+            self._apply(record)
+        return True
+
+    def _apply(self, record):
+        """Apply a single change log record to the in-memory tickets"""
+        if record.get('op') == 'put':
+            self.tickets[record['id']] = record['ticket']
+            self.revision = max(self.revision, record['ticket'].get('revision', 0))
+            if self.on_put:
+                self.on_put(record['id'])
+
+    def append(self, ticket_id):
+        """Record the current state of one ticket as a single change log line"""
+        self.pending.append({'op': 'put', 'id': ticket_id, 'ticket': self.tickets[ticket_id]})
+        self.log_records += 1
+
+        if self.in_transaction:
+            return
+        if self.on_dirty and not self.multiprocess:
+            self.on_dirty()
+        else:
+            self.flush()
+
+    @contextmanager
+    def transaction(self):
+        """Hold the file lock over a read-modify-write (multiprocess mode)
+
+        Other processes' changes are applied first, and the changes appended
+        inside the block are written before the lock is released, so no
+        other worker can change the ticket in between. Callers hold their own
+        thread lock around it as well.
+        """
+        if not self.multiprocess:
+            yield
+            return
+
+        with self._locked():
+            self._catch_up()
+            self.in_transaction = True
+            try:
+                yield
+            finally:
+                self.in_transaction = False
+                self._flush()
+
+    def flush(self, fsync=False):
+        """Write pending log lines in one append, compacting when the log is long enough"""
+        if not self.pending and not self._needs_compaction():
+            return
+
+        with self._locked():
+            if self.multiprocess:
+                self._catch_up()
+            self._flush(fsync)
+
+    def _flush(self, fsync=False):
+        if self._needs_compaction():
+            if self.multiprocess:
+                self._compact(fsync)  # Lock already held
+            else:
+                with file_lock(self.log_file):
+                    self._compact(fsync)
+            return
+        if not self.pending:
+            return
+
+        self._assign_revisions()
+
+        data = ''.join(json.dumps(record) + '\n' for record in self.pending).encode('utf-8')
+        with open(self.log_file, 'ab') as f:
+            start = f.tell()
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+            end = f.tell()
+        self.pending = []
+
+        # If another process appended since our last read, leave the offset behind
+        # so refresh() replays their records (and harmlessly ours) in file order
+        if start == self.log_offset:
+            self.log_offset = end
+            self.signature = self._signature()
+
+    def _assign_revisions(self):
+        """Stamp pending changes with the next revisions, once caught up with other writers"""
+        for record in self.pending:
+            self.revision += 1
+            record['ticket']['revision'] = self.revision
+            if self.on_put:
+                self.on_put(record['id'])
+
+    def _needs_compaction(self):
+        return self.compact_every and self.log_records >= self.compact_every
+
+    def compact(self, fsync=False):
+        """Rewrite the snapshot from memory and truncate the change log
+
+        Under the file lock even in single-process mode - a batch job may be
+        appending to the log alongside the app.
+        """
+        with file_lock(self.log_file):
+            self._compact(fsync)
+
+    def _compact(self, fsync=False):
+        self._catch_up()
+        self._assign_revisions()
+
+        # Memory already holds every pending change, so the snapshot covers them
+        self.pending = []
+        atomic_write_json(self.snapshot_file, self.tickets, fsync=fsync)
+
+        # Replaying puts already contained in the snapshot is harmless, so a crash
+        # between the replace and the truncate loses nothing
+        with open(self.log_file, 'w'):
+            pass
+        self.log_records = 0
+        self.log_offset = 0
+        self.signature = self._signature()
+        logger.info(f"Compacted {len(self.tickets)} tickets into {self.snapshot_file}")